@@ -43,6 +43,54 @@ database_opts = [
                secret=True,
                help='The SQLAlchemy connection string to use to connect to the'
                     ' slave database.'),
+    cfg.MultiStrOpt('slave_connections',
+                    secret=True,
+                    help='The SQLAlchemy connection strings of additional '
+                         'slave databases. The read-only transactions are '
+                         'balanced between all the slave databases.'),
+    cfg.StrOpt('slave_balancing',
+               default='round_robin',
+               choices=('round_robin', 'least_connections'),
+               help='How the read-only transactions are balanced between '
+                    'the slave databases: in turn, or to the slave with the '
+                    'fewest connections in use.'),
+    cfg.IntOpt('slave_max_lag',
+               min=0,
+               help='If set, the slave databases replicating more than this '
+                    'number of seconds behind the master database are not '
+                    'used until they catch up. Supported for MySQL and '
+                    'PostgreSQL.'),
+    cfg.IntOpt('slave_check_interval',
+               default=30,
+               min=1,
+               help='Interval, in seconds, between the health checks of the '
+                    'slave databases. A slave which fails a check, or whose '
+                    'connection is lost, is not used until a check '
+                    'succeeds.'),
+    cfg.StrOpt('query_cache_backend',
+               default='memory',
+               choices=('memory', 'shared'),
+               help='Where the results of the queries of the cached reader '
+                    'transactions are held: in the memory of the process, '
+                    'or in the query_cache_path file shared by the '
+                    'processes of the host.'),
+    cfg.IntOpt('query_cache_ttl',
+               default=60,
+               min=0,
+               help='Default number of seconds the results of the queries '
+                    'are cached for.'),
+    cfg.IntOpt('query_cache_max_entries',
+               default=1000,
+               min=1,
+               help='Maximum number of query results cached, the least '
+                    'recently used ones are evicted first.'),
+    cfg.IntOpt('query_cache_max_bytes',
+               min=1,
+               help='If set, the maximum size in bytes of the query results '
+                    'cached.'),
+    cfg.StrOpt('query_cache_path',
+               help='The file of the shared query cache. It must only be '
+                    'writable by the user running the processes.'),
     cfg.StrOpt('mysql_sql_mode',
                default='TRADITIONAL',
                help='The SQL mode to be used for MySQL sessions. '
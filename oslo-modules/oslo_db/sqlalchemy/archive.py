@@ -0,0 +1,213 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Bulk soft-delete, archive and purge of the SoftDeleteMixin tables.
+
+The rows are processed in chunks, each chunk in a transaction of its own, so
+the locks are only held for the time of a chunk however many rows are
+processed::
+
+    engine = enginefacade.writer.get_engine()
+    instances = utils.get_table(engine, 'instances')
+
+    # soft-delete the instances of a project
+    archive.soft_delete_rows(engine, instances,
+                             instances.c.project_id == project_id)
+
+    # move the rows deleted for more than 30 days to shadow_instances
+    archive.archive_deleted_rows(engine, instances, older_than=30)
+
+    # drop the archived rows after 90 days
+    shadow = archive.get_shadow_table(engine, instances)
+    archive.purge_deleted_rows(engine, shadow, older_than=90)
+"""
+
+import datetime
+import logging
+import time
+
+from oslo_utils import timeutils
+from sqlalchemy import sql
+
+from oslo_db._i18n import _, _LI
+from oslo_db.sqlalchemy import utils
+
+LOG = logging.getLogger(__name__)
+
+SHADOW_TABLE_PREFIX = 'shadow_'
+
+
+def get_shadow_table(engine, table):
+    """Return the shadow table of table, where its deleted rows are archived.
+
+    :param engine: the engine of the database
+    :param table: the sqlalchemy.Table object of the archived table
+    :raises: sqlalchemy.exc.NoSuchTableError
+    """
+    return utils.get_table(engine, SHADOW_TABLE_PREFIX + table.name)
+
+
+def _deleted_criteria(table, older_than):
+    criteria = [table.c.deleted != utils._get_default_deleted_value(table)]
+    if older_than is not None:
+        before = timeutils.utcnow() - datetime.timedelta(days=older_than)
+        criteria.append(table.c.deleted_at < before)
+    return criteria
+
+
+def _process_chunks(engine, table, criteria, process, chunk_size, throttle,
+                    max_rows):
+    """Call process(connection, ids) with the ids of the rows of table matching
+    criteria, chunk_size ids at a time in the order of the ids, each chunk in
+    a transaction of its own.  Returns the number of rows processed.
+    """
+    if chunk_size < 1:
+        raise ValueError(_('chunk_size must be a positive integer'))
+    total = 0
+    last_id = None
+    while max_rows is None or total < max_rows:
+        limit = chunk_size
+        if max_rows is not None:
+            limit = min(limit, max_rows - total)
+        chunk_criteria = list(criteria)
+        if last_id is not None:
+            # NOTE: the rows already processed are skipped with the index of
+            # the primary key, rather than scanned again
+            chunk_criteria.append(table.c.id > last_id)
+        query = (sql.select([table.c.id]).
+                 where(sql.and_(*chunk_criteria)).
+                 order_by(table.c.id).
+                 limit(limit))
+        start = time.time()
+        with engine.begin() as connection:
+            ids = [row[0] for row in connection.execute(query)]
+            if ids:
+                process(connection, ids)
+        if not ids:
+            break
+        LOG.debug('Processed %(count)d rows of %(table)s in %(time).3fs',
+                  {'count': len(ids), 'table': table.name,
+                   'time': time.time() - start})
+        total += len(ids)
+        last_id = ids[-1]
+        if len(ids) < limit:
+            break
+        if throttle:
+            time.sleep(throttle)
+    return total
+
+
+def soft_delete_rows(engine, table, *criteria, **kwargs):
+    """Soft-delete the rows of table matching criteria.
+
+    The rows are marked deleted the way Query.soft_delete() does, chunk_size
+    rows at a time.
+
+    :param engine: the engine of the database
+    :param table: the sqlalchemy.Table object of a SoftDeleteMixin model
+    :param criteria: SQL expressions selecting the rows to delete, all the
+                     rows not deleted yet when none is given
+    :param chunk_size: the number of rows deleted per transaction
+    :param throttle: seconds to sleep between two chunks
+    :param max_rows: the maximum number of rows to delete, no limit if None
+    :return: the number of rows deleted
+    """
+    chunk_size = kwargs.pop('chunk_size', 500)
+    throttle = kwargs.pop('throttle', 0)
+    max_rows = kwargs.pop('max_rows', None)
+    if kwargs:
+        raise TypeError('Unexpected arguments: %s' % ', '.join(kwargs))
+
+    values = {'deleted': table.c.id, 'deleted_at': timeutils.utcnow()}
+    if 'updated_at' in table.c:
+        # keep updated_at from being set by its onupdate default
+        values['updated_at'] = table.c.updated_at
+
+    def process(connection, ids):
+        connection.execute(table.update().
+                           where(table.c.id.in_(ids)).
+                           values(values))
+
+    criteria = list(criteria)
+    criteria.append(table.c.deleted == utils._get_default_deleted_value(table))
+    count = _process_chunks(engine, table, criteria, process, chunk_size,
+                            throttle, max_rows)
+    LOG.info(_LI('Soft-deleted %(count)d rows of %(table)s'),
+             {'count': count, 'table': table.name})
+    return count
+
+
+def archive_deleted_rows(engine, table, shadow_table=None, older_than=None,
+                         chunk_size=500, throttle=0, max_rows=None):
+    """Move the soft-deleted rows of table to its shadow table.
+
+    Each chunk of rows is copied to the shadow table with an INSERT FROM
+    SELECT and deleted from table in the same transaction.  The columns of
+    table missing from the shadow table are not archived.
+
+    :param engine: the engine of the database
+    :param table: the sqlalchemy.Table object of a SoftDeleteMixin model
+    :param shadow_table: the table where the rows are archived, the table
+                         named shadow_<table name> by default
+    :param older_than: only archive the rows deleted more than this many days
+                       ago
+    :param chunk_size: the number of rows archived per transaction
+    :param throttle: seconds to sleep between two chunks
+    :param max_rows: the maximum number of rows to archive, no limit if None
+    :return: the number of rows archived
+    """
+    if shadow_table is None:
+        shadow_table = get_shadow_table(engine, table)
+    columns = [column.name for column in table.c
+               if column.name in shadow_table.c]
+
+    def process(connection, ids):
+        select = sql.select([table.c[name] for name in columns]).where(
+            table.c.id.in_(ids))
+        connection.execute(shadow_table.insert().from_select(columns, select))
+        connection.execute(table.delete().where(table.c.id.in_(ids)))
+
+    count = _process_chunks(engine, table,
+                            _deleted_criteria(table, older_than), process,
+                            chunk_size, throttle, max_rows)
+    LOG.info(_LI('Archived %(count)d deleted rows of %(table)s to '
+                 '%(shadow)s'),
+             {'count': count, 'table': table.name,
+              'shadow': shadow_table.name})
+    return count
+
+
+def purge_deleted_rows(engine, table, older_than, chunk_size=500, throttle=0,
+                       max_rows=None):
+    """Delete the rows soft-deleted more than older_than days ago.
+
+    This applies to the shadow tables where the deleted rows were archived
+    as well as to the tables themselves.
+
+    :param engine: the engine of the database
+    :param table: the sqlalchemy.Table object of a SoftDeleteMixin model or
+                  of its shadow table
+    :param older_than: delete the rows deleted more than this many days ago
+    :param chunk_size: the number of rows deleted per transaction
+    :param throttle: seconds to sleep between two chunks
+    :param max_rows: the maximum number of rows to delete, no limit if None
+    :return: the number of rows deleted
+    """
+    def process(connection, ids):
+        connection.execute(table.delete().where(table.c.id.in_(ids)))
+
+    count = _process_chunks(engine, table,
+                            _deleted_criteria(table, older_than), process,
+                            chunk_size, throttle, max_rows)
+    LOG.info(_LI('Purged %(count)d deleted rows of %(table)s'),
+             {'count': count, 'table': table.name})
+    return count
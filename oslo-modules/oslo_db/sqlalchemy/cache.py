@@ -0,0 +1,515 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Cache of the results of the ORM queries of the reader transactions.
+
+The cache is enabled per transaction with the ``cached()`` modifier of the
+enginefacade::
+
+    @enginefacade.reader.cached(ttl=60, region='flavors')
+    def flavor_get_all(context):
+        return context.session.query(models.Flavor).all()
+
+The results are cached keyed on the SQL statement and its parameters, and
+are invalidated when a writer transaction of the process commits changes to
+one of the tables they were selected from.  The changes made by other
+processes aren't seen until the results expire, unless the processes share
+the cache.
+"""
+
+import abc
+import collections
+import contextlib
+import hashlib
+import itertools
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import six
+from six.moves import cPickle as pickle
+import sqlalchemy
+from sqlalchemy.sql import util as sql_util
+
+from oslo_db._i18n import _
+
+LOG = logging.getLogger(__name__)
+
+SESSION_INFO_KEY = 'oslo_db.query_cache'
+
+ALL_TABLES = '*'
+
+_TABLES_INFO_KEY = 'oslo_db.query_cache.tables'
+
+_MODIFY_REGEX = re.compile(
+    r'\s*(?:INSERT(?:\s+IGNORE)?\s+INTO|REPLACE\s+INTO|UPDATE|DELETE\s+FROM|'
+    r'TRUNCATE(?:\s+TABLE)?)\s+[`"]?(\w+)', re.IGNORECASE)
+
+_DDL_REGEX = re.compile(r'\s*(?:ALTER|CREATE|DROP|RENAME)\s', re.IGNORECASE)
+
+
+@six.add_metaclass(abc.ABCMeta)
+class CacheBackend(object):
+    """Store the serialized results of the queries.
+
+    Each value is stored with the names of the tables it was selected from,
+    and expires after its ttl.
+
+    Every invalidation increments the generation of the backend, and records
+    it as the generation of the tables invalidated.  A value selected while a
+    writer commits is not stored if one of its tables was invalidated after
+    the generation read before selecting it.
+    """
+
+    @abc.abstractmethod
+    def get(self, key):
+        """Return the value stored for key, or None."""
+
+    @abc.abstractmethod
+    def set(self, key, value, ttl, tables, generation=None):
+        """Store value for key, for ttl seconds.
+
+        The value isn't stored if one of the tables was invalidated after
+        generation, unless generation is None.
+        """
+
+    @abc.abstractmethod
+    def generation(self):
+        """Return the current generation of the backend."""
+
+    @abc.abstractmethod
+    def invalidate(self, tables):
+        """Remove the values selected from any of the tables."""
+
+    @abc.abstractmethod
+    def clear(self):
+        """Remove all the values."""
+
+    @abc.abstractmethod
+    def statistics(self):
+        """Return a dict of the number of entries and of bytes held."""
+
+
+class MemoryBackend(CacheBackend):
+    """A least recently used cache of the process."""
+
+    def __init__(self, max_entries=1000, max_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = collections.OrderedDict()
+        self._keys_by_table = collections.defaultdict(set)
+        self._bytes = 0
+        self._evictions = 0
+        self._generation = 0
+        # table name, or ALL_TABLES -> generation of its last invalidation
+        self._invalidated = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+            if entry[1] <= time.time():
+                self._remove(key, entry)
+                return None
+            # the most recently used entries are the last ones
+            self._entries[key] = entry
+            return entry[0]
+
+    def set(self, key, value, ttl, tables, generation=None):
+        with self._lock:
+            if generation is not None and any(
+                    self._invalidated.get(table, 0) > generation
+                    for table in itertools.chain(tables, (ALL_TABLES, ))):
+                return
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._remove(key, entry)
+            self._entries[key] = (value, time.time() + ttl, tables)
+            self._bytes += len(value)
+            for table in tables:
+                self._keys_by_table[table].add(key)
+            while self._entries and (
+                    len(self._entries) > self.max_entries or
+                    (self.max_bytes is not None and
+                     self._bytes > self.max_bytes)):
+                old_key, old_entry = self._entries.popitem(last=False)
+                self._remove(old_key, old_entry)
+                self._evictions += 1
+
+    def _remove(self, key, entry):
+        self._entries.pop(key, None)
+        self._bytes -= len(entry[0])
+        for table in entry[2]:
+            keys = self._keys_by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_table[table]
+
+    def generation(self):
+        return self._generation
+
+    def invalidate(self, tables):
+        with self._lock:
+            self._generation += 1
+            for table in tables:
+                self._invalidated[table] = self._generation
+                for key in list(self._keys_by_table.get(table, ())):
+                    self._remove(key, self._entries[key])
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._invalidated[ALL_TABLES] = self._generation
+            self._entries.clear()
+            self._keys_by_table.clear()
+            self._bytes = 0
+
+    def statistics(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._bytes,
+                    'evictions': self._evictions}
+
+
+class SharedBackend(CacheBackend):
+    """A least recently used cache shared by the processes of a host.
+
+    The values are stored in a SQLite database file, which must only be
+    writable by the user running the processes: the values are unpickled.
+    """
+
+    # NOTE: updating the time an entry was used takes the write lock of the
+    # database, it is only done once per interval
+    USE_INTERVAL = 1.0
+
+    _SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS entries ("
+        "key TEXT PRIMARY KEY, value BLOB, expires REAL, used REAL, "
+        "size INTEGER)",
+        "CREATE INDEX IF NOT EXISTS entries_used ON entries (used)",
+        "CREATE TABLE IF NOT EXISTS entry_tables ("
+        "name TEXT, key TEXT REFERENCES entries (key) ON DELETE CASCADE, "
+        "PRIMARY KEY (name, key))",
+        "CREATE INDEX IF NOT EXISTS entry_tables_key ON entry_tables (key)",
+        "CREATE TABLE IF NOT EXISTS generations ("
+        "name TEXT PRIMARY KEY, generation INTEGER)",
+    )
+
+    def __init__(self, path, max_entries=1000, max_bytes=None, timeout=5.0):
+        if not path:
+            raise ValueError(_('The shared query cache requires a path'))
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self._local = threading.local()
+        self._evictions = 0
+        # create the file before SQLite does, to restrict its permissions
+        os.close(os.open(path, os.O_CREAT | os.O_RDWR, 0o600))
+        with self._transaction() as db:
+            for statement in self._SCHEMA:
+                db.execute(statement)
+
+    def _connect(self):
+        db = getattr(self._local, 'db', None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=self.timeout,
+                                 isolation_level=None)
+            db.execute('PRAGMA journal_mode = WAL')
+            db.execute('PRAGMA synchronous = OFF')
+            db.execute('PRAGMA foreign_keys = ON')
+            self._local.db = db
+            self._local.pid = os.getpid()
+        return db
+
+    @contextlib.contextmanager
+    def _transaction(self):
+        db = self._connect()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            yield db
+        except Exception:
+            db.execute('ROLLBACK')
+            raise
+        else:
+            db.execute('COMMIT')
+
+    def get(self, key):
+        db = self._connect()
+        row = db.execute(
+            "SELECT value, expires, used FROM entries WHERE key = ?",
+            (key, )).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        if row[1] <= now:
+            with self._transaction() as db:
+                db.execute("DELETE FROM entries WHERE key = ? AND "
+                           "expires <= ?", (key, now))
+            return None
+        if row[2] + self.USE_INTERVAL <= now:
+            db.execute("UPDATE entries SET used = ? WHERE key = ?",
+                       (now, key))
+        return bytes(row[0])
+
+    def set(self, key, value, ttl, tables, generation=None):
+        now = time.time()
+        with self._transaction() as db:
+            if generation is not None:
+                names = list(tables) + [ALL_TABLES]
+                invalidated = db.execute(
+                    "SELECT max(generation) FROM generations WHERE name IN "
+                    "(%s)" % ', '.join('?' * len(names)), names).fetchone()[0]
+                if invalidated is not None and invalidated > generation:
+                    return
+            db.execute("DELETE FROM entries WHERE key = ?", (key, ))
+            db.execute("INSERT INTO entries VALUES (?, ?, ?, ?, ?)",
+                       (key, sqlite3.Binary(value), now + ttl, now,
+                        len(value)))
+            db.executemany("INSERT INTO entry_tables VALUES (?, ?)",
+                           [(table, key) for table in tables])
+            self._evict(db, now)
+
+    def _evict(self, db, now):
+        db.execute("DELETE FROM entries WHERE expires <= ?", (now, ))
+        count, size = db.execute(
+            "SELECT count(*), total(size) FROM entries").fetchone()
+        excess = max(count - self.max_entries, 0)
+        if self.max_bytes is not None and size > self.max_bytes:
+            # the least recently used entries holding the excess bytes
+            freed = 0
+            sizes = db.execute(
+                "SELECT size FROM entries ORDER BY used").fetchall()
+            for index, (entry_size, ) in enumerate(sizes):
+                freed += entry_size
+                if freed >= size - self.max_bytes:
+                    excess = max(excess, index + 1)
+                    break
+        if excess:
+            db.execute("DELETE FROM entries WHERE key IN (SELECT key FROM "
+                       "entries ORDER BY used LIMIT ?)", (excess, ))
+            self._evictions += excess
+
+    def generation(self):
+        return self._connect().execute(
+            "SELECT coalesce(max(generation), 0) FROM generations"
+        ).fetchone()[0]
+
+    @staticmethod
+    def _increment_generation(db, tables):
+        generation = db.execute(
+            "SELECT coalesce(max(generation), 0) + 1 FROM generations"
+        ).fetchone()[0]
+        db.executemany("INSERT OR REPLACE INTO generations VALUES (?, ?)",
+                       [(table, generation) for table in tables])
+
+    def invalidate(self, tables):
+        tables = list(tables)
+        with self._transaction() as db:
+            self._increment_generation(db, tables)
+            db.execute("DELETE FROM entries WHERE key IN (SELECT key FROM "
+                       "entry_tables WHERE name IN (%s))" %
+                       ', '.join('?' * len(tables)), tables)
+
+    def clear(self):
+        with self._transaction() as db:
+            self._increment_generation(db, [ALL_TABLES])
+            db.execute("DELETE FROM entries")
+
+    def statistics(self):
+        count, size = self._connect().execute(
+            "SELECT count(*), total(size) FROM entries").fetchone()
+        return {'entries': count, 'bytes': int(size),
+                'evictions': self._evictions}
+
+
+BACKENDS = {
+    'memory': MemoryBackend,
+    'shared': SharedBackend,
+}
+
+
+class _Region(object):
+    """The queries of a cached block, cached for ttl seconds.
+
+    generation is the generation of the backend before the transaction of
+    the block began, its results are only stored if none of their tables
+    was invalidated since.
+    """
+
+    def __init__(self, cache, name, ttl, generation):
+        self.cache = cache
+        self.name = name
+        self.ttl = ttl
+        self.generation = generation
+
+    def iterate(self, query, execute):
+        """Return the results of query, from the cache if they are found.
+
+        execute() runs the query and returns an iterator of its results.
+        """
+        statement = query.statement
+        bind = query.session.get_bind()
+        compiled = statement.compile(bind=bind)
+        params = sorted(compiled.params.items())
+        # NOTE: the name of the database tells apart the databases sharing
+        # a cache, and is the same for a master and its slaves
+        key = hashlib.sha1(('%s\0%s\0%s\0%r' % (
+            self.name, bind.url.database, compiled, params)).
+            encode('utf-8')).hexdigest()
+
+        value = self.cache.backend.get(key)
+        self.cache._account(self.name, value is not None)
+        if value is not None:
+            rows = pickle.loads(value)
+        else:
+            rows = list(execute())
+            tables = set(table.name
+                         for table in sql_util.find_tables(statement))
+            try:
+                value = pickle.dumps(rows, pickle.HIGHEST_PROTOCOL)
+            except (pickle.PicklingError, TypeError, AttributeError):
+                LOG.debug('Results of %s not cached', statement,
+                          exc_info=True)
+            else:
+                self.cache.backend.set(key, value, self.ttl, tables,
+                                       generation=self.generation)
+        # NOTE: the instances are merged without loading them, the cached
+        # state is given to the instances of the session
+        return query.merge_result(rows, load=False)
+
+
+class QueryCache(object):
+    """Cache the results of the queries in a backend, by region.
+
+    The regions are namespaces of the cache, which account their hits and
+    misses on their own.
+    """
+
+    def __init__(self, backend, default_ttl=60):
+        self.backend = backend
+        self.default_ttl = default_ttl
+        self._counts = collections.defaultdict(lambda: [0, 0])
+        self._lock = threading.Lock()
+
+    def region(self, name, ttl=None, generation=None):
+        """Return the region name, for a transaction which began at the
+        given generation of the backend, the current one by default.
+        """
+        if ttl is None:
+            ttl = self.default_ttl
+        if generation is None:
+            generation = self.backend.generation()
+        return _Region(self, name, ttl, generation)
+
+    def _account(self, region, hit):
+        with self._lock:
+            self._counts[region][0 if hit else 1] += 1
+
+    def invalidate(self, tables):
+        """Remove the results of the queries of any of the tables."""
+        if ALL_TABLES in tables:
+            self.backend.clear()
+        else:
+            self.backend.invalidate(tables)
+
+    def watch(self, engine):
+        """Invalidate the tables changed by the transactions of engine."""
+        sqlalchemy.event.listen(engine, 'after_cursor_execute',
+                                _record_changed_tables)
+        sqlalchemy.event.listen(engine, 'rollback', _rollback)
+        # NOTE: the commit event is emitted before the COMMIT is sent, a
+        # reader beginning meanwhile would read the rows as they were
+        # before the commit at the new generation and store them.  The
+        # tables are invalidated once the COMMIT returned instead.
+        dialect = engine.dialect
+        do_commit = dialect.do_commit
+
+        def _do_commit(dbapi_connection):
+            try:
+                do_commit(dbapi_connection)
+            finally:
+                self._commit(dbapi_connection)
+
+        dialect.do_commit = _do_commit
+
+    def _commit(self, dbapi_connection):
+        tables = dbapi_connection.info.pop(_TABLES_INFO_KEY, None)
+        if tables:
+            LOG.debug('Invalidating the cached queries of %s',
+                      ', '.join(sorted(tables)))
+            self.invalidate(tables)
+
+    def statistics(self):
+        """Return the hits, misses and hit rate of the regions, and the
+        entries and bytes held by the backend.
+        """
+        def rates(hits, misses):
+            total = hits + misses
+            return {'hits': hits, 'misses': misses,
+                    'hit_rate': float(hits) / total if total else None}
+
+        with self._lock:
+            counts = dict((name, list(count))
+                          for name, count in self._counts.items())
+        statistics = rates(sum(count[0] for count in counts.values()),
+                           sum(count[1] for count in counts.values()))
+        statistics['regions'] = dict((name, rates(*count))
+                                     for name, count in counts.items())
+        statistics.update(self.backend.statistics())
+        return statistics
+
+
+def _changed_tables(statement, context):
+    if context.isddl or _DDL_REGEX.match(statement):
+        return (ALL_TABLES, )
+    if context.isinsert or context.isupdate or context.isdelete:
+        return (context.compiled.statement.table.name, )
+    match = _MODIFY_REGEX.match(statement)
+    if match:
+        return (match.group(1), )
+    return ()
+
+
+def _record_changed_tables(connection, cursor, statement, parameters,
+                           context, executemany):
+    tables = _changed_tables(statement, context)
+    if tables:
+        connection.info.setdefault(_TABLES_INFO_KEY, set()).update(tables)
+
+
+def _rollback(connection):
+    connection.info.pop(_TABLES_INFO_KEY, None)
+
+
+def get_query_cache(backend='memory', ttl=60, max_entries=1000,
+                    max_bytes=None, path=None):
+    """Return a QueryCache using the given backend.
+
+    :param backend: a CacheBackend, or the name of one of the BACKENDS
+    :param ttl: the default number of seconds the results are cached for
+    :param max_entries: the maximum number of results cached
+    :param max_bytes: the maximum size of the results cached, no limit if
+                      None
+    :param path: the path of the file of the shared backend
+    """
+    if isinstance(backend, six.string_types):
+        kwargs = {'max_entries': max_entries, 'max_bytes': max_bytes}
+        if backend == 'shared':
+            kwargs['path'] = path
+        backend = BACKENDS[backend](**kwargs)
+    return QueryCache(backend, default_ttl=ttl)
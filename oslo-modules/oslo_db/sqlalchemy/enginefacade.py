@@ -13,17 +13,26 @@
 
 import contextlib
 import functools
+import itertools
+import logging
 import operator
 import threading
+import time
 import warnings
 
 from oslo_config import cfg
+import sqlalchemy
+from sqlalchemy.sql.expression import select
 
+from oslo_db._i18n import _LI, _LW
 from oslo_db import exception
 from oslo_db import options
+from oslo_db.sqlalchemy import cache
 from oslo_db.sqlalchemy import engines
 from oslo_db.sqlalchemy import orm
 
+LOG = logging.getLogger(__name__)
+
 
 class _symbol(object):
     """represent a fixed symbol."""
@@ -115,6 +124,156 @@ class _Default(object):
             hasattr(conf_namespace, key)
 
 
+class _Replica(object):
+    """A slave database of a :class:`._ReplicaSet`."""
+
+    __slots__ = 'engine', 'maker', 'available', 'checked_out', 'next_check'
+
+    def __init__(self, engine, maker):
+        self.engine = engine
+        self.maker = maker
+        self.available = True
+        self.checked_out = 0
+        self.next_check = 0
+
+
+class _ReplicaSet(object):
+    """Balance the reader transactions between slave databases.
+
+    A slave is ejected when it fails a health check, or when it lags more
+    than max_lag seconds behind the master, until a later check succeeds.
+    The slaves are checked every check_interval seconds, and as soon as a
+    connection to them is lost.  The checks run in a background thread, one
+    slave after the other, so selecting a slave never waits for them; a
+    slave which is down keeps being selected until its check fails.  The
+    master is used while no slave is available.
+
+    """
+
+    _BALANCINGS = ('round_robin', 'least_connections')
+
+    def __init__(self, replicas, master, balancing='round_robin',
+                 max_lag=None, check_interval=30):
+        if balancing not in self._BALANCINGS:
+            raise ValueError(
+                "Invalid balancing %r, expected one of %r" %
+                (balancing, self._BALANCINGS))
+        self._replicas = [_Replica(engine, maker)
+                          for engine, maker in replicas]
+        self._master = master
+        self._balancing = balancing
+        self._max_lag = max_lag
+        self._check_interval = check_interval
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._use_master = False
+        self._checker = None
+        for replica in self._replicas:
+            self._add_listeners(replica)
+
+    def _add_listeners(self, replica):
+
+        @sqlalchemy.event.listens_for(replica.engine, "checkout")
+        def checkout(dbapi_connection, connection_record, connection_proxy):
+            with self._lock:
+                replica.checked_out += 1
+
+        @sqlalchemy.event.listens_for(replica.engine, "checkin")
+        def checkin(dbapi_connection, connection_record):
+            with self._lock:
+                replica.checked_out -= 1
+
+        # NOTE: the connections found disconnected are invalidated, the
+        # slave is then checked before it is used again.  DisconnectionError
+        # only renews the connections of a forked process.
+        @sqlalchemy.event.listens_for(replica.engine, "invalidate")
+        def invalidate(dbapi_connection, connection_record, exception):
+            if exception is not None and not isinstance(
+                    exception, sqlalchemy.exc.DisconnectionError):
+                with self._lock:
+                    replica.next_check = 0
+
+    def select(self):
+        """Return the engine and sessionmaker of the slave to use."""
+        now = time.time()
+        with self._lock:
+            # NOTE: the thread of the parent process doesn't run in a forked
+            # child, is_alive() is False there
+            if ((self._checker is None or not self._checker.is_alive()) and
+                    any(replica.next_check <= now
+                        for replica in self._replicas)):
+                self._checker = threading.Thread(target=self._check_all)
+                self._checker.daemon = True
+                self._checker.start()
+
+            available = [replica for replica in self._replicas
+                         if replica.available]
+            if not available:
+                if not self._use_master:
+                    LOG.warning(_LW('No slave database is available, the '
+                                    'master database is used instead'))
+                    self._use_master = True
+                return self._master
+            self._use_master = False
+
+            # start from a different slave each time, which also breaks the
+            # ties between the least used slaves
+            start = next(self._counter) % len(available)
+            if self._balancing == 'least_connections':
+                available = available[start:] + available[:start]
+                replica = min(available,
+                              key=operator.attrgetter('checked_out'))
+            else:
+                replica = available[start]
+        return replica.engine, replica.maker
+
+    def _check_all(self):
+        for replica in self._replicas:
+            if replica.next_check <= time.time():
+                self._check(replica)
+
+    def _check(self, replica):
+        with self._lock:
+            now = time.time()
+            if replica.next_check > now:
+                # another thread is checking it
+                return
+            replica.next_check = now + self._check_interval
+
+        try:
+            with replica.engine.connect() as connection:
+                connection.scalar(select([1]))
+                lag = None
+                if self._max_lag is not None:
+                    lag = engines.get_replication_lag(connection)
+        except Exception as e:
+            self._eject(replica, e)
+            return
+
+        if lag is not None and lag > self._max_lag:
+            self._eject(replica, 'replication lag of %s seconds' % lag)
+            return
+
+        with self._lock:
+            restored = not replica.available
+            replica.available = True
+        if restored:
+            LOG.info(_LI('Slave database %s restored'),
+                     repr(replica.engine.url))
+
+    def _eject(self, replica, reason):
+        with self._lock:
+            ejected = replica.available
+            replica.available = False
+            replica.next_check = max(replica.next_check,
+                                     time.time() + self._check_interval)
+        if ejected:
+            LOG.warning(_LW('Slave database %(url)s ejected for %(time)s '
+                            'seconds: %(reason)s'),
+                        {'url': repr(replica.engine.url),
+                         'time': self._check_interval, 'reason': reason})
+
+
 class _TransactionFactory(object):
     """A factory for :class:`._TransactionContext` objects.
 
@@ -128,6 +287,7 @@ class _TransactionFactory(object):
         self._url_cfg = {
             'connection': _Default(),
             'slave_connection': _Default(),
+            'slave_connections': _Default(),
         }
         self._engine_cfg = {
             'sqlite_fk': _Default(False),
@@ -153,6 +313,18 @@ class _TransactionFactory(object):
         self._facade_cfg = {
             'synchronous_reader': True
         }
+        self._replica_cfg = {
+            'slave_balancing': _Default('round_robin'),
+            'slave_max_lag': _Default(),
+            'slave_check_interval': _Default(30)
+        }
+        self._cache_cfg = {
+            'query_cache_backend': _Default('memory'),
+            'query_cache_ttl': _Default(60),
+            'query_cache_max_entries': _Default(1000),
+            'query_cache_max_bytes': _Default(),
+            'query_cache_path': _Default()
+        }
 
         # other options that are defined in oslo.db.options.database_opts
         # but do not apply to the standard enginefacade arguments
@@ -167,6 +339,7 @@ class _TransactionFactory(object):
 
         self._started = False
         self._legacy_facade = None
+        self._query_cache = None
         self._start_lock = threading.Lock()
 
     def configure_defaults(self, **kw):
@@ -223,8 +396,9 @@ class _TransactionFactory(object):
         for k, v in kw.items():
             for dict_ in (
                     self._url_cfg, self._engine_cfg,
-                    self._maker_cfg, self._ignored_cfg,
-                    self._facade_cfg, self._transaction_ctx_cfg):
+                    self._maker_cfg, self._replica_cfg, self._cache_cfg,
+                    self._ignored_cfg, self._facade_cfg,
+                    self._transaction_ctx_cfg):
                 if k in dict_:
                     dict_[k] = _Default(v) if as_defaults else v
                     break
@@ -263,7 +437,7 @@ class _TransactionFactory(object):
         if mode is _WRITER:
             return self._writer_engine.connect()
         elif self.synchronous_reader or mode is _ASYNC_READER:
-            return self._reader_engine.connect()
+            return self._select_reader()[0].connect()
         else:
             return self._writer_engine.connect()
 
@@ -278,10 +452,16 @@ class _TransactionFactory(object):
         if mode is _WRITER:
             return self._writer_maker(**kw)
         elif self.synchronous_reader or mode is _ASYNC_READER:
-            return self._reader_maker(**kw)
+            return self._select_reader()[1](**kw)
         else:
             return self._writer_maker(**kw)
 
+    def _select_reader(self):
+        """Return the engine and sessionmaker of a reader transaction."""
+        if self._replica_set is None:
+            return self._reader_engine, self._reader_maker
+        return self._replica_set.select()
+
     def _args_for_conf(self, default_cfg, conf):
         if conf is None:
             return dict(
@@ -305,6 +485,45 @@ class _TransactionFactory(object):
     def _maker_args_for_conf(self, conf):
         return self._args_for_conf(self._maker_cfg, conf)
 
+    def _replica_args_for_conf(self, conf):
+        return self._args_for_conf(self._replica_cfg, conf)
+
+    def _cache_args_for_conf(self, conf):
+        return self._args_for_conf(self._cache_cfg, conf)
+
+    def _get_query_cache(self):
+        """Return the cache of the queries of the cached readers.
+
+        The cache is created the first time a cached reader is used, and
+        then follows the changes committed by the writer transactions.
+
+        """
+        if self._query_cache is None:
+            with self._start_lock:
+                if self._query_cache is None:
+                    args = self._cache_args
+                    query_cache = cache.get_query_cache(
+                        backend=args['query_cache_backend'],
+                        ttl=args['query_cache_ttl'],
+                        max_entries=args['query_cache_max_entries'],
+                        max_bytes=args.get('query_cache_max_bytes'),
+                        path=args.get('query_cache_path'))
+                    query_cache.watch(self._writer_engine)
+                    self._query_cache = query_cache
+        return self._query_cache
+
+    def get_query_cache_statistics(self):
+        """Return the statistics of the query cache.
+
+        The hits, misses and hit rate are reported overall and per region,
+        along with the number of entries and of bytes the cache holds.  None
+        is returned until a cached reader is used.
+
+        """
+        if self._query_cache is None:
+            return None
+        return self._query_cache.statistics()
+
     def _start(self, conf=False, connection=None, slave_connection=None):
         with self._start_lock:
             # self._started has been checked on the outside
@@ -337,16 +556,32 @@ class _TransactionFactory(object):
                     url_args['connection'],
                     engine_args, maker_args)
 
+            slave_connections = list(url_args.get('slave_connections') or ())
             if url_args.get('slave_connection'):
-                self._reader_engine, self._reader_maker = \
+                slave_connections.insert(0, url_args['slave_connection'])
+
+            if slave_connections:
+                # NOTE: a slave which can't be connected to is ejected by
+                # the replica set, rather than failing the start
+                slave_engine_args = dict(engine_args, max_retries=0)
+                replicas = [
                     self._setup_for_connection(
-                        url_args['slave_connection'],
-                        engine_args, maker_args)
+                        slave_connection, slave_engine_args, maker_args)
+                    for slave_connection in slave_connections]
+                self._reader_engine, self._reader_maker = replicas[0]
+                replica_args = self._replica_args_for_conf(conf)
+                self._replica_set = _ReplicaSet(
+                    replicas, (self._writer_engine, self._writer_maker),
+                    balancing=replica_args['slave_balancing'],
+                    max_lag=replica_args.get('slave_max_lag'),
+                    check_interval=replica_args['slave_check_interval'])
             else:
                 self._reader_engine, self._reader_maker = \
                     self._writer_engine, self._writer_maker
+                self._replica_set = None
 
             self.synchronous_reader = self._facade_cfg['synchronous_reader']
+            self._cache_args = self._cache_args_for_conf(conf)
 
             # set up _started last, so that in case of exceptions
             # we try the whole thing again and report errors
@@ -383,11 +618,16 @@ class _TestTransactionFactory(_TransactionFactory):
     def __init__(self, engine, maker, apply_global, synchronous_reader):
         self._reader_engine = self._writer_engine = engine
         self._reader_maker = self._writer_maker = maker
+        self._replica_set = None
         self._started = True
         self._legacy_facade = None
+        self._query_cache = None
+        self._start_lock = threading.Lock()
         self.synchronous_reader = synchronous_reader
 
         self._facade_cfg = _context_manager._factory._facade_cfg
+        self._cache_args = self._args_for_conf(
+            _context_manager._factory._cache_cfg, None)
         self._transaction_ctx_cfg = \
             _context_manager._factory._transaction_ctx_cfg
         if apply_global:
@@ -528,7 +768,7 @@ class _TransactionContext(object):
         else:
             transaction.rollback()
 
-    def _produce_block(self, mode, connection, savepoint):
+    def _produce_block(self, mode, connection, savepoint, cached=None):
         if mode is _WRITER:
             self._writer()
         elif mode is _ASYNC_READER:
@@ -537,9 +777,43 @@ class _TransactionContext(object):
             self._reader()
         if connection:
             return self._connection(savepoint)
+        elif cached is not None and self.mode is not _WRITER:
+            # NOTE: a reader block within a writer transaction must see
+            # the changes of the transaction, it isn't cached
+            return self._cached_session(savepoint, cached)
         else:
             return self._session(savepoint)
 
+    @contextlib.contextmanager
+    def _cached_session(self, savepoint, cached):
+        query_cache = self.factory._get_query_cache()
+        # NOTE: the generation must be read before the transaction begins,
+        # so that the results it selects before a writer commits aren't
+        # stored after the writer invalidated them.  The transaction of an
+        # enclosing block which isn't cached began at an unknown
+        # generation, only the tables never invalidated are cached then.
+        outer = None
+        if self.session is not None:
+            outer = self.session.info.get(cache.SESSION_INFO_KEY)
+        if outer is not None:
+            generation = outer.generation
+        elif self.session is None and self.connection is None:
+            generation = query_cache.backend.generation()
+        else:
+            generation = 0
+        with self._session(savepoint) as session:
+            region, ttl = cached
+            restore = session.info.get(cache.SESSION_INFO_KEY)
+            session.info[cache.SESSION_INFO_KEY] = \
+                query_cache.region(region, ttl, generation)
+            try:
+                yield session
+            finally:
+                if restore is None:
+                    del session.info[cache.SESSION_INFO_KEY]
+                else:
+                    session.info[cache.SESSION_INFO_KEY] = restore
+
     def _writer(self):
         if self.mode is None:
             self.mode = _WRITER
@@ -585,6 +859,7 @@ class _TransactionContextManager(object):
             independent=False,
             savepoint=False,
             connection=False,
+            cached=None,
             replace_global_factory=None,
             _is_global_manager=False):
 
@@ -603,6 +878,11 @@ class _TransactionContextManager(object):
             raise TypeError(
                 "setting savepoint and independent makes no sense.")
         self._connection = connection
+        self._cached = cached
+        if self._cached is not None and (
+                self._mode is _WRITER or self._connection):
+            raise TypeError(
+                "setting cached on a WRITER or a connection makes no sense.")
 
     @property
     def _factory(self):
@@ -619,6 +899,10 @@ class _TransactionContextManager(object):
         """
         self._factory.configure(**kw)
 
+    def get_query_cache_statistics(self):
+        """Return the statistics of the query cache of the factory."""
+        return self._factory.get_query_cache_statistics()
+
     @property
     def replace(self):
         """Modifier to replace the global transaction factory with this one."""
@@ -657,6 +941,17 @@ class _TransactionContextManager(object):
             raise TypeError("Setting async on a WRITER makes no sense")
         return self._clone(mode=_ASYNC_READER)
 
+    def cached(self, ttl=None, region='default'):
+        """Modifier to cache the results of the queries of a READER.
+
+        The results of the ORM queries of the Session are cached for ttl
+        seconds, query_cache_ttl by default, in the given region of the
+        cache.  They are invalidated when a WRITER transaction of the
+        process changes one of their tables.
+
+        """
+        return self._clone(cached=(region, ttl))
+
     def using(self, context):
         """Provide a context manager block that will use the given context."""
         return self._transaction_scope(context)
@@ -677,7 +972,8 @@ class _TransactionContextManager(object):
         default_kw = {
             "independent": self._independent,
             "mode": self._mode,
-            "connection": self._connection
+            "connection": self._connection,
+            "cached": self._cached
         }
         default_kw.update(kw)
         return _TransactionContextManager(root=self._root, **default_kw)
@@ -718,7 +1014,8 @@ class _TransactionContextManager(object):
                 with current._produce_block(
                     mode=self._mode,
                     connection=self._connection,
-                    savepoint=self._savepoint) as resource:
+                    savepoint=self._savepoint,
+                    cached=self._cached) as resource:
                     yield resource
             else:
                 yield
@@ -827,6 +1124,17 @@ def get_legacy_facade():
     return _context_manager._factory.get_legacy_facade()
 
 
+def get_query_cache_statistics():
+    """Return the statistics of the query cache of the global factory.
+
+    .. seealso::
+
+        :meth:`._TransactionFactory.get_query_cache_statistics`
+
+    """
+    return _context_manager._factory.get_query_cache_statistics()
+
+
 reader = _context_manager.reader
 """The global 'reader' starting point."""
 
@@ -953,7 +1261,7 @@ class LegacyEngineFacade(object):
 
         """
         if use_slave:
-            return self._factory._reader_engine
+            return self._factory._select_reader()[0]
         else:
             return self._factory._writer_engine
 
@@ -973,7 +1281,7 @@ class LegacyEngineFacade(object):
 
         """
         if use_slave:
-            return self._factory._reader_maker(**kwargs)
+            return self._factory._select_reader()[1](**kwargs)
         else:
             return self._factory._writer_maker(**kwargs)
 
@@ -985,7 +1293,7 @@ class LegacyEngineFacade(object):
 
         """
         if use_slave:
-            return self._factory._reader_maker
+            return self._factory._select_reader()[1]
         else:
             return self._factory._writer_maker
 
@@ -312,6 +312,50 @@ def _init_events(engine, sqlite_synchronous=True, sqlite_fk=False, **kw):
         conn.info.pop('in_transaction', None)
 
 
+@utils.dispatch_for_dialect('*')
+def get_replication_lag(connection):
+    """Return the number of seconds a slave database lags behind its master.
+
+    0 is returned for a database which isn't a slave, and None when the
+    lag can't be told.
+
+    """
+    return None
+
+
+@get_replication_lag.dispatch_for('mysql')
+def _get_replication_lag_mysql(connection):
+    status = connection.execute("SHOW SLAVE STATUS").first()
+    if status is None:
+        return 0
+    lag = status['Seconds_Behind_Master']
+    if lag is None:
+        # NOTE: the replication threads are stopped, the slave doesn't
+        # catch up with its master anymore
+        return float('inf')
+    return lag
+
+
+@get_replication_lag.dispatch_for('postgresql')
+def _get_replication_lag_postgresql(connection):
+    if connection.dialect.server_version_info >= (10, ):
+        received, replayed = ('pg_last_wal_receive_lsn',
+                              'pg_last_wal_replay_lsn')
+    else:
+        received, replayed = ('pg_last_xlog_receive_location',
+                              'pg_last_xlog_replay_location')
+    # NOTE: the time of the last transaction replayed only measures the lag
+    # while changes are left to replay, the master may just be idle
+    lag = connection.scalar(
+        "SELECT CASE WHEN NOT pg_is_in_recovery() THEN 0 "
+        "WHEN %s() = %s() THEN 0 "
+        "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) "
+        "END" % (received, replayed))
+    if lag is None:
+        return None
+    return float(lag)
+
+
 def _test_connection(engine, max_retries, retry_interval):
     if max_retries == -1:
         attempts = itertools.count()
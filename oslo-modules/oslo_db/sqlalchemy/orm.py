@@ -20,11 +20,18 @@ from oslo_utils import timeutils
 import sqlalchemy.orm
 from sqlalchemy.sql.expression import literal_column
 
+from oslo_db.sqlalchemy import cache
 from oslo_db.sqlalchemy import update_match
 
 
 class Query(sqlalchemy.orm.query.Query):
     """Subclass of sqlalchemy.query with soft_delete() method."""
+    def __iter__(self):
+        region = self.session.info.get(cache.SESSION_INFO_KEY)
+        if region is None:
+            return super(Query, self).__iter__()
+        return region.iterate(self, super(Query, self).__iter__)
+
     def soft_delete(self, synchronize_session='evaluate'):
         return self.update({'deleted': literal_column('id'),
                             'updated_at': literal_column('updated_at'),
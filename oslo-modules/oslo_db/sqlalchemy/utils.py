@@ -44,6 +44,7 @@ from sqlalchemy.types import NullType
 
 from oslo_db import exception
 from oslo_db._i18n import _, _LI, _LW
+from oslo_db.sqlalchemy.compat import utils as compat_utils
 from oslo_db.sqlalchemy import models
 
 # NOTE(ochuprykov): Add references for backwards compatibility
@@ -66,9 +67,79 @@ def sanitize_db_url(url):
     return url
 
 
+def _get_sort_dirs(sort_keys, sort_dir, sort_dirs):
+    assert(not (sort_dir and sort_dirs))
+
+    # Default the sort direction to ascending
+    if sort_dirs is None and sort_dir is None:
+        sort_dir = 'asc'
+
+    # Ensure a per-column sort direction
+    if sort_dirs is None:
+        sort_dirs = [sort_dir for _sort_key in sort_keys]
+
+    assert(len(sort_dirs) == len(sort_keys))
+    return sort_dirs
+
+
+def _row_values_supported(query, sort_dirs):
+    """Tell whether the rows following a marker can be selected comparing
+    row values: (k1, k2, k3) > (X1, X2, X3).
+
+    All the sort keys must be sorted in the same direction, and the database
+    must support the comparison.
+    """
+    if len(sort_dirs) < 2:
+        return False
+    if len(set(sort_dir.partition('-')[0] for sort_dir in sort_dirs)) > 1:
+        return False
+    try:
+        bind = query.session.get_bind()
+    except (AttributeError, sqlalchemy.exc.UnboundExecutionError):
+        return False
+    return _row_value_comparison_supported(bind)
+
+
+def _marker_criteria(model, sort_keys, sort_dirs, marker_values,
+                     row_values=False):
+    """Return the criteria selecting the rows which follow the marker values
+    in the order of sort_keys.
+
+    The row values are compared if row_values is True, unless a marker value
+    is NULL: the comparison would be unknown.
+    """
+    if row_values and None not in marker_values:
+        attrs = [getattr(model, sort_key) for sort_key in sort_keys]
+        values = sqlalchemy.tuple_(
+            *[sqlalchemy.literal(value, type_=attr.type)
+              for attr, value in zip(attrs, marker_values)])
+        if sort_dirs[0].startswith('desc'):
+            return sqlalchemy.tuple_(*attrs) < values
+        return sqlalchemy.tuple_(*attrs) > values
+
+    # Build up an array of sort criteria as in the paginate_query docstring
+    criteria_list = []
+    for i in range(len(sort_keys)):
+        crit_attrs = []
+        for j in range(i):
+            model_attr = getattr(model, sort_keys[j])
+            crit_attrs.append((model_attr == marker_values[j]))
+
+        model_attr = getattr(model, sort_keys[i])
+        if sort_dirs[i].startswith('desc'):
+            crit_attrs.append((model_attr < marker_values[i]))
+        else:
+            crit_attrs.append((model_attr > marker_values[i]))
+
+        criteria = sqlalchemy.sql.and_(*crit_attrs)
+        criteria_list.append(criteria)
+
+    return sqlalchemy.sql.or_(*criteria_list)
+
+
 # copy from glance/db/sqlalchemy/api.py
 def paginate_query(query, model, limit, sort_keys, marker=None,
-                   sort_dir=None, sort_dirs=None):
+                   sort_dir=None, sort_dirs=None, marker_values=None):
     """Returns a query with sorting / pagination criteria added.
 
     Pagination works by requiring a unique sort_key, specified by sort_keys.
@@ -80,11 +151,17 @@ def paginate_query(query, model, limit, sort_keys, marker=None,
     the lexicographical ordering:
     (k1 > X1) or (k1 == X1 && k2 > X2) or (k1 == X1 && k2 == X2 && k3 > X3)
 
+    When all the sort keys are sorted in the same direction and the database
+    supports it, the row values are compared instead:
+    (k1, k2, k3) > (X1, X2, X3)
+    which the database resolves as a single range of an index on the keys.
+
     We also have to cope with different sort_directions.
 
     Typically, the id of the last row is used as the client-facing pagination
     marker, then the actual marker object must be fetched from the db and
-    passed in to us as marker.
+    passed in to us as marker.  The values of its sort keys can be passed as
+    marker_values instead, sparing that query.
 
     :param query: the query object to which we should add paging/sorting
     :param model: the ORM model class
@@ -96,6 +173,8 @@ def paginate_query(query, model, limit, sort_keys, marker=None,
                      suffix -nullsfirst, -nullslast can be added to defined
                      the ordering of null values
     :param sort_dirs: per-column array of sort_dirs, corresponding to sort_keys
+    :param marker_values: the values of the sort_keys of the last item of the
+                          previous page, instead of marker
 
     :rtype: sqlalchemy.orm.query.Query
     :return: The query with sorting/pagination added.
@@ -106,17 +185,9 @@ def paginate_query(query, model, limit, sort_keys, marker=None,
         # the actual primary key, rather than assuming its id
         LOG.warning(_LW('Id not in sort_keys; is sort_keys unique?'))
 
-    assert(not (sort_dir and sort_dirs))
+    assert(marker is None or marker_values is None)
 
-    # Default the sort direction to ascending
-    if sort_dirs is None and sort_dir is None:
-        sort_dir = 'asc'
-
-    # Ensure a per-column sort direction
-    if sort_dirs is None:
-        sort_dirs = [sort_dir for _sort_key in sort_keys]
-
-    assert(len(sort_dirs) == len(sort_keys))
+    sort_dirs = _get_sort_dirs(sort_keys, sort_dir, sort_dirs)
 
     # Add sorting
     for current_sort_key, current_sort_dir in zip(sort_keys, sort_dirs):
@@ -150,30 +221,13 @@ def paginate_query(query, model, limit, sort_keys, marker=None,
 
     # Add pagination
     if marker is not None:
-        marker_values = []
-        for sort_key in sort_keys:
-            v = getattr(marker, sort_key)
-            marker_values.append(v)
-
-        # Build up an array of sort criteria as in the docstring
-        criteria_list = []
-        for i in range(len(sort_keys)):
-            crit_attrs = []
-            for j in range(i):
-                model_attr = getattr(model, sort_keys[j])
-                crit_attrs.append((model_attr == marker_values[j]))
-
-            model_attr = getattr(model, sort_keys[i])
-            if sort_dirs[i].startswith('desc'):
-                crit_attrs.append((model_attr < marker_values[i]))
-            else:
-                crit_attrs.append((model_attr > marker_values[i]))
-
-            criteria = sqlalchemy.sql.and_(*crit_attrs)
-            criteria_list.append(criteria)
+        marker_values = [getattr(marker, sort_key) for sort_key in sort_keys]
 
-        f = sqlalchemy.sql.or_(*criteria_list)
-        query = query.filter(f)
+    if marker_values is not None:
+        assert(len(marker_values) == len(sort_keys))
+        row_values = _row_values_supported(query, sort_dirs)
+        query = query.filter(_marker_criteria(model, sort_keys, sort_dirs,
+                                              marker_values, row_values))
 
     if limit is not None:
         query = query.limit(limit)
@@ -181,6 +235,45 @@ def paginate_query(query, model, limit, sort_keys, marker=None,
     return query
 
 
+def iterate_query(query, model, sort_keys, page_size=1000, sort_dir=None,
+                  sort_dirs=None):
+    """Iterate over all the results of a query, one page at a time.
+
+    The results are fetched page_size at a time with paginate_query(), each
+    page starting after the sort keys values of the last result of the
+    previous one, so walking a large table only keeps a page in memory and
+    doesn't slow down with the offset like LIMIT / OFFSET does.  The
+    sort_keys must be unique and, as for paginate_query() markers, not NULL.
+
+    :param query: the query object to iterate over
+    :param model: the ORM model class
+    :param sort_keys: array of attributes by which results should be sorted
+    :param page_size: the number of results fetched at a time
+    :param sort_dir: direction in which results should be sorted, see
+                     paginate_query()
+    :param sort_dirs: per-column array of sort_dirs, corresponding to sort_keys
+
+    :return: a generator of the results of the query
+    """
+    if page_size < 1:
+        raise ValueError(_("page_size must be a positive integer"))
+    sort_dirs = _get_sort_dirs(sort_keys, sort_dir, sort_dirs)
+    ordered = paginate_query(query, model, None, sort_keys,
+                             sort_dirs=sort_dirs)
+    row_values = _row_values_supported(query, sort_dirs)
+    page = ordered.limit(page_size).all()
+    while page:
+        for result in page:
+            yield result
+        if len(page) < page_size:
+            return
+        marker_values = [getattr(page[-1], sort_key)
+                         for sort_key in sort_keys]
+        criteria = _marker_criteria(model, sort_keys, sort_dirs,
+                                    marker_values, row_values)
+        page = ordered.filter(criteria).limit(page_size).all()
+
+
 def to_list(x, default=None):
     if x is None:
         return default
@@ -404,46 +497,90 @@ def _get_not_supported_column(col_name_col_instance, column_name):
     return column
 
 
+def _null_safe_equal(left, right):
+    if not (left.nullable or right.nullable):
+        return left == right
+    # NOTE: GROUP BY gathers the NULL values in the same group, the
+    # comparison is rendered as IS on SQLite and <=> on MySQL, which
+    # unlike an OR of IS NULL can be resolved with an index.
+    # isnot_distinct_from() is only available since SQLAlchemy 1.1.
+    if compat_utils.sqla_110:
+        return left.isnot_distinct_from(right)
+    is_none = None  # workaround for pyflakes
+    return sqlalchemy.sql.or_(
+        sqlalchemy.sql.and_(left == is_none, right == is_none),
+        left == right)
+
+
 def drop_old_duplicate_entries_from_table(migrate_engine, table_name,
-                                          use_soft_delete, *uc_column_names):
+                                          use_soft_delete, *uc_column_names,
+                                          **kwargs):
     """Drop all old rows having the same values for columns in uc_columns.
 
     This method drop (or mark ad `deleted` if use_soft_delete is True) old
     duplicate rows form table with name `table_name`.
 
+    The rows are removed by one statement per range of batch_size ids, rather
+    than by statements per group of duplicated rows, each of them removing
+    the rows of the range whose id isn't the biggest of their group.
+
     :param migrate_engine:  Sqlalchemy engine
     :param table_name:      Table with duplicates
     :param use_soft_delete: If True - values will be marked as `deleted`,
                             if False - values will be removed from table
     :param uc_column_names: Unique constraint columns
+    :param batch_size:      The number of ids per statement (10000 by
+                            default), all the rows are removed at once if
+                            None or if the ids aren't integers
+    :returns: the number of rows removed
     """
+    batch_size = kwargs.pop('batch_size', 10000)
+    if kwargs:
+        raise TypeError('Unexpected arguments: %s' % ', '.join(kwargs))
+
     meta = MetaData()
     meta.bind = migrate_engine
 
     table = Table(table_name, meta, autoload=True)
     columns_for_group_by = [table.c[name] for name in uc_column_names]
 
-    columns_for_select = [func.max(table.c.id)]
+    columns_for_select = [func.max(table.c.id).label('max_id')]
     columns_for_select.extend(columns_for_group_by)
 
     duplicated_rows_select = sqlalchemy.sql.select(
         columns_for_select, group_by=columns_for_group_by,
-        having=func.count(table.c.id) > 1)
-
-    for row in migrate_engine.execute(duplicated_rows_select).fetchall():
-        # NOTE(boris-42): Do not remove row that has the biggest ID.
-        delete_condition = table.c.id != row[0]
-        is_none = None  # workaround for pyflakes
-        delete_condition &= table.c.deleted_at == is_none
-        for name in uc_column_names:
-            delete_condition &= table.c[name] == row[name]
-
-        rows_to_delete_select = sqlalchemy.sql.select(
-            [table.c.id]).where(delete_condition)
-        for row in migrate_engine.execute(rows_to_delete_select).fetchall():
-            LOG.info(_LI("Deleting duplicated row with id: %(id)s from table: "
-                         "%(table)s"), dict(id=row[0], table=table_name))
-
+        having=func.count(table.c.id) > 1).alias('duplicated')
+
+    # NOTE(boris-42): Do not remove row that has the biggest ID.
+    duplicate = table.alias('duplicate')
+    is_none = None  # workaround for pyflakes
+    join_condition = [duplicate.c.id != duplicated_rows_select.c.max_id,
+                      duplicate.c.deleted_at == is_none]
+    for name in uc_column_names:
+        join_condition.append(_null_safe_equal(duplicate.c[name],
+                                               duplicated_rows_select.c[name]))
+    rows_to_delete_select = sqlalchemy.sql.select([duplicate.c.id]).\
+        select_from(duplicate.join(duplicated_rows_select,
+                                   sqlalchemy.sql.and_(*join_condition)))
+
+    ranges = [(None, None)]
+    if batch_size and isinstance(table.c.id.type, Integer):
+        min_id, max_id = migrate_engine.execute(
+            sqlalchemy.sql.select([func.min(table.c.id),
+                                   func.max(table.c.id)])).first()
+        if min_id is None:
+            return 0
+        ranges = [(low, low + batch_size)
+                  for low in six.moves.range(min_id, max_id + 1, batch_size)]
+
+    removed = 0
+    for low, high in ranges:
+        select = rows_to_delete_select
+        if low is not None:
+            select = select.where(sqlalchemy.sql.and_(duplicate.c.id >= low,
+                                                      duplicate.c.id < high))
+        delete_condition = _duplicate_rows_condition(migrate_engine, table,
+                                                     select)
         if use_soft_delete:
             delete_statement = table.update().\
                 where(delete_condition).\
@@ -454,7 +591,17 @@ def drop_old_duplicate_entries_from_table(migrate_engine, table_name,
                 })
         else:
             delete_statement = table.delete().where(delete_condition)
-        migrate_engine.execute(delete_statement)
+        count = migrate_engine.execute(delete_statement).rowcount
+        removed += count
+        if count and low is not None:
+            LOG.info(_LI("Deleted %(count)d duplicated rows with ids from "
+                         "%(low)s to %(high)s of %(max)s from table: "
+                         "%(table)s"),
+                     dict(count=count, low=low, high=min(high - 1, max_id),
+                          max=max_id, table=table_name))
+    LOG.info(_LI("Deleted %(count)d duplicated rows from table: %(table)s"),
+             dict(count=removed, table=table_name))
+    return removed
 
 
 def _get_default_deleted_value(table):
@@ -1009,6 +1156,37 @@ class DialectMultiFunctionDispatcher(DialectFunctionDispatcher):
 dispatch_for_dialect = DialectFunctionDispatcher.dispatch_for_dialect
 
 
+@dispatch_for_dialect('*')
+def _duplicate_rows_condition(engine, table, rows_to_delete_select):
+    return table.c.id.in_(rows_to_delete_select)
+
+
+@_duplicate_rows_condition.dispatch_for('mysql')
+def _duplicate_rows_condition_mysql(engine, table, rows_to_delete_select):
+    # NOTE: MySQL refuses a subquery of the table updated or deleted from,
+    # unless it is materialized in a derived table, DISTINCT keeps the
+    # optimizer from merging the derived table in the outer query
+    duplicates = rows_to_delete_select.distinct().alias('duplicates')
+    return table.c.id.in_(sqlalchemy.sql.select([duplicates.c.id]))
+
+
+@dispatch_for_dialect('*')
+def _row_value_comparison_supported(bind):
+    return False
+
+
+@_row_value_comparison_supported.dispatch_for('mysql')
+@_row_value_comparison_supported.dispatch_for('postgresql')
+def _row_value_comparison_supported_always(bind):
+    return True
+
+
+@_row_value_comparison_supported.dispatch_for('sqlite')
+def _row_value_comparison_supported_sqlite(bind):
+    # NOTE: row values were introduced by SQLite 3.15
+    return bind.dialect.dbapi.sqlite_version_info >= (3, 15)
+
+
 def get_non_innodb_tables(connectable, skip_tables=('migrate_version',
                                                     'alembic_version')):
     """Get a list of tables which don't use InnoDB storage engine.
@@ -0,0 +1,160 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+import shutil
+import tempfile
+
+from oslotest import base as test_base
+import sqlalchemy as sa
+from sqlalchemy.ext.declarative import declarative_base
+
+from oslo_db.sqlalchemy import cache
+from oslo_db.sqlalchemy import orm
+
+BASE = declarative_base()
+
+
+class Flavor(BASE):
+    __tablename__ = 'flavors'
+
+    id = sa.Column(sa.Integer, primary_key=True)
+    name = sa.Column(sa.String(64))
+
+
+class BackendGenerationMixin(object):
+
+    def _get_backend(self):
+        raise NotImplementedError()
+
+    def setUp(self):
+        super(BackendGenerationMixin, self).setUp()
+        self.backend = self._get_backend()
+
+    def test_set_after_invalidate(self):
+        generation = self.backend.generation()
+        self.backend.invalidate(['flavors'])
+        self.backend.set('key', b'stale', 60, ['flavors'],
+                         generation=generation)
+        self.assertIsNone(self.backend.get('key'))
+
+    def test_set_after_clear(self):
+        generation = self.backend.generation()
+        self.backend.clear()
+        self.backend.set('key', b'stale', 60, ['flavors'],
+                         generation=generation)
+        self.assertIsNone(self.backend.get('key'))
+
+    def test_set_after_invalidate_of_other_table(self):
+        generation = self.backend.generation()
+        self.backend.invalidate(['specs'])
+        self.backend.set('key', b'value', 60, ['flavors'],
+                         generation=generation)
+        self.assertEqual(b'value', self.backend.get('key'))
+
+    def test_set_after_generation(self):
+        self.backend.invalidate(['flavors'])
+        generation = self.backend.generation()
+        self.backend.set('key', b'value', 60, ['flavors'],
+                         generation=generation)
+        self.assertEqual(b'value', self.backend.get('key'))
+
+
+class MemoryBackendGenerationTest(BackendGenerationMixin,
+                                  test_base.BaseTestCase):
+
+    def _get_backend(self):
+        return cache.MemoryBackend()
+
+
+class SharedBackendGenerationTest(BackendGenerationMixin,
+                                  test_base.BaseTestCase):
+
+    def _get_backend(self):
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        return cache.SharedBackend(os.path.join(path, 'cache.db'))
+
+
+class QueryCacheRaceTest(test_base.BaseTestCase):
+
+    def setUp(self):
+        super(QueryCacheRaceTest, self).setUp()
+        # NOTE: the readers must not see the uncommitted changes of the
+        # writer, they can't share the connection of a memory database
+        path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, path)
+        self.engine = sa.create_engine(
+            'sqlite:///%s' % os.path.join(path, 'test.db'))
+        self.addCleanup(self.engine.dispose)
+        BASE.metadata.create_all(self.engine)
+        self.engine.execute(Flavor.__table__.insert(), id=1, name='old')
+        self.query_cache = cache.QueryCache(cache.MemoryBackend())
+        self.query_cache.watch(self.engine)
+        self.maker = orm.get_maker(self.engine)
+
+    def _get_name(self, region, execute=None):
+        session = self.maker()
+        session.info[cache.SESSION_INFO_KEY] = region
+        query = session.query(Flavor).filter_by(id=1)
+        try:
+            if execute is None:
+                return query.one().name
+            return list(region.iterate(query,
+                                       lambda: execute(query)))[0].name
+        finally:
+            session.close()
+
+    def _rename(self, name):
+        with self.engine.begin() as connection:
+            connection.execute(
+                Flavor.__table__.update().values(name=name))
+
+    def test_commit_between_select_and_set(self):
+        def execute(query):
+            rows = list(super(orm.Query, query).__iter__())
+            # a writer commits once the rows are selected, and before they
+            # are stored
+            self._rename('new')
+            return rows
+
+        region = self.query_cache.region('default')
+        self.assertEqual('old', self._get_name(region, execute))
+
+        region = self.query_cache.region('default')
+        self.assertEqual('new', self._get_name(region))
+        statistics = self.query_cache.statistics()
+        self.assertEqual((0, 2), (statistics['hits'], statistics['misses']))
+
+    def test_commit_after_set(self):
+        region = self.query_cache.region('default')
+        self.assertEqual('old', self._get_name(region))
+        self.assertEqual('old', self._get_name(region))
+        self._rename('new')
+        region = self.query_cache.region('default')
+        self.assertEqual('new', self._get_name(region))
+
+    def test_select_during_commit(self):
+        names = []
+
+        def select(connection):
+            # a reader runs once the writer decided to commit, and before
+            # the COMMIT is done
+            names.append(self._get_name(self.query_cache.region('default')))
+
+        sa.event.listen(self.engine, 'commit', select)
+        self._rename('new')
+        sa.event.remove(self.engine, 'commit', select)
+
+        self.assertEqual(['old'], names)
+        region = self.query_cache.region('default')
+        self.assertEqual('new', self._get_name(region))
@@ -0,0 +1,96 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from oslotest import base as test_base
+import sqlalchemy as sa
+
+from oslo_db.sqlalchemy.compat import utils as compat_utils
+from oslo_db.sqlalchemy import utils
+
+
+class DropDuplicateEntriesMixin(object):
+
+    sqla_110 = None
+
+    def setUp(self):
+        super(DropDuplicateEntriesMixin, self).setUp()
+        if self.sqla_110 is not None:
+            self.addCleanup(setattr, compat_utils, 'sqla_110',
+                            compat_utils.sqla_110)
+            compat_utils.sqla_110 = self.sqla_110
+        self.engine = sa.create_engine('sqlite://')
+        self.addCleanup(self.engine.dispose)
+        self.table = sa.Table(
+            'instances', sa.MetaData(),
+            sa.Column('id', sa.Integer, primary_key=True),
+            sa.Column('a', sa.String(16), nullable=True),
+            sa.Column('b', sa.String(16), nullable=False),
+            sa.Column('deleted', sa.Integer, default=0),
+            sa.Column('updated_at', sa.DateTime),
+            sa.Column('deleted_at', sa.DateTime))
+        self.table.create(self.engine)
+        # the NULL values of a form a group of their own
+        self.engine.execute(self.table.insert(), [
+            {'id': 1, 'a': None, 'b': 'x'},
+            {'id': 2, 'a': None, 'b': 'x'},
+            {'id': 3, 'a': None, 'b': 'y'},
+            {'id': 4, 'a': 'p', 'b': 'x'},
+            {'id': 5, 'a': 'p', 'b': 'x'},
+            {'id': 6, 'a': 'p', 'b': 'x'},
+            {'id': 7, 'a': 'p', 'b': 'y'},
+        ])
+
+    def _rows(self):
+        return dict((row.id, row) for row in self.engine.execute(
+            self.table.select()))
+
+    def test_hard_delete(self):
+        removed = utils.drop_old_duplicate_entries_from_table(
+            self.engine, 'instances', False, 'a', 'b')
+        self.assertEqual(3, removed)
+        self.assertEqual([2, 3, 6, 7], sorted(self._rows()))
+
+    def test_hard_delete_by_batch(self):
+        removed = utils.drop_old_duplicate_entries_from_table(
+            self.engine, 'instances', False, 'a', 'b', batch_size=2)
+        self.assertEqual(3, removed)
+        self.assertEqual([2, 3, 6, 7], sorted(self._rows()))
+
+    def test_soft_delete(self):
+        removed = utils.drop_old_duplicate_entries_from_table(
+            self.engine, 'instances', True, 'a', 'b')
+        self.assertEqual(3, removed)
+        rows = self._rows()
+        self.assertEqual(list(range(1, 8)), sorted(rows))
+        for id_ in (1, 4, 5):
+            self.assertEqual(id_, rows[id_].deleted)
+            self.assertIsNotNone(rows[id_].deleted_at)
+        for id_ in (2, 3, 6, 7):
+            self.assertEqual(0, rows[id_].deleted)
+            self.assertIsNone(rows[id_].deleted_at)
+
+        # the rows soft deleted aren't duplicates anymore
+        removed = utils.drop_old_duplicate_entries_from_table(
+            self.engine, 'instances', True, 'a', 'b')
+        self.assertEqual(0, removed)
+
+
+class DropDuplicateEntriesTest(DropDuplicateEntriesMixin,
+                               test_base.BaseTestCase):
+    pass
+
+
+class DropDuplicateEntriesSQLA10Test(DropDuplicateEntriesMixin,
+                                     test_base.BaseTestCase):
+    """The NULL safe comparison without isnot_distinct_from()."""
+
+    sqla_110 = False
@@ -60,7 +60,16 @@ amqp_opts = [
                      'provides such compatibility - it defaults to False in '
                      'Liberty and can be turned on for early adopters with a '
                      'new installations or for testing. Please note, that '
-                     'this option will be removed in the Mitaka release.')
+                     'this option will be removed in the Mitaka release.'),
+    cfg.IntOpt('listener_drain_limit',
+               default=64,
+               help='Maximum number of already delivered messages a listener '
+                    'reads from its connection in a single poll, when the '
+                    'executor asks for a batch of messages. This does not '
+                    'pause consuming: the number of messages the broker '
+                    'delivers ahead of the executor is limited by the '
+                    'prefetch count (rabbit_qos_prefetch_count). 0 means '
+                    'the batch size is the only limit.'),
 ]
 
 UNIQUE_ID = '_unique_id'
@@ -89,20 +98,37 @@ PURPOSE_SEND = 'send'
 
 class ConnectionPool(pool.Pool):
     """Class that implements a Pool of Connections."""
-    def __init__(self, conf, rpc_conn_pool_size, url, connection_cls):
+    def __init__(self, conf, rpc_conn_pool_size, url, connection_cls,
+                 min_size=0, max_idle=0, max_lifetime=0, timeout=None):
         self.connection_cls = connection_cls
         self.conf = conf
         self.url = url
-        super(ConnectionPool, self).__init__(rpc_conn_pool_size)
+        super(ConnectionPool, self).__init__(rpc_conn_pool_size, min_size,
+                                             max_idle, max_lifetime, timeout)
         self.reply_proxy = None
 
-    # TODO(comstud): Timeout connections not used in a while
+    @classmethod
+    def from_conf(cls, conf, driver_conf, url, connection_cls):
+        """Create a connection pool sized by the driver options."""
+        return cls(conf, driver_conf.rpc_conn_pool_size, url, connection_cls,
+                   min_size=driver_conf.rpc_conn_pool_min_size,
+                   max_idle=driver_conf.rpc_conn_pool_max_idle,
+                   max_lifetime=driver_conf.rpc_conn_pool_max_lifetime,
+                   timeout=driver_conf.rpc_conn_pool_timeout or None)
+
     def create(self, purpose=None):
         if purpose is None:
             purpose = PURPOSE_SEND
         LOG.debug('Pool creating new connection')
         return self.connection_cls(self.conf, self.url, purpose)
 
+    def validate(self, connection):
+        return connection.is_alive()
+
+    def dispose(self, connection):
+        LOG.debug('Pool closing connection')
+        connection.close()
+
     def empty(self):
         for item in self.iter_free():
             item.close()
@@ -149,12 +175,8 @@ class ConnectionContext(rpc_common.Connection):
                     self.connection.reset()
                 except Exception:
                     LOG.exception("Fail to reset the connection, drop it")
-                    try:
-                        self.connection.close()
-                    except Exception:
-                        pass
-                    self.connection = self.connection_pool.create()
-                finally:
+                    self.connection_pool.discard(self.connection)
+                else:
                     self.connection_pool.put(self.connection)
             else:
                 try:
@@ -202,11 +224,8 @@ class RpcContext(rpc_common.CommonRpcContext):
 def unpack_context(conf, msg):
     """Unpack context from msg."""
     context_dict = {}
-    for key in list(msg.keys()):
-        key = six.text_type(key)
-        if key.startswith('_context_'):
-            value = msg.pop(key)
-            context_dict[key[9:]] = value
+    for key in [key for key in msg if key.startswith('_context_')]:
+        context_dict[six.text_type(key[9:])] = msg.pop(key)
     context_dict['msg_id'] = msg.pop('_msg_id', None)
     context_dict['reply_q'] = msg.pop('_reply_q', None)
     context_dict['conf'] = conf
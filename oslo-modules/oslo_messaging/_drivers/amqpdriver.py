@@ -15,11 +15,16 @@
 
 __all__ = ['AMQPDriverBase']
 
+import collections
+import functools
 import logging
+import math
 import threading
 import uuid
 
 import cachetools
+import futurist
+from oslo_utils import timeutils
 from six import moves
 
 import oslo_messaging
@@ -27,6 +32,7 @@ from oslo_messaging._drivers import amqp as rpc_amqp
 from oslo_messaging._drivers import base
 from oslo_messaging._drivers import common as rpc_common
 from oslo_messaging._i18n import _
+from oslo_messaging._i18n import _LE
 from oslo_messaging._i18n import _LI
 from oslo_messaging._i18n import _LW
 
@@ -39,6 +45,9 @@ class AMQPIncomingMessage(base.IncomingMessage):
                  obsolete_reply_queues):
         super(AMQPIncomingMessage, self).__init__(listener, ctxt,
                                                   dict(message))
+        # NOTE: reply with the envelope of the request, the caller
+        # understands it.
+        self.envelope_version = message.envelope_version
 
         self.unique_id = unique_id
         self.msg_id = msg_id
@@ -77,7 +86,8 @@ class AMQPIncomingMessage(base.IncomingMessage):
                                   'msg_id': self.msg_id,
                                   'unique_id': unique_id,
                                   'reply_q': self.reply_q})
-                conn.direct_send(self.reply_q, rpc_common.serialize_msg(msg))
+                conn.direct_send(self.reply_q, rpc_common.serialize_msg(
+                    msg, self.envelope_version))
             except rpc_amqp.AMQPDestinationNotFound:
                 self._obsolete_reply_queues.add(self.reply_q, self.msg_id)
         else:
@@ -85,7 +95,8 @@ class AMQPIncomingMessage(base.IncomingMessage):
             # send need this, but I guess this is older than icehouse
             # if this is icehouse, we can drop this at Mitaka
             # if this is havana, we can drop this now.
-            conn.direct_send(self.msg_id, rpc_common.serialize_msg(msg))
+            conn.direct_send(self.msg_id, rpc_common.serialize_msg(
+                msg, self.envelope_version))
 
     def reply(self, reply=None, failure=None, log_failure=True):
         if not self.msg_id:
@@ -169,14 +180,24 @@ class ObsoleteReplyQueuesCache(object):
 
 class AMQPListener(base.Listener):
 
+    # NOTE: how long poll_batch() waits for more messages already sent by
+    # the broker once at least one message is buffered
+    DRAIN_TIMEOUT = 0.001
+
     def __init__(self, driver, conn):
         super(AMQPListener, self).__init__(driver)
         self.conn = conn
         self.msg_id_cache = rpc_amqp._MsgIdCache()
-        self.incoming = []
+        self.incoming = collections.deque()
+        self._drain_limit = driver.listener_drain_limit
         self._stopped = threading.Event()
         self._obsolete_reply_queues = ObsoleteReplyQueuesCache()
 
+    @property
+    def buffer_depth(self):
+        """Number of received messages not returned by poll() yet."""
+        return len(self.incoming)
+
     def __call__(self, message):
         ctxt = rpc_amqp.unpack_context(self.conf, message)
 
@@ -203,13 +224,42 @@ class AMQPListener(base.Listener):
                                                  self._obsolete_reply_queues))
 
     def poll(self, timeout=None):
+        messages = self.poll_batch(1, timeout=timeout)
+        return messages[0] if messages else None
+
+    def poll_batch(self, max_messages, timeout=None):
+        timer = rpc_common.DecayingTimer(duration=timeout)
+        timer.start()
         while not self._stopped.is_set():
             if self.incoming:
-                return self.incoming.pop(0)
+                self._drain(max_messages)
+                return [self.incoming.popleft()
+                        for __ in moves.range(min(max_messages,
+                                                  len(self.incoming)))]
             try:
                 self.conn.consume(timeout=timeout)
             except rpc_common.Timeout:
-                return None
+                return []
+            if timeout is not None:
+                timeout = max(timer.check_return(), 0)
+        return []
+
+    def _drain(self, max_messages):
+        """Read the messages already waiting on the connection until the
+        batch is full or the drain limit is reached.
+
+        This only bounds how many messages a single poll buffers. It is not
+        backpressure: nothing is read while poll() is not called, and the
+        broker keeps delivering up to the prefetch count meanwhile.
+        """
+        limit = max_messages
+        if self._drain_limit:
+            limit = min(limit, self._drain_limit)
+        while len(self.incoming) < limit and not self._stopped.is_set():
+            try:
+                self.conn.consume(timeout=self.DRAIN_TIMEOUT)
+            except rpc_common.Timeout:
+                return
 
     def stop(self):
         self._stopped.set()
@@ -220,42 +270,166 @@ class AMQPListener(base.Listener):
         self.conn.close()
 
 
-class ReplyWaiters(object):
+class ReplyFuture(object):
+    """The outcome of one RPC call, completed by the reply waiter thread.
 
-    WAKE_UP = object()
+    The only synchronization primitive is a lock acquired at creation and
+    released once the call is over, either because the ending reply has been
+    received or because ReplyWaiters expired it. Timeouts are enforced by
+    ReplyWaiters, so result() never needs a timeout of its own.
 
-    def __init__(self):
-        self._queues = {}
-        self._wrn_threshold = 10
+    The optional callback is called with the future once the call is over,
+    from the thread that completed it.
+    """
 
-    def get(self, msg_id, timeout):
-        try:
-            return self._queues[msg_id].get(block=True, timeout=timeout)
-        except moves.queue.Empty:
+    __slots__ = ('msg_id', '_done', '_reply', '_timed_out', '_callback')
+
+    def __init__(self, msg_id, callback=None):
+        self.msg_id = msg_id
+        self._done = threading.Lock()
+        self._done.acquire()
+        self._reply = None
+        self._timed_out = False
+        self._callback = callback
+
+    def set_reply(self, reply):
+        # NOTE(viktors): This can be either first _send_reply() with an
+        # empty `result` field or a second _send_reply() with
+        # ending=True and no `result` field.
+        if reply is not None:
+            self._reply = reply
+
+    def finish(self, timed_out=False):
+        # NOTE: ReplyWaiters guarantees this is called once per future
+        self._timed_out = timed_out
+        self._done.release()
+        if self._callback is not None:
+            try:
+                self._callback(self)
+            except Exception:
+                LOG.exception(_LE("Failed to run the reply callback of "
+                                  "msg_id %s"), self.msg_id)
+
+    def result(self):
+        """Block until the call is over and return the final reply.
+
+        A remote failure is returned as an exception instance, a
+        MessagingTimeout is raised if no ending reply came in time.
+        """
+        with self._done:
+            pass
+        if self._timed_out:
             raise oslo_messaging.MessagingTimeout(
-                'Timed out waiting for a reply '
-                'to message ID %s' % msg_id)
-
-    def put(self, msg_id, message_data):
-        queue = self._queues.get(msg_id)
-        if not queue:
-            LOG.info(_LI('No calling threads waiting for msg_id : %s'), msg_id)
-            LOG.debug(' queues: %(queues)s, message: %(message)s',
-                      {'queues': len(self._queues), 'message': message_data})
+                _('Timed out waiting for a reply to message ID %s.') %
+                self.msg_id)
+        return self._reply
+
+
+def _complete_async_reply(async_reply, reply_future):
+    """Complete the future returned by send_async() from a ReplyFuture."""
+    if not async_reply.set_running_or_notify_cancel():
+        return
+    try:
+        result = reply_future.result()
+    except Exception as exc:
+        async_reply.set_exception(exc)
+    else:
+        if isinstance(result, Exception):
+            async_reply.set_exception(result)
         else:
-            queue.put(message_data)
+            async_reply.set_result(result)
+
+
+class ReplyWaiters(object):
+    """Registry of the RPC calls waiting for a reply.
+
+    Deadlines are kept on a timer wheel of TICK seconds wide slots swept by
+    a single thread, which only runs while calls with a timeout are
+    pending.
+    """
+
+    TICK = 0.1
 
-    def add(self, msg_id):
-        self._queues[msg_id] = moves.queue.Queue()
-        if len(self._queues) > self._wrn_threshold:
-            LOG.warn('Number of call queues is greater than warning '
-                     'threshold: %d. There could be a leak. Increasing'
-                     ' threshold to: %d', self._wrn_threshold,
-                     self._wrn_threshold * 2)
-            self._wrn_threshold *= 2
+    def __init__(self):
+        self._futures = {}
+        self._wheel = collections.defaultdict(list)
+        self._lock = threading.Lock()
+        self._wrn_threshold = 10
+        self._sweeper_wakeup = threading.Event()
+        self._sweeper_exit_event = threading.Event()
+        self._sweeper = None
+
+    def add(self, msg_id, timeout=None, callback=None):
+        future = ReplyFuture(msg_id, callback)
+        with self._lock:
+            self._futures[msg_id] = future
+            if timeout is not None:
+                slot = int(math.ceil((timeutils.now() + timeout) / self.TICK))
+                self._wheel[slot].append(msg_id)
+                self._ensure_sweeper()
+            if len(self._futures) > self._wrn_threshold:
+                LOG.warn('Number of call waiters is greater than warning '
+                         'threshold: %d. There could be a leak. Increasing'
+                         ' threshold to: %d', self._wrn_threshold,
+                         self._wrn_threshold * 2)
+                self._wrn_threshold *= 2
+        return future
+
+    def get(self, msg_id, ending=False):
+        """Return the future of msg_id, ending=True removes it from the
+        registry so the caller becomes responsible for finishing it.
+        """
+        with self._lock:
+            if ending:
+                return self._futures.pop(msg_id, None)
+            return self._futures.get(msg_id)
 
     def remove(self, msg_id):
-        del self._queues[msg_id]
+        with self._lock:
+            future = self._futures.pop(msg_id, None)
+        if future is not None:
+            future.finish(timed_out=True)
+
+    def stop(self):
+        with self._lock:
+            sweeper, self._sweeper = self._sweeper, None
+            futures, self._futures = self._futures, {}
+            self._wheel.clear()
+        if sweeper is not None:
+            self._sweeper_exit_event.set()
+            self._sweeper_wakeup.set()
+            sweeper.join()
+        for future in futures.values():
+            future.finish(timed_out=True)
+
+    def _ensure_sweeper(self):
+        # NOTE: must be called with self._lock held
+        self._sweeper_wakeup.set()
+        if self._sweeper is None:
+            self._sweeper_exit_event.clear()
+            self._sweeper = threading.Thread(target=self._sweep_loop)
+            self._sweeper.daemon = True
+            self._sweeper.start()
+
+    def _sweep_loop(self):
+        while not self._sweeper_exit_event.is_set():
+            self._sweeper_wakeup.wait()
+            self._sweeper_exit_event.wait(self.TICK)
+            self._sweep()
+
+    def _sweep(self):
+        now = int(timeutils.now() / self.TICK)
+        expired = []
+        with self._lock:
+            for slot in [slot for slot in self._wheel if slot <= now]:
+                for msg_id in self._wheel.pop(slot):
+                    future = self._futures.pop(msg_id, None)
+                    if future is not None:
+                        expired.append(future)
+            if not self._wheel:
+                self._sweeper_wakeup.clear()
+        for future in expired:
+            future.finish(timed_out=True)
 
 
 class ReplyWaiter(object):
@@ -278,6 +452,7 @@ class ReplyWaiter(object):
             self.conn.stop_consuming()
             self._thread.join()
             self._thread = None
+            self.waiters.stop()
 
     def poll(self):
         while not self._thread_exit_event.is_set():
@@ -290,65 +465,184 @@ class ReplyWaiter(object):
     def __call__(self, message):
         message.acknowledge()
         incoming_msg_id = message.pop('_msg_id', None)
-        if message.get('ending'):
+        ending = message.get('ending', False)
+        if ending:
             LOG.debug("received reply msg_id: %s" % incoming_msg_id)
-        self.waiters.put(incoming_msg_id, message)
 
-    def listen(self, msg_id):
-        self.waiters.add(msg_id)
+        future = self.waiters.get(incoming_msg_id, ending=ending)
+        if future is None:
+            LOG.info(_LI('No calling threads waiting for msg_id : %s'),
+                     incoming_msg_id)
+            LOG.debug(' message: %s', message)
+            return
 
-    def unlisten(self, msg_id):
-        self.waiters.remove(msg_id)
+        try:
+            future.set_reply(self._process_reply(message))
+        except rpc_common.DuplicateMessageError:
+            LOG.info(_LI('Found duplicate reply to msg_id %s, skipping it.'),
+                     incoming_msg_id)
+        finally:
+            if ending:
+                future.finish()
 
-    @staticmethod
-    def _raise_timeout_exception(msg_id):
-        raise oslo_messaging.MessagingTimeout(
-            _('Timed out waiting for a reply to message ID %s.') % msg_id)
+    def listen(self, msg_id, timeout=None, callback=None):
+        """Start waiting for the replies to msg_id.
 
-    def _process_reply(self, data):
-        self.msg_id_cache.check_duplicate_message(data)
-        if data['failure']:
-            failure = data['failure']
-            result = rpc_common.deserialize_remote_exception(
-                failure, self.allowed_remote_exmods)
-        else:
-            result = data.get('result', None)
+        Returns a ReplyFuture completed when the ending reply is received,
+        or expired after timeout seconds.
+        """
+        return self.waiters.add(msg_id, timeout, callback)
 
-        ending = data.get('ending', False)
-        return result, ending
+    def unlisten(self, msg_id):
+        self.waiters.remove(msg_id)
 
-    def wait(self, msg_id, timeout):
+    def _process_reply(self, data):
         # NOTE(sileht): for each msg_id we receive two amqp message
         # first one with the payload, a second one to ensure the other
         # have finish to send the payload
         # NOTE(viktors): We are going to remove this behavior in the N
         # release, but we need to keep backward compatibility, so we should
         # support both cases for now.
-        timer = rpc_common.DecayingTimer(duration=timeout)
-        timer.start()
-        final_reply = None
-        ending = False
-        while not ending:
-            timeout = timer.check_return(self._raise_timeout_exception, msg_id)
-            try:
-                message = self.waiters.get(msg_id, timeout=timeout)
-            except moves.queue.Empty:
-                self._raise_timeout_exception(msg_id)
+        self.msg_id_cache.check_duplicate_message(data)
+        if data['failure']:
+            failure = data['failure']
+            return rpc_common.deserialize_remote_exception(
+                failure, self.allowed_remote_exmods)
+        return data.get('result', None)
+
 
-            reply, ending = self._process_reply(message)
-            if reply is not None:
-                # NOTE(viktors): This can be either first _send_reply() with an
-                # empty `result` field or a second _send_reply() with
-                # ending=True and no `result` field.
-                final_reply = reply
-        return final_reply
+class BatchPublisher(object):
+    """Coalesce casts and notifications sent to the same destination.
+
+    Messages are grouped by send method, exchange and routing key. A group
+    is published through a single pooled connection as soon as it holds
+    batch_size messages, or by a background thread once it has been
+    waiting for batch_window seconds.
+
+    The object mimics the send methods of a pooled connection so
+    AMQPDriverBase._send() can use it in place of a ConnectionContext.
+
+    Batched sends are fire-and-forget: the messages of a batch which could
+    not be published are logged and queued again for the next flush, they
+    are dropped once the batch has failed max_attempts times in a row. The
+    messages the broker already confirmed are not sent again.
+    """
+
+    max_attempts = 3
+
+    def __init__(self, driver, batch_size, batch_window):
+        self._driver = driver
+        self._batch_size = batch_size
+        self._batch_window = batch_window
+        self._lock = threading.Lock()
+        self._pending = collections.OrderedDict()
+        self._attempts = {}
+        self._flush_exit_event = threading.Event()
+        self._flush_thread = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        pass
+
+    def topic_send(self, exchange_name, topic, msg, timeout=None,
+                   retry=None):
+        self._submit('topic_send_batch', (exchange_name, topic), msg, retry)
+
+    def fanout_send(self, topic, msg, retry=None):
+        self._submit('fanout_send_batch', (topic,), msg, retry)
+
+    def notify_send(self, exchange_name, topic, msg, retry=None, **kwargs):
+        self._submit('notify_send_batch', (exchange_name, topic), msg, retry)
+
+    def _submit(self, method, args, msg, retry):
+        key = (method, args, retry)
+        with self._lock:
+            msgs = self._pending.setdefault(key, [])
+            msgs.append(msg)
+            if len(msgs) < self._batch_size:
+                self._ensure_flush_thread()
+                return
+            del self._pending[key]
+        self._publish(key, msgs)
+
+    def _ensure_flush_thread(self):
+        # NOTE: must be called with self._lock held
+        if self._flush_thread is None:
+            self._flush_exit_event.clear()
+            self._flush_thread = threading.Thread(target=self._flush_loop)
+            self._flush_thread.daemon = True
+            self._flush_thread.start()
+
+    def _publish(self, key, msgs, requeue=True):
+        method, args, retry = key
+        # NOTE: the connection removes the messages from the deque as they
+        # are confirmed, only the others are retried
+        unsent = collections.deque(msgs)
+        try:
+            with self._driver._get_connection(rpc_amqp.PURPOSE_SEND) as conn:
+                getattr(conn, method)(*(args + (unsent,)), retry=retry)
+        except Exception:
+            self._publish_failed(key, list(unsent), requeue)
+        else:
+            with self._lock:
+                self._attempts.pop(key, None)
+
+    def _publish_failed(self, key, msgs, requeue):
+        log_args = {'count': len(msgs), 'method': key[0], 'args': key[1]}
+        with self._lock:
+            attempts = self._attempts.pop(key, 0) + 1
+            if requeue and attempts < self.max_attempts:
+                self._attempts[key] = attempts
+                # NOTE: put the batch back in front of the messages sent
+                # since it was taken, to keep them in order
+                self._pending[key] = msgs + self._pending.get(key, [])
+                self._ensure_flush_thread()
+                LOG.warning(_LW("Failed to publish a batch of %(count)d "
+                                "messages with %(method)s%(args)s, it will "
+                                "be retried on the next flush"), log_args,
+                            exc_info=True)
+                return
+        LOG.exception(_LE("Failed to publish a batch of %(count)d messages "
+                          "with %(method)s%(args)s, dropping it"), log_args)
+
+    def _flush_loop(self):
+        while not self._flush_exit_event.wait(self._batch_window):
+            self.flush()
+
+    def flush(self, requeue=True):
+        """Publish all pending messages now.
+
+        The batches which fail to be published are queued again for the
+        next flush, unless requeue is False, in which case they are dropped.
+        """
+        with self._lock:
+            pending, self._pending = (self._pending,
+                                      collections.OrderedDict())
+        for key, msgs in pending.items():
+            self._publish(key, msgs, requeue=requeue)
+
+    def stop(self):
+        """Stop the background flush and publish what is still pending."""
+        with self._lock:
+            thread, self._flush_thread = self._flush_thread, None
+        if thread is not None:
+            self._flush_exit_event.set()
+            thread.join()
+        self.flush(requeue=False)
 
 
 class AMQPDriverBase(base.BaseDriver):
 
     def __init__(self, conf, url, connection_pool,
                  default_exchange=None, allowed_remote_exmods=None,
-                 send_single_reply=False):
+                 send_single_reply=False, publish_batch_size=0,
+                 publish_batch_window=None, listener_drain_limit=0,
+                 envelope_version=rpc_common._RPC_ENVELOPE_VERSION,
+                 listener_prefetch_count=0,
+                 notification_listener_prefetch_count=0,
+                 ack_batch_size=0, ack_batch_window=None):
         super(AMQPDriverBase, self).__init__(conf, url, default_exchange,
                                              allowed_remote_exmods)
 
@@ -362,6 +656,20 @@ class AMQPDriverBase(base.BaseDriver):
         self._waiter = None
 
         self.send_single_reply = send_single_reply
+        self.listener_drain_limit = listener_drain_limit
+        self.envelope_version = envelope_version
+        self.listener_prefetch_count = listener_prefetch_count
+        self.notification_listener_prefetch_count = (
+            notification_listener_prefetch_count)
+        self.ack_batch_size = ack_batch_size
+        self.ack_batch_window = ack_batch_window
+
+        # NOTE: casts and notifications are only coalesced when the
+        # driver's connection class provides the *_send_batch() methods
+        self._batch_publisher = None
+        if publish_batch_size > 1:
+            self._batch_publisher = BatchPublisher(self, publish_batch_size,
+                                                   publish_batch_window)
 
     def _get_exchange(self, target):
         return target.exchange or self._default_exchange
@@ -389,7 +697,7 @@ class AMQPDriverBase(base.BaseDriver):
 
     def _send(self, target, ctxt, message,
               wait_for_reply=None, timeout=None,
-              envelope=True, notify=False, retry=None):
+              envelope=True, notify=False, retry=None, async_reply=None):
 
         # FIXME(markmc): remove this temporary hack
         class Context(object):
@@ -413,16 +721,30 @@ class AMQPDriverBase(base.BaseDriver):
         rpc_amqp.pack_context(msg, context)
 
         if envelope:
-            msg = rpc_common.serialize_msg(msg)
+            # NOTE: notifications keep the '2.0' envelope, their consumers
+            # are not necessarily oslo.messaging services.
+            msg = rpc_common.serialize_msg(
+                msg, (rpc_common._RPC_ENVELOPE_VERSION if notify
+                      else self.envelope_version))
 
         if wait_for_reply:
-            self._waiter.listen(msg_id)
+            callback = None
+            if async_reply is not None:
+                callback = functools.partial(_complete_async_reply,
+                                             async_reply)
+            future = self._waiter.listen(msg_id, timeout, callback)
             log_msg = "CALL msg_id: %s " % msg_id
         else:
             log_msg = "CAST unique_id: %s " % unique_id
 
+        unlisten = wait_for_reply
         try:
-            with self._get_connection(rpc_amqp.PURPOSE_SEND) as conn:
+            if wait_for_reply or self._batch_publisher is None:
+                publisher = self._get_connection(rpc_amqp.PURPOSE_SEND)
+            else:
+                publisher = self._batch_publisher
+
+            with publisher as conn:
                 if notify:
                     exchange = self._get_exchange(target)
                     log_msg += "NOTIFY exchange '%(exchange)s'" \
@@ -449,13 +771,17 @@ class AMQPDriverBase(base.BaseDriver):
                     conn.topic_send(exchange_name=exchange, topic=topic,
                                     msg=msg, timeout=timeout, retry=retry)
 
+            if async_reply is not None:
+                # NOTE: from now on the reply waiter owns the call
+                unlisten = False
+                return async_reply
             if wait_for_reply:
-                result = self._waiter.wait(msg_id, timeout)
+                result = future.result()
                 if isinstance(result, Exception):
                     raise result
                 return result
         finally:
-            if wait_for_reply:
+            if unlisten:
                 self._waiter.unlisten(msg_id)
 
     def send(self, target, ctxt, message, wait_for_reply=None, timeout=None,
@@ -463,12 +789,27 @@ class AMQPDriverBase(base.BaseDriver):
         return self._send(target, ctxt, message, wait_for_reply, timeout,
                           retry=retry)
 
+    def send_async(self, target, ctxt, message, timeout=None, retry=None):
+        return self._send(target, ctxt, message, wait_for_reply=True,
+                          timeout=timeout, retry=retry,
+                          async_reply=futurist.Future())
+
     def send_notification(self, target, ctxt, message, version, retry=None):
         return self._send(target, ctxt, message,
                           envelope=(version == 2.0), notify=True, retry=retry)
 
-    def listen(self, target):
+    def _get_listener_connection(self, prefetch_count):
         conn = self._get_connection(rpc_amqp.PURPOSE_LISTEN)
+        # NOTE: prefetch and ack batching are only requested when the
+        # driver's connection class provides set_qos()/set_ack_batching()
+        if prefetch_count > 0:
+            conn.set_qos(prefetch_count)
+        if self.ack_batch_size > 1:
+            conn.set_ack_batching(self.ack_batch_size, self.ack_batch_window)
+        return conn
+
+    def listen(self, target):
+        conn = self._get_listener_connection(self.listener_prefetch_count)
 
         listener = AMQPListener(self, conn)
 
@@ -484,7 +825,8 @@ class AMQPDriverBase(base.BaseDriver):
         return listener
 
     def listen_for_notifications(self, targets_and_priorities, pool):
-        conn = self._get_connection(rpc_amqp.PURPOSE_LISTEN)
+        conn = self._get_listener_connection(
+            self.notification_listener_prefetch_count)
 
         listener = AMQPListener(self, conn)
         for target, priority in targets_and_priorities:
@@ -494,7 +836,16 @@ class AMQPDriverBase(base.BaseDriver):
                 callback=listener, queue_name=pool)
         return listener
 
+    def get_statistics(self):
+        stats = {}
+        if self._connection_pool:
+            stats['connection_pool'] = self._connection_pool.get_statistics()
+        return stats
+
     def cleanup(self):
+        if self._batch_publisher is not None:
+            self._batch_publisher.stop()
+
         if self._connection_pool:
             self._connection_pool.empty()
         self._connection_pool = None
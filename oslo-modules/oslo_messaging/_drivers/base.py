@@ -14,7 +14,9 @@
 #    under the License.
 
 import abc
+import threading
 
+import futurist
 import six
 
 from oslo_config import cfg
@@ -25,6 +27,26 @@ base_opts = [
                default=30,
                deprecated_group='DEFAULT',
                help='Size of RPC connection pool.'),
+    cfg.IntOpt('rpc_conn_pool_min_size',
+               default=0,
+               help='Number of connections the RPC connection pool keeps '
+                    'open, idle connections are not closed below this '
+                    'number. 0 opens connections only when they are '
+                    'needed.'),
+    cfg.IntOpt('rpc_conn_pool_max_idle',
+               default=1200,
+               help='Seconds after which an unused connection of the RPC '
+                    'connection pool is closed. 0 means never.'),
+    cfg.IntOpt('rpc_conn_pool_max_lifetime',
+               default=0,
+               help='Seconds after which a connection of the RPC connection '
+                    'pool is closed and replaced, whether it is used or '
+                    'not. 0 means never.'),
+    cfg.IntOpt('rpc_conn_pool_timeout',
+               default=0,
+               help='Seconds to wait for a free connection when the RPC '
+                    'connection pool is exhausted, before the send fails '
+                    'with a MessagingTimeout. 0 means wait forever.'),
 ]
 
 
@@ -67,6 +89,28 @@ class Listener(object):
         ending or if the listener have been stopped.
         """
 
+    def poll_batch(self, max_messages, timeout=None):
+        """Blocking until a message is pending and return a list of at most
+        max_messages IncomingMessage. Return an empty list after timeout
+        seconds if timeout is set and no message is pending or if the
+        listener have been stopped.
+
+        Drivers able to fetch several messages at once should override this,
+        the default implementation returns one message per call.
+        """
+        message = self.poll(timeout=timeout)
+        return [message] if message is not None else []
+
+    def poll_async(self, loop):
+        """Return an asyncio future of the next IncomingMessage, resolved
+        with None if the listener have been stopped.
+
+        Drivers able to poll from an asyncio event loop should override this,
+        the default implementation runs poll() in the default executor of the
+        loop.
+        """
+        return loop.run_in_executor(None, self.poll)
+
     def stop(self):
         """Stop listener.
         Stop the listener message polling
@@ -91,6 +135,8 @@ class BaseDriver(object):
         self._url = url
         self._default_exchange = default_exchange
         self._allowed_remote_exmods = allowed_remote_exmods or []
+        self._async_executor = None
+        self._async_executor_lock = threading.Lock()
 
     def require_features(self, requeue=False):
         if requeue:
@@ -102,6 +148,42 @@ class BaseDriver(object):
              wait_for_reply=None, timeout=None, envelope=False):
         """Send a message to the given target."""
 
+    def send_async(self, target, ctxt, message, timeout=None, retry=None):
+        """Send a message to the given target and return a future of the
+        reply.
+
+        Drivers able to keep several calls in flight from one thread should
+        override this, the default implementation runs a blocking send() in
+        a thread pool.
+        """
+        with self._async_executor_lock:
+            if self._async_executor is None:
+                self._async_executor = futurist.ThreadPoolExecutor()
+        return self._async_executor.submit(self.send, target, ctxt, message,
+                                           wait_for_reply=True,
+                                           timeout=timeout, retry=retry)
+
+    def _shutdown_async_executor(self, wait=True):
+        """Shut down the thread pool of the default send_async(), if any.
+
+        Drivers relying on the default send_async() must call this from
+        cleanup().
+        """
+        with self._async_executor_lock:
+            executor, self._async_executor = self._async_executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def send_many(self, target, ctxt, messages, timeout=None, retry=None):
+        """Send several messages to the given target, without waiting for
+        any reply.
+
+        Drivers able to have several messages in flight at once should
+        override this, the default implementation sends them one by one.
+        """
+        for message in messages:
+            self.send(target, ctxt, message, timeout=timeout, retry=retry)
+
     @abc.abstractmethod
     def send_notification(self, target, ctxt, message, version):
         """Send a notification message to the given target."""
@@ -116,6 +198,10 @@ class BaseDriver(object):
         tuple of (target, priority).
         """
 
+    def get_statistics(self):
+        """Return a dict of statistics about the driver resources."""
+        return {}
+
     @abc.abstractmethod
     def cleanup(self):
         """Release all resources."""
@@ -63,8 +63,17 @@ payload.
 We will JSON encode the application message payload.  The message envelope,
 which includes the JSON encoded application message body, will be passed down
 to the messaging libraries as a dict.
+
+Message format version '3.0' drops the JSON encoded body: the application
+message dict itself is handed to the driver as a BinaryEnvelope, which the
+driver encodes once in a binary format (msgpack) and tags with a content type
+naming that format. Drivers without a binary format send it as a plain dict,
+which receivers handle as a '1.0' message. Peers only understanding '2.0'
+can't decode '3.0' messages, so it is only sent when configured, and replies
+use the envelope version of the request.
 '''
 _RPC_ENVELOPE_VERSION = '2.0'
+_BINARY_ENVELOPE_VERSION = '3.0'
 
 _VERSION_KEY = 'oslo.version'
 _MESSAGE_KEY = 'oslo.message'
@@ -279,9 +288,19 @@ class ClientException(Exception):
         self._exc_info = sys.exc_info()
 
 
-def serialize_msg(raw_msg):
+class BinaryEnvelope(dict):
+    """A message to send in a '3.0' envelope.
+
+    The driver encodes the whole dict at once in its binary format.
+    """
+
+
+def serialize_msg(raw_msg, version=_RPC_ENVELOPE_VERSION):
     # NOTE(russellb) See the docstring for _RPC_ENVELOPE_VERSION for more
     # information about this format.
+    if version == _BINARY_ENVELOPE_VERSION:
+        return BinaryEnvelope(raw_msg)
+
     msg = {_VERSION_KEY: _RPC_ENVELOPE_VERSION,
            _MESSAGE_KEY: jsonutils.dumps(raw_msg)}
 
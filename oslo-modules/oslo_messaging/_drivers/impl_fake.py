@@ -78,6 +78,20 @@ class FakeListener(base.Listener):
             time.sleep(pause)
         return None
 
+    def poll_async(self, loop):
+        future = loop.create_future()
+        self._poll_async(loop, future)
+        return future
+
+    def _poll_async(self, loop, future):
+        if future.cancelled():
+            return
+        message = self.poll(timeout=0)
+        if message is not None or self._stopped.is_set():
+            future.set_result(message)
+        else:
+            loop.call_later(0.01, self._poll_async, loop, future)
+
     def stop(self):
         self._stopped.set()
 
@@ -244,4 +258,4 @@ class FakeDriver(base.BaseDriver):
         return listener
 
     def cleanup(self):
-        pass
+        self._shutdown_async_executor()
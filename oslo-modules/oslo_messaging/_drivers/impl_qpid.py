@@ -110,6 +110,8 @@ def raise_invalid_topology_version(conf):
 
 
 class QpidMessage(dict):
+    envelope_version = rpc_common._RPC_ENVELOPE_VERSION
+
     def __init__(self, session, raw_message):
         super(QpidMessage, self).__init__(
             rpc_common.deserialize_msg(raw_message.content))
@@ -633,6 +635,10 @@ class Connection(object):
             pass
         self.connection = None
 
+    def is_alive(self):
+        """Return whether the connection to the broker is still usable."""
+        return self.connection is not None and self.connection.opened()
+
     def reset(self):
         """Reset a connection so it can be used again."""
         self.session.close()
@@ -786,15 +792,16 @@ class QpidDriver(amqpdriver.AMQPDriverBase):
         conf.register_opts(qpid_opts, group=opt_group)
         conf.register_opts(rpc_amqp.amqp_opts, group=opt_group)
         conf.register_opts(base.base_opts, group=opt_group)
+        driver_conf = conf.oslo_messaging_qpid
 
-        connection_pool = rpc_amqp.ConnectionPool(
-            conf, conf.oslo_messaging_qpid.rpc_conn_pool_size,
-            url, Connection)
+        connection_pool = rpc_amqp.ConnectionPool.from_conf(
+            conf, driver_conf, url, Connection)
 
         super(QpidDriver, self).__init__(
             conf, url,
             connection_pool,
             default_exchange,
             allowed_remote_exmods,
-            conf.oslo_messaging_qpid.send_single_reply,
+            driver_conf.send_single_reply,
+            listener_drain_limit=driver_conf.listener_drain_limit,
         )
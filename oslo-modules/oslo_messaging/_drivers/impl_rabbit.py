@@ -15,6 +15,7 @@
 import collections
 import contextlib
 import functools
+import math
 import os
 import socket
 import ssl
@@ -26,9 +27,12 @@ import kombu
 import kombu.connection
 import kombu.entity
 import kombu.messaging
+import kombu.serialization
 from oslo_config import cfg
 from oslo_log import log as logging
+from oslo_serialization import msgpackutils
 from oslo_utils import netutils
+from oslo_utils import timeutils
 import six
 from six.moves.urllib import parse
 
@@ -145,6 +149,51 @@ rabbit_opts = [
                default=2,
                help='How often times during the heartbeat_timeout_threshold '
                'we check the heartbeat.'),
+    cfg.IntOpt('rabbit_publish_batch_size',
+               default=0,
+               help='Maximum number of casts and notifications sent to the '
+                    'same exchange and routing key that are coalesced and '
+                    'published together through a single producer. 0 '
+                    'disables batching and publishes every message as soon '
+                    'as it is sent. Batched sends are fire-and-forget: '
+                    'publishing errors are only logged, and a batch which '
+                    'failed to be published is retried on the next flush '
+                    'before being dropped.'),
+    cfg.IntOpt('rabbit_qos_prefetch_count',
+               default=0,
+               help='Maximum number of unacknowledged messages the broker '
+                    'delivers to an RPC server. 0 means no limit.'),
+    cfg.IntOpt('rabbit_notification_qos_prefetch_count',
+               default=0,
+               help='Maximum number of unacknowledged messages the broker '
+                    'delivers to a notification listener. 0 means no '
+                    'limit.'),
+    cfg.IntOpt('rabbit_ack_batch_size',
+               default=0,
+               help='Number of processed messages a listener acknowledges '
+                    'with a single basic.ack. 0 or 1 acknowledges every '
+                    'message on its own. The batch is never larger than '
+                    'the prefetch count.'),
+    cfg.FloatOpt('rabbit_ack_batch_window',
+                 default=0.1,
+                 help='Maximum number of seconds a processed message waits '
+                      'for its batch to be acknowledged. Only used when '
+                      'rabbit_ack_batch_size is greater than 1.'),
+    cfg.StrOpt('rabbit_envelope_version',
+               default=rpc_common._RPC_ENVELOPE_VERSION,
+               choices=(rpc_common._RPC_ENVELOPE_VERSION,
+                        rpc_common._BINARY_ENVELOPE_VERSION),
+               help='Envelope of the RPC messages sent. 2.0 sends the '
+                    'message JSON encoded inside a JSON envelope, 3.0 '
+                    'encodes it once with msgpack. Only use 3.0 once all '
+                    'the services understand it, replies always use the '
+                    'envelope of the request.'),
+    cfg.FloatOpt('rabbit_publish_batch_window',
+                 default=0.05,
+                 help='Maximum number of seconds a cast or notification '
+                      'waits in a publish batch before being sent to the '
+                      'broker. Only used when rabbit_publish_batch_size is '
+                      'greater than 1.'),
 
     # NOTE(sileht): deprecated option since oslo_messaging 1.5.0,
     cfg.BoolOpt('fake_rabbit',
@@ -171,20 +220,151 @@ def _get_queue_arguments(rabbit_ha_queues):
     return {'x-ha-policy': 'all'} if rabbit_ha_queues else {}
 
 
+# NOTE: kombu encodes the '3.0' envelopes with this serializer and decodes
+# them according to their content type.
+MSGPACK_SERIALIZER = 'oslo.msgpack'
+MSGPACK_CONTENT_TYPE = 'application/x-oslo-msgpack'
+
+kombu.serialization.register(MSGPACK_SERIALIZER,
+                             msgpackutils.dumps, msgpackutils.loads,
+                             content_type=MSGPACK_CONTENT_TYPE,
+                             content_encoding='binary')
+
+
+def _exchange_key(exchange):
+    return (exchange.name, exchange.type, exchange.durable,
+            exchange.auto_delete)
+
+
+def _get_serializer(msg):
+    if isinstance(msg, rpc_common.BinaryEnvelope):
+        return MSGPACK_SERIALIZER
+    return None
+
+
+class AckBatcher(object):
+    """Acknowledge the messages received on a channel by batches.
+
+    Processed messages are acknowledged together by a single basic.ack with
+    the multiple flag, once batch_size of them are ready or the oldest has
+    waited batch_window seconds. Such an ack covers every message delivered
+    before, so only the run of processed messages following the last ack is
+    acknowledged, never a message still being processed.
+    """
+
+    def __init__(self, batch_size, batch_window):
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self._lock = threading.Lock()
+        self._channel = None
+        # NOTE: messages are tracked rather than their delivery tags, some
+        # kombu transports redeliver a requeued message with the same tag
+        self._delivered = collections.deque()
+        self._processed = set()
+        self._ready_tag = None
+        self._ready_count = 0
+        self._ready_since = None
+
+    def delivered(self, raw_message):
+        """Track a message received from the broker."""
+        with self._lock:
+            if raw_message.channel is not self._channel:
+                # NOTE: the unacknowledged messages of the previous channel
+                # are redelivered by the broker
+                self._reset(raw_message.channel)
+            self._delivered.append(raw_message)
+
+    def ack(self, raw_message):
+        self._processed_message(raw_message, requeue=False)
+
+    def requeue(self, raw_message):
+        self._processed_message(raw_message, requeue=True)
+
+    def _processed_message(self, raw_message, requeue):
+        with self._lock:
+            if raw_message.channel is not self._channel:
+                if not requeue:
+                    LOG.debug('Channel closed, message %s will be '
+                              'redelivered', raw_message.delivery_tag)
+                return
+            # NOTE: a requeued message is no more unacknowledged, so it is
+            # not affected by the multiple ack sent afterwards
+            if requeue:
+                raw_message.requeue()
+            self._processed.add(id(raw_message))
+            while (self._delivered and
+                   id(self._delivered[0]) in self._processed):
+                message = self._delivered.popleft()
+                self._processed.remove(id(message))
+                self._ready_tag = message.delivery_tag
+                self._ready_count += 1
+                if self._ready_since is None:
+                    self._ready_since = timeutils.now()
+            if self._ready_count >= self.batch_size:
+                self._flush()
+
+    def flush(self, expired_only=False):
+        """Acknowledge the processed messages, or only if the oldest one
+        has waited for batch_window seconds.
+        """
+        with self._lock:
+            if self._ready_tag is None:
+                return
+            if (expired_only and timeutils.now() - self._ready_since <
+                    self.batch_window):
+                return
+            self._flush()
+
+    def _flush(self):
+        # NOTE: must be called with self._lock held, so that the acks are
+        # sent in the order of the delivery tags
+        tag, self._ready_tag = self._ready_tag, None
+        self._ready_count = 0
+        self._ready_since = None
+        if tag is None:
+            return
+        LOG.trace('AckBatcher: acknowledging messages up to %s', tag)
+        try:
+            self._channel.basic_ack(tag, multiple=True)
+        except Exception:
+            LOG.warn(_LW('Failed to acknowledge messages, they will be '
+                         'redelivered'), exc_info=True)
+            self._reset(None)
+
+    def _reset(self, channel):
+        self._channel = channel
+        self._delivered.clear()
+        self._processed.clear()
+        self._ready_tag = None
+        self._ready_count = 0
+        self._ready_since = None
+
+
 class RabbitMessage(dict):
-    def __init__(self, raw_message):
+    def __init__(self, raw_message, ack_batcher=None):
         super(RabbitMessage, self).__init__(
             rpc_common.deserialize_msg(raw_message.payload))
+        if raw_message.content_type == MSGPACK_CONTENT_TYPE:
+            self.envelope_version = rpc_common._BINARY_ENVELOPE_VERSION
+        else:
+            self.envelope_version = rpc_common._RPC_ENVELOPE_VERSION
         LOG.trace('RabbitMessage.Init: message %s', self)
         self._raw_message = raw_message
+        self._ack_batcher = ack_batcher
 
     def acknowledge(self):
         LOG.trace('RabbitMessage.acknowledge: message %s', self)
-        self._raw_message.ack()
+        if self._ack_batcher is not None:
+            self._ack_batcher.ack(self._raw_message)
+        else:
+            self._raw_message.ack()
 
     def requeue(self):
         LOG.trace('RabbitMessage.requeue: message %s', self)
-        self._raw_message.requeue()
+        if self._ack_batcher is not None:
+            self._ack_batcher.requeue(self._raw_message)
+        else:
+            self._raw_message.requeue()
 
 
 class Consumer(object):
@@ -206,6 +386,7 @@ class Consumer(object):
         self.queue_arguments = _get_queue_arguments(rabbit_ha_queues)
 
         self.queue = None
+        self.ack_batcher = None
         self.exchange = kombu.entity.Exchange(
             name=exchange_name,
             type=type,
@@ -214,6 +395,7 @@ class Consumer(object):
 
     def declare(self, conn):
         """Re-declare the queue after a rabbit (re)connect."""
+        self.ack_batcher = conn.ack_batcher
         self.queue = kombu.entity.Queue(
             name=self.queue_name,
             channel=conn.channel,
@@ -263,12 +445,19 @@ class Consumer(object):
         if m2p:
             message = m2p(message)
 
+        ack_batcher = self.ack_batcher
+        if ack_batcher is not None:
+            ack_batcher.delivered(message)
+
         try:
-            self.callback(RabbitMessage(message))
+            self.callback(RabbitMessage(message, ack_batcher))
         except Exception:
             LOG.exception(_LE("Failed to process message"
                               " ... skipping it."))
-            message.ack()
+            if ack_batcher is not None:
+                ack_batcher.ack(message)
+            else:
+                message.ack()
 
 
 class DummyConnectionLock(object):
@@ -278,8 +467,8 @@ class DummyConnectionLock(object):
     def release(self):
         pass
 
-    def heartbeat_acquire(self):
-        pass
+    def heartbeat_acquire(self, blocking=True):
+        return True
 
     def __enter__(self):
         self.acquire()
@@ -326,14 +515,17 @@ class ConnectionLock(DummyConnectionLock):
                 self._workers_waiting -= 1
             self._lock_acquired = self._get_thread_id()
 
-    def heartbeat_acquire(self):
+    def heartbeat_acquire(self, blocking=True):
         # NOTE(sileht): must be called only one time
         with self._monitor:
             while self._lock_acquired is not None:
+                if not blocking:
+                    return False
                 self._heartbeat_waiting = True
                 self._heartbeat_lock.wait()
                 self._heartbeat_waiting = False
             self._lock_acquired = self._get_thread_id()
+            return True
 
     def release(self):
         with self._monitor:
@@ -359,6 +551,103 @@ class ConnectionLock(DummyConnectionLock):
             self.release()
 
 
+class HeartbeatScheduler(object):
+    """Run the heartbeats of the rabbit connections of the process.
+
+    Connections are kept on a timer wheel of TICK seconds wide slots swept
+    by a single thread, which only runs while connections are registered,
+    instead of each connection running its own heartbeat thread.
+    """
+
+    TICK = 0.1
+
+    def __init__(self):
+        self._reset()
+
+    def _reset(self):
+        self._connections = set()
+        self._wheel = collections.defaultdict(list)
+        self._cond = threading.Condition()
+        self._running = None
+        self._thread = None
+        self._pid = os.getpid()
+
+    def _check_fork(self):
+        # NOTE: in a forked child, the connections are those of the parent
+        # process, its thread doesn't exist, and its condition may have
+        # been held by another thread of the parent.
+        if self._pid != os.getpid():
+            self._reset()
+
+    def register(self, connection):
+        self._check_fork()
+        with self._cond:
+            self._connections.add(connection)
+            self._schedule(connection, connection._heartbeat_wait_timeout)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run)
+                self._thread.daemon = True
+                self._thread.start()
+
+    def unregister(self, connection):
+        """Stop the heartbeats of a connection.
+
+        Waits for the heartbeat of the connection to complete if it is
+        running, so that the connection can be closed afterwards.
+        """
+        self._check_fork()
+        with self._cond:
+            self._connections.discard(connection)
+            if threading.current_thread() is self._thread:
+                return
+            while self._running is connection:
+                self._cond.wait()
+
+    def _schedule(self, connection, delay):
+        # NOTE: must be called with self._cond held
+        slot = int(math.ceil((timeutils.now() + delay) / self.TICK))
+        self._wheel[slot].append(connection)
+        self._cond.notify_all()
+
+    def _run(self):
+        with self._cond:
+            while self._connections:
+                now = int(timeutils.now() / self.TICK)
+                due = [slot for slot in self._wheel if slot <= now]
+                if not due:
+                    delay = min(self._wheel) * self.TICK - timeutils.now()
+                    self._cond.wait(timeout=max(delay, 0))
+                    continue
+                for slot in sorted(due):
+                    for connection in self._wheel.pop(slot):
+                        if connection in self._connections:
+                            self._beat(connection)
+            self._wheel.clear()
+            self._thread = None
+
+    def _beat(self, connection):
+        # NOTE: must be called with self._cond held, it is released while
+        # the heartbeat runs
+        self._running = connection
+        self._cond.release()
+        delay = connection._heartbeat_wait_timeout
+        try:
+            delay = connection._heartbeat_run()
+        except Exception:
+            LOG.warning(_LW("Unexpected error during heartbeat processing, "
+                            "retrying..."))
+            LOG.debug('Exception', exc_info=True)
+        finally:
+            self._cond.acquire()
+            self._running = None
+            self._cond.notify_all()
+        if connection in self._connections:
+            self._schedule(connection, delay)
+
+
+_HEARTBEAT_SCHEDULER = HeartbeatScheduler()
+
+
 class Connection(object):
     """Connection object."""
 
@@ -450,7 +739,13 @@ class Connection(object):
         self._consumers = []
         self._new_consumers = []
         self._consume_loop_stopped = False
+        self._qos_prefetch_count = 0
+        self.ack_batcher = None
         self.channel = None
+        # NOTE: exchanges declared and producer used to publish on the
+        # current channel, reset by _set_current_channel()
+        self._declared_exchanges = set()
+        self._producer = None
 
         # NOTE(sileht): if purpose is PURPOSE_LISTEN
         # we don't need the lock because we don't
@@ -487,6 +782,7 @@ class Connection(object):
             float(self.heartbeat_timeout_threshold) /
             float(self.heartbeat_rate) / 2.0)
         self._heartbeat_support_log_emitted = False
+        self._heartbeat_busy_delay = 0
 
         # NOTE(sileht): just ensure the connection is setuped at startup
         self.ensure_connection()
@@ -494,7 +790,7 @@ class Connection(object):
         # NOTE(sileht): if purpose is PURPOSE_LISTEN
         # the consume code does the heartbeat stuff
         # we don't need a thread
-        self._heartbeat_thread = None
+        self._heartbeat_registered = False
         if purpose == rpc_amqp.PURPOSE_SEND:
             self._heartbeat_start()
 
@@ -652,6 +948,8 @@ class Connection(object):
             a new channel, we use it the reconfigure our consumers.
             """
             self._set_current_channel(new_channel)
+            if self._qos_prefetch_count:
+                self._apply_qos()
             for consumer in self._consumers:
                 consumer.declare(self)
 
@@ -711,19 +1009,35 @@ class Connection(object):
 
         NOTE(sileht): Must be called within the connection lock
         """
-        if self.channel is not None and new_channel != self.channel:
+        if new_channel == self.channel:
+            return
+        if self.channel is not None:
             self.PUBLISHER_DECLARED_QUEUES.pop(self.channel, None)
             self.connection.maybe_close_channel(self.channel)
+        self._declared_exchanges.clear()
+        self._producer = None
         self.channel = new_channel
 
     def close(self):
         """Close/release this connection."""
         self._heartbeat_stop()
+        if self.ack_batcher is not None:
+            self.ack_batcher.flush()
         if self.connection:
             self._set_current_channel(None)
             self.connection.release()
             self.connection = None
 
+    def is_alive(self):
+        """Return whether the connection to the broker is still usable.
+
+        This does not do any round trip to the broker, a channel is dropped
+        as soon as a recoverable error is raised and the transport tracks
+        the state of the socket.
+        """
+        return (self.connection is not None and self.channel is not None and
+                self.connection.connected)
+
     def reset(self):
         """Reset a connection so it can be used again."""
         recoverable_errors = (self.connection.recoverable_channel_errors +
@@ -774,55 +1088,89 @@ class Connection(object):
 
     def _heartbeat_start(self):
         if self._heartbeat_supported_and_enabled():
-            self._heartbeat_exit_event = threading.Event()
-            self._heartbeat_thread = threading.Thread(
-                target=self._heartbeat_thread_job)
-            self._heartbeat_thread.daemon = True
-            self._heartbeat_thread.start()
-        else:
-            self._heartbeat_thread = None
+            _HEARTBEAT_SCHEDULER.register(self)
+            self._heartbeat_registered = True
 
     def _heartbeat_stop(self):
-        if self._heartbeat_thread is not None:
-            self._heartbeat_exit_event.set()
-            self._heartbeat_thread.join()
-            self._heartbeat_thread = None
+        if self._heartbeat_registered:
+            _HEARTBEAT_SCHEDULER.unregister(self)
+            self._heartbeat_registered = False
 
-    def _heartbeat_thread_job(self):
-        """Thread that maintains inactive connections
+    def _heartbeat_run(self):
+        """Maintain an inactive connection, called by the heartbeat
+        scheduler.
+
+        Returns the delay before the next heartbeat.
         """
-        while not self._heartbeat_exit_event.is_set():
-            with self._connection_lock.for_heartbeat():
+        # NOTE: a connection in use exchanges frames with the broker, which
+        # keep it alive. Instead of blocking the scheduler, and the
+        # heartbeats of all the other connections with it, the heartbeat is
+        # retried after a delay doubled from one tick each time the
+        # connection is found busy, up to the delay between heartbeats.
+        if not self._connection_lock.heartbeat_acquire(blocking=False):
+            self._heartbeat_busy_delay = min(
+                max(self._heartbeat_busy_delay * 2, HeartbeatScheduler.TICK),
+                self._heartbeat_wait_timeout)
+            return self._heartbeat_busy_delay
+        self._heartbeat_busy_delay = 0
+
+        try:
+            # NOTE: the connection is broken and will be reestablished by
+            # its next user, see ensure()
+            if self.channel is None:
+                return self._heartbeat_wait_timeout
 
-                recoverable_errors = (
-                    self.connection.recoverable_channel_errors +
-                    self.connection.recoverable_connection_errors)
+            recoverable_errors = (
+                self.connection.recoverable_channel_errors +
+                self.connection.recoverable_connection_errors)
 
+            try:
+                self._heartbeat_check()
+                # NOTE(sileht): We need to drain event to receive
+                # heartbeat from the broker but don't hold the
+                # connection too much times. In amqpdriver a connection
+                # is used exclusivly for read or for write, so we have
+                # to do this for connection used for write drain_events
+                # already do that for other connection
                 try:
-                    try:
-                        self._heartbeat_check()
-                        # NOTE(sileht): We need to drain event to receive
-                        # heartbeat from the broker but don't hold the
-                        # connection too much times. In amqpdriver a connection
-                        # is used exclusivly for read or for write, so we have
-                        # to do this for connection used for write drain_events
-                        # already do that for other connection
-                        try:
-                            self.connection.drain_events(timeout=0.001)
-                        except socket.timeout:
-                            pass
-                    except recoverable_errors as exc:
-                        LOG.info(_LI("A recoverable connection/channel error "
-                                     "occurred, trying to reconnect: %s"), exc)
-                        self.ensure_connection()
-                except Exception:
-                    LOG.warning(_LW("Unexpected error during heartbeart "
-                                    "thread processing, retrying..."))
-                    LOG.debug('Exception', exc_info=True)
-
-            self._heartbeat_exit_event.wait(
-                timeout=self._heartbeat_wait_timeout)
-        self._heartbeat_exit_event.clear()
+                    self.connection.drain_events(timeout=0.001)
+                except socket.timeout:
+                    pass
+            except recoverable_errors as exc:
+                # NOTE: reconnecting could block the heartbeats of all the
+                # other connections, the connection is only marked broken
+                LOG.info(_LI("A recoverable connection/channel error "
+                             "occurred, the connection will be reestablished "
+                             "when it is next used: %s"), exc)
+                self._set_current_channel(None)
+        finally:
+            self._connection_lock.release()
+        return self._heartbeat_wait_timeout
+
+    def set_qos(self, prefetch_count):
+        """Limit the number of unacknowledged messages delivered."""
+        def _error_callback(exc):
+            LOG.error(_LE("Failed to set the prefetch count: %s"), exc)
+
+        with self._connection_lock:
+            self._qos_prefetch_count = prefetch_count
+            self.ensure(self._apply_qos, error_callback=_error_callback)
+
+    def _apply_qos(self):
+        # NOTE: the name of the global flag argument depends on the kombu
+        # transport, pass them positionally
+        self.channel.basic_qos(0, self._qos_prefetch_count, False)
+
+    def set_ack_batching(self, batch_size, batch_window):
+        """Acknowledge the messages received by batches.
+
+        Must be called before declaring the consumers.
+        """
+        # NOTE: the broker stops delivering once prefetch_count messages are
+        # unacknowledged, a larger batch would only be sent on timeout
+        if self._qos_prefetch_count:
+            batch_size = min(batch_size, self._qos_prefetch_count)
+        self.ack_batcher = AckBatcher(batch_size, batch_window)
 
     def declare_consumer(self, consumer):
         """Create a Consumer using the class that was passed in and
@@ -886,8 +1234,14 @@ class Connection(object):
                 if self._heartbeat_supported_and_enabled():
                     self._heartbeat_check()
 
+                drain_timeout = poll_timeout
+                if self.ack_batcher is not None:
+                    self.ack_batcher.flush(expired_only=True)
+                    drain_timeout = min(poll_timeout,
+                                        self.ack_batcher.batch_window)
+
                 try:
-                    self.connection.drain_events(timeout=poll_timeout)
+                    self.connection.drain_events(timeout=drain_timeout)
                     return
                 except socket.timeout as exc:
                     poll_timeout = timer.check_return(
@@ -965,18 +1319,7 @@ class Connection(object):
         with self._connection_lock:
             self.ensure(method, retry=retry, error_callback=_error_callback)
 
-    def _publish(self, exchange, msg, routing_key=None, timeout=None):
-        """Publish a message."""
-        producer = kombu.messaging.Producer(exchange=exchange,
-                                            channel=self.channel,
-                                            routing_key=routing_key)
-
-        expiration = None
-        if timeout:
-            # AMQP TTL is in milliseconds when set in the property.
-            # Details: http://www.rabbitmq.com/ttl.html#per-message-ttl
-            expiration = int(timeout * 1000)
-
+    def _get_publish_transport_timeout(self, timeout):
         # NOTE(sileht): no need to wait more, caller expects
         # a answer before timeout is reached
         transport_timeout = timeout
@@ -989,6 +1332,47 @@ class Connection(object):
             # heartbeat_timeout, no need to wait more otherwise will
             # disconnect us, so raise timeout earlier ourself
             transport_timeout = heartbeat_timeout
+        return transport_timeout
+
+    def _get_producer(self):
+        """Return the producer publishing on the current channel.
+
+        The producer doesn't declare exchanges itself, see
+        _declare_exchange().
+        """
+        if self._producer is None:
+            self._producer = kombu.messaging.Producer(channel=self.channel,
+                                                      auto_declare=False)
+        return self._producer
+
+    def _declare_exchange(self, exchange):
+        """Declare an exchange once per channel.
+
+        Passive declarations are not cached, they check that the exchange
+        still exists. Neither are auto_delete exchanges, the broker deletes
+        them once their last queue is unbound and publishing to them would
+        then fail with a 404 channel error.
+        """
+        key = _exchange_key(exchange)
+        if exchange.passive or key not in self._declared_exchanges:
+            LOG.trace('Connection._declare_exchange: declare exchange %s',
+                      exchange.name)
+            exchange(self.channel).declare()
+            if not exchange.passive and not exchange.auto_delete:
+                self._declared_exchanges.add(key)
+
+    def _publish(self, exchange, msg, routing_key=None, timeout=None):
+        """Publish a message."""
+        self._declare_exchange(exchange)
+        producer = self._get_producer()
+
+        expiration = None
+        if timeout:
+            # AMQP TTL is in milliseconds when set in the property.
+            # Details: http://www.rabbitmq.com/ttl.html#per-message-ttl
+            expiration = int(timeout * 1000)
+
+        transport_timeout = self._get_publish_transport_timeout(timeout)
 
         log_info = {'msg': msg,
                     'who': exchange or 'default',
@@ -996,7 +1380,34 @@ class Connection(object):
         LOG.trace('Connection._publish: sending message %(msg)s to'
                   ' %(who)s with routing key %(key)s', log_info)
         with self._transport_socket_timeout(transport_timeout):
-            producer.publish(msg, expiration=expiration)
+            producer.publish(msg, exchange=exchange, routing_key=routing_key,
+                             expiration=expiration,
+                             serializer=_get_serializer(msg))
+
+    def _publish_batch(self, exchange, msgs, routing_key=None, timeout=None):
+        """Publish a batch of messages through a single producer.
+
+        msgs is a deque consumed from the left as messages are handed to
+        the broker, so when ensure() retries this method after a
+        recoverable error only the messages not sent yet are published
+        again. With confirm_publish enabled on the transport each publish
+        is still confirmed by the broker.
+        """
+        self._declare_exchange(exchange)
+        producer = self._get_producer()
+
+        LOG.trace('Connection._publish_batch: sending %(count)d messages '
+                  'to %(who)s with routing key %(key)s',
+                  {'count': len(msgs),
+                   'who': exchange or 'default',
+                   'key': routing_key})
+        with self._transport_socket_timeout(
+                self._get_publish_transport_timeout(timeout)):
+            while msgs:
+                producer.publish(msgs[0], exchange=exchange,
+                                 routing_key=routing_key,
+                                 serializer=_get_serializer(msgs[0]))
+                msgs.popleft()
 
     # List of notification queue declared on the channel to avoid
     # unnecessary redeclaration. This list is resetted each time
@@ -1017,6 +1428,18 @@ class Connection(object):
 
         _set_current_channel is responsible to cleanup the cache.
         """
+        self._declare_default_queue(exchange, routing_key)
+        self._publish(exchange, msg, routing_key=routing_key, timeout=timeout)
+
+    def _publish_batch_and_creates_default_queue(self, exchange, msgs,
+                                                 routing_key=None,
+                                                 timeout=None):
+        """Batch variant of _publish_and_creates_default_queue."""
+        self._declare_default_queue(exchange, routing_key)
+        self._publish_batch(exchange, msgs, routing_key=routing_key,
+                            timeout=timeout)
+
+    def _declare_default_queue(self, exchange, routing_key):
         queue_indentifier = (exchange.name, routing_key)
         # NOTE(sileht): We only do it once per reconnection
         # the Connection._set_current_channel() is responsible to clear
@@ -1037,8 +1460,9 @@ class Connection(object):
                 'declare queue %(key)s on %(exchange)s exchange', log_info)
             queue.declare()
             self.PUBLISHER_DECLARED_QUEUES[self.channel].add(queue_indentifier)
-
-        self._publish(exchange, msg, routing_key=routing_key, timeout=timeout)
+            # NOTE: the queue declaration declares its exchange too
+            if not exchange.auto_delete:
+                self._declared_exchanges.add(_exchange_key(exchange))
 
     def _publish_and_retry_on_missing_exchange(self, exchange, msg,
                                                routing_key=None, timeout=None):
@@ -1104,36 +1528,58 @@ class Connection(object):
         self._ensure_publishing(self._publish_and_retry_on_missing_exchange,
                                 exchange, msg, routing_key=msg_id)
 
-    def topic_send(self, exchange_name, topic, msg, timeout=None, retry=None):
-        """Send a 'topic' message."""
-        exchange = kombu.entity.Exchange(
+    def _topic_exchange(self, exchange_name):
+        return kombu.entity.Exchange(
             name=exchange_name,
             type='topic',
             durable=self.amqp_durable_queues,
             auto_delete=self.amqp_auto_delete)
 
-        self._ensure_publishing(self._publish, exchange, msg,
+    @staticmethod
+    def _fanout_exchange(topic):
+        return kombu.entity.Exchange(name='%s_fanout' % topic,
+                                     type='fanout',
+                                     durable=False,
+                                     auto_delete=True)
+
+    def topic_send(self, exchange_name, topic, msg, timeout=None, retry=None):
+        """Send a 'topic' message."""
+        self._ensure_publishing(self._publish,
+                                self._topic_exchange(exchange_name), msg,
                                 routing_key=topic, retry=retry)
 
     def fanout_send(self, topic, msg, retry=None):
         """Send a 'fanout' message."""
-        exchange = kombu.entity.Exchange(name='%s_fanout' % topic,
-                                         type='fanout',
-                                         durable=False,
-                                         auto_delete=True)
-
-        self._ensure_publishing(self._publish, exchange, msg, retry=retry)
+        self._ensure_publishing(self._publish, self._fanout_exchange(topic),
+                                msg, retry=retry)
 
     def notify_send(self, exchange_name, topic, msg, retry=None, **kwargs):
         """Send a notify message on a topic."""
-        exchange = kombu.entity.Exchange(
-            name=exchange_name,
-            type='topic',
-            durable=self.amqp_durable_queues,
-            auto_delete=self.amqp_auto_delete)
-
         self._ensure_publishing(self._publish_and_creates_default_queue,
-                                exchange, msg, routing_key=topic, retry=retry)
+                                self._topic_exchange(exchange_name), msg,
+                                routing_key=topic, retry=retry)
+
+    # NOTE: the *_send_batch() methods take the messages as a deque and
+    # remove them from it as the broker confirms them, the messages left in
+    # it when an error is raised were never sent.
+
+    def topic_send_batch(self, exchange_name, topic, msgs, retry=None):
+        """Send a batch of 'topic' messages."""
+        self._ensure_publishing(self._publish_batch,
+                                self._topic_exchange(exchange_name), msgs,
+                                routing_key=topic, retry=retry)
+
+    def fanout_send_batch(self, topic, msgs, retry=None):
+        """Send a batch of 'fanout' messages."""
+        self._ensure_publishing(self._publish_batch,
+                                self._fanout_exchange(topic), msgs,
+                                retry=retry)
+
+    def notify_send_batch(self, exchange_name, topic, msgs, retry=None):
+        """Send a batch of notify messages on a topic."""
+        self._ensure_publishing(self._publish_batch_and_creates_default_queue,
+                                self._topic_exchange(exchange_name), msgs,
+                                routing_key=topic, retry=retry)
 
 
 class RabbitDriver(amqpdriver.AMQPDriverBase):
@@ -1156,17 +1602,26 @@ class RabbitDriver(amqpdriver.AMQPDriverBase):
         conf.register_opts(rabbit_opts, group=opt_group)
         conf.register_opts(rpc_amqp.amqp_opts, group=opt_group)
         conf.register_opts(base.base_opts, group=opt_group)
+        driver_conf = conf.oslo_messaging_rabbit
 
-        connection_pool = rpc_amqp.ConnectionPool(
-            conf, conf.oslo_messaging_rabbit.rpc_conn_pool_size,
-            url, Connection)
+        connection_pool = rpc_amqp.ConnectionPool.from_conf(
+            conf, driver_conf, url, Connection)
 
         super(RabbitDriver, self).__init__(
             conf, url,
             connection_pool,
             default_exchange,
             allowed_remote_exmods,
-            conf.oslo_messaging_rabbit.send_single_reply,
+            driver_conf.send_single_reply,
+            publish_batch_size=driver_conf.rabbit_publish_batch_size,
+            publish_batch_window=driver_conf.rabbit_publish_batch_window,
+            listener_drain_limit=driver_conf.listener_drain_limit,
+            envelope_version=driver_conf.rabbit_envelope_version,
+            listener_prefetch_count=driver_conf.rabbit_qos_prefetch_count,
+            notification_listener_prefetch_count=(
+                driver_conf.rabbit_notification_qos_prefetch_count),
+            ack_batch_size=driver_conf.rabbit_ack_batch_size,
+            ack_batch_window=driver_conf.rabbit_ack_batch_window,
         )
 
     def require_features(self, requeue=True):
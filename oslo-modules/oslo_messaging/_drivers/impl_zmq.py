@@ -23,8 +23,10 @@ from stevedore import driver
 from oslo_messaging._drivers import base
 from oslo_messaging._drivers import common as rpc_common
 from oslo_messaging._drivers.zmq_driver.client import zmq_client
+from oslo_messaging._drivers.zmq_driver.matchmaker import matchmaker_cache
 from oslo_messaging._drivers.zmq_driver.server import zmq_server
 from oslo_messaging._executors import impl_pooledexecutor  # FIXME(markmc)
+from oslo_messaging._i18n import _LW
 
 
 pformat = pprint.pformat
@@ -49,6 +51,16 @@ zmq_opts = [
                 default=True,
                 help='Use REQ/REP pattern for all methods CALL/CAST/FANOUT.'),
 
+    cfg.StrOpt('rpc_zmq_serialization', default='pickle',
+               choices=('msgpack', 'json', 'pickle'),
+               help='Wire format of the context and payload of the '
+                    'messages. All the peers must use the same one. '
+                    '"pickle", the format of the previous releases, is '
+                    'deprecated as it is unsafe to load from the network, '
+                    'and the default will change to "msgpack" in a future '
+                    'release: once all the peers are upgraded, switch all '
+                    'of them to "msgpack" (or "json").'),
+
     cfg.StrOpt('rpc_zmq_concurrency', default='eventlet',
                help='Type of concurrency used. Either "native" or "eventlet"'),
 
@@ -76,6 +88,20 @@ zmq_opts = [
                help='Seconds to wait before a cast expires (TTL). '
                     'Only supported by impl_zmq.'),
 
+    cfg.IntOpt('rpc_zmq_matchmaker_cache_ttl',
+               default=60,
+               help='Number of seconds the hosts of a target are cached. '
+                    '0 disables the matchmaker cache.'),
+
+    cfg.IntOpt('rpc_zmq_matchmaker_negative_cache_ttl',
+               default=5,
+               help='Number of seconds a target without hosts is cached.'),
+
+    cfg.IntOpt('rpc_zmq_matchmaker_refresh_interval',
+               default=30,
+               help='Number of seconds between background refreshes of the '
+                    'cached targets. 0 disables the background refresh.'),
+
     cfg.IntOpt('rpc_poll_timeout',
                default=1,
                help='The default number of seconds that poll should wait. '
@@ -149,10 +175,21 @@ class ZmqDriver(base.BaseDriver):
         self.conf = conf
         self.allowed_remote_exmods = allowed_remote_exmods
 
+        if self.conf.rpc_zmq_serialization == 'pickle':
+            LOG.warning(_LW('The "pickle" rpc_zmq_serialization is '
+                            'deprecated, switch all the peers to "msgpack" '
+                            'once they are upgraded.'))
+
         self.matchmaker = driver.DriverManager(
             'oslo.messaging.zmq.matchmaker',
             self.conf.rpc_zmq_matchmaker,
         ).driver(self.conf)
+        if self.conf.rpc_zmq_matchmaker_cache_ttl > 0:
+            self.matchmaker = matchmaker_cache.CachingMatchMaker(
+                self.conf, self.matchmaker,
+                self.conf.rpc_zmq_matchmaker_cache_ttl,
+                self.conf.rpc_zmq_matchmaker_negative_cache_ttl,
+                self.conf.rpc_zmq_matchmaker_refresh_interval)
 
         self.server = LazyDriverItem(
             zmq_server.ZmqServer, self, self.conf, self.matchmaker)
@@ -248,7 +285,9 @@ class ZmqDriver(base.BaseDriver):
     def cleanup(self):
         """Cleanup all driver's connections finally
         """
+        self._shutdown_async_executor()
         self.client.cleanup()
         self.server.cleanup()
         self.notify_server.cleanup()
         self.notifier.cleanup()
+        self.matchmaker.cleanup()
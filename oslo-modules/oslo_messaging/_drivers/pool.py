@@ -14,11 +14,23 @@
 #    under the License.
 
 import abc
+import bisect
 import collections
+import logging
 import threading
 
+from oslo_utils import timeutils
 import six
 
+from oslo_messaging._i18n import _LW
+from oslo_messaging import exceptions
+
+LOG = logging.getLogger(__name__)
+
+# Upper bounds in seconds of the buckets of the checkout wait histogram, the
+# last bucket counts every checkout which waited longer than the last bound
+WAIT_TIME_BUCKETS = (0.001, 0.01, 0.1, 1.0, 10.0)
+
 
 @six.add_metaclass(abc.ABCMeta)
 class Pool(object):
@@ -28,61 +40,302 @@ class Pool(object):
     Modelled after the eventlet.pools.Pool interface, but designed to be safe
     when using native threads without the GIL.
 
+    Free items are handed out most recently used first, so that the items
+    idling at the other end of the pool can be evicted once they have been
+    unused for max_idle seconds, down to min_size items. Items older than
+    max_lifetime seconds are dropped when they are checked out or returned,
+    and every item is checked with validate() before being handed out.
+    A max_idle or max_lifetime of 0 disables the corresponding eviction.
+
     Resizing is not supported.
     """
 
-    def __init__(self, max_size=4):
+    def __init__(self, max_size=4, min_size=0, max_idle=0, max_lifetime=0,
+                 timeout=None):
         super(Pool, self).__init__()
 
         self._max_size = max_size
+        self._min_size = min(min_size, max_size)
+        self._max_idle = max_idle
+        self._max_lifetime = max_lifetime
+        self._timeout = timeout
         self._current_size = 0
         self._cond = threading.Condition()
 
+        # deque of (item, returned_at) pairs, most recently returned first
         self._items = collections.deque()
+        # creation time of the items currently owned by the pool
+        self._created_at = {}
+        self._warming = False
+
+        self._checkouts = 0
+        self._creations = 0
+        self._evictions = 0
+        self._validation_failures = 0
+        self._timeouts = 0
+        self._wait_time = 0.0
+        self._wait_histogram = [0] * (len(WAIT_TIME_BUCKETS) + 1)
 
     def put(self, item):
         """Return an item to the pool."""
+        now = timeutils.now()
         with self._cond:
-            self._items.appendleft(item)
+            created_at = self._created_at.setdefault(item, now)
+            expired = (self._max_lifetime > 0 and
+                       now - created_at > self._max_lifetime)
+            if expired:
+                self._forget(item)
+            else:
+                self._items.appendleft((item, now))
+            evicted = self._evict_idle(now)
             self._cond.notify()
+        if expired:
+            evicted.append(item)
+        self._dispose_all(evicted)
 
-    def get(self):
+    def get(self, timeout=None):
         """Return an item from the pool, when one is available.
 
-        This may cause the calling thread to block.
+        This may cause the calling thread to block, for at most timeout
+        seconds, or the timeout given to the pool if None. MessagingTimeout
+        is raised when no item became available in time.
+        """
+        if timeout is None:
+            timeout = self._timeout
+        watch = timeutils.StopWatch(duration=timeout)
+        watch.start()
+        while True:
+            item, evicted = self._checkout(watch)
+            self._dispose_all(evicted)
+            if item is None:
+                break
+            if self._check(item):
+                self._checked_out(watch.elapsed())
+                return item
+
+        # We've grabbed a slot and dropped the lock, now do the creation
+        waited = watch.elapsed()
+        try:
+            item = self.create()
+        except Exception:
+            with self._cond:
+                self._current_size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._created_at[item] = timeutils.now()
+            self._creations += 1
+        self._checked_out(waited)
+        return item
+
+    def _checked_out(self, waited):
+        with self._cond:
+            self._checkouts += 1
+            self._wait_time += waited
+            self._wait_histogram[bisect.bisect_left(WAIT_TIME_BUCKETS,
+                                                    waited)] += 1
+        self._maybe_warm()
+
+    def _checkout(self, watch):
+        """Take a free item, or a slot to create one.
+
+        Returns the item, or None when a slot was granted, and the list of
+        expired items removed from the pool which must be disposed.
         """
+        evicted = []
         with self._cond:
             while True:
+                now = timeutils.now()
                 try:
-                    return self._items.popleft()
+                    item, _returned_at = self._items.popleft()
                 except IndexError:
                     pass
+                else:
+                    if (self._max_lifetime > 0 and now -
+                            self._created_at[item] > self._max_lifetime):
+                        self._forget(item)
+                        evicted.append(item)
+                        continue
+                    break
 
                 if self._current_size < self._max_size:
                     self._current_size += 1
+                    item = None
                     break
 
+                if watch.expired():
+                    self._timeouts += 1
+                    raise exceptions.MessagingTimeout(
+                        'Timed out after %s seconds waiting for a free item '
+                        'in the pool' % watch.elapsed())
+
                 # FIXME(markmc): timeout needed to allow keyboard interrupt
                 # http://bugs.python.org/issue8844
-                self._cond.wait(timeout=1)
+                leftover = watch.leftover(return_none=True)
+                self._cond.wait(timeout=1 if leftover is None
+                                else min(1, leftover))
+        return item, evicted
 
-        # We've grabbed a slot and dropped the lock, now do the creation
+    def _check(self, item):
+        """Validate a free item, dropping it from the pool if it is dead."""
         try:
-            return self.create()
+            valid = self.validate(item)
         except Exception:
+            LOG.debug('Pool item %s failed validation', item, exc_info=True)
+            valid = False
+        if valid:
+            return True
+        LOG.warn(_LW('Dropping dead item %s from the pool'), item)
+        with self._cond:
+            self._validation_failures += 1
+            self._forget(item)
+            self._cond.notify()
+        self._dispose_all([item])
+        return False
+
+    def discard(self, item):
+        """Drop an item checked out from the pool instead of returning it.
+
+        The item is disposed and its slot is freed, the next get() call
+        creates a new item in its place.
+        """
+        with self._cond:
+            self._forget(item)
+            self._cond.notify()
+        self._dispose_all([item])
+
+    def evict(self):
+        """Dispose the free items which expired.
+
+        Expired items are also evicted when items are returned to the pool,
+        this allows to release them when the pool is not used.
+        """
+        now = timeutils.now()
+        evicted = []
+        with self._cond:
+            if self._max_lifetime > 0:
+                for item, returned_at in list(self._items):
+                    if now - self._created_at[item] > self._max_lifetime:
+                        self._items.remove((item, returned_at))
+                        self._forget(item)
+                        evicted.append(item)
+            evicted.extend(self._evict_idle(now))
+        self._dispose_all(evicted)
+
+    def warm(self):
+        """Create items until the pool holds min_size of them."""
+        created = []
+        try:
+            while True:
+                with self._cond:
+                    if self._current_size >= self._min_size:
+                        break
+                    self._current_size += 1
+                try:
+                    item = self.create()
+                except Exception:
+                    with self._cond:
+                        self._current_size -= 1
+                        self._cond.notify()
+                    LOG.warn(_LW('Failed to create a pool item'),
+                             exc_info=True)
+                    break
+                with self._cond:
+                    self._created_at[item] = timeutils.now()
+                    self._creations += 1
+                created.append(item)
+        finally:
             with self._cond:
-                self._current_size -= 1
-            raise
+                self._warming = False
+        for item in created:
+            self.put(item)
+
+    def _maybe_warm(self):
+        # NOTE: the pool is filled up to min_size in the background the first
+        # time it falls short, so that callers don't pay for the creation
+        with self._cond:
+            if self._warming or self._current_size >= self._min_size:
+                return
+            self._warming = True
+        thread = threading.Thread(target=self.warm)
+        thread.daemon = True
+        thread.start()
+
+    def _evict_idle(self, now):
+        # NOTE: must be called with the lock held, the least recently used
+        # items are at the right end of the deque
+        evicted = []
+        if self._max_idle <= 0:
+            return evicted
+        while self._items and self._current_size > self._min_size:
+            item, returned_at = self._items[-1]
+            if now - returned_at <= self._max_idle:
+                break
+            self._items.pop()
+            self._forget(item)
+            evicted.append(item)
+        return evicted
+
+    def _forget(self, item):
+        # NOTE: must be called with the lock held
+        self._created_at.pop(item, None)
+        self._current_size -= 1
+        self._evictions += 1
+
+    def _dispose_all(self, items):
+        for item in items:
+            try:
+                self.dispose(item)
+            except Exception:
+                LOG.debug('Failed to dispose pool item %s', item,
+                          exc_info=True)
 
     def iter_free(self):
         """Iterate over free items."""
         with self._cond:
             while True:
                 try:
-                    yield self._items.popleft()
+                    item, _returned_at = self._items.popleft()
                 except IndexError:
                     break
+                self._created_at.pop(item, None)
+                self._current_size -= 1
+                yield item
+
+    def get_statistics(self):
+        """Return a dict of the pool statistics.
+
+        'wait_histogram' is a list of (upper bound in seconds, count) pairs
+        of the time spent waiting for an item, the last bound is infinite.
+        """
+        with self._cond:
+            free = len(self._items)
+            checkouts = self._checkouts
+            return {
+                'max_size': self._max_size,
+                'min_size': self._min_size,
+                'size': self._current_size,
+                'free': free,
+                'in_use': self._current_size - free,
+                'checkouts': checkouts,
+                'creations': self._creations,
+                'evictions': self._evictions,
+                'validation_failures': self._validation_failures,
+                'timeouts': self._timeouts,
+                'wait_time': (self._wait_time / checkouts
+                              if checkouts else 0.0),
+                'wait_histogram': list(zip(
+                    WAIT_TIME_BUCKETS + (float('inf'),),
+                    self._wait_histogram)),
+            }
 
     @abc.abstractmethod
     def create(self):
         """Construct a new item."""
+
+    def validate(self, item):
+        """Return whether a free item can be handed out."""
+        return True
+
+    def dispose(self, item):
+        """Release an item removed from the pool."""
@@ -27,6 +27,7 @@ functions scheduled by the Controller.
 import abc
 import logging
 import threading
+import time
 import uuid
 
 from oslo_config import cfg
@@ -34,6 +35,7 @@ import proton
 import pyngus
 from six import moves
 
+from oslo_messaging._drivers.protocols.amqp import credit
 from oslo_messaging._drivers.protocols.amqp import eventloop
 from oslo_messaging._drivers.protocols.amqp import opts
 from oslo_messaging import exceptions
@@ -54,7 +56,7 @@ class Replies(pyngus.ReceiverEventHandler):
     to the proper Listener's incoming queue using the correlation-id header in
     the message.
     """
-    def __init__(self, connection, on_ready):
+    def __init__(self, connection, on_ready, credit):
         self._correlation = {}  # map of correlation-id to response queue
         self._ready = False
         self._on_ready = on_ready
@@ -63,13 +65,11 @@ class Replies(pyngus.ReceiverEventHandler):
                                                     event_handler=self,
                                                     name=rname)
 
-        # capacity determines the maximum number of reply messages this link
+        # credit determines the maximum number of reply messages this link
         # can receive. As messages are received and credit is consumed, this
-        # driver will 'top up' the credit back to max capacity.  This number
-        # should be large enough to avoid needlessly flow-controlling the
-        # replies.
-        self.capacity = 100  # TODO(kgiusti) guesstimate - make configurable
-        self._credit = 0
+        # driver will 'top up' the credit back to the window of the
+        # CreditWindow, which grows with the rate of the replies.
+        self._credit = credit
         self._receiver.open()
 
     def ready(self):
@@ -105,7 +105,7 @@ class Replies(pyngus.ReceiverEventHandler):
         messages.
         """
         self._ready = True
-        self._update_credit()
+        self._credit.top_up(self._receiver)
         self._on_ready()
         LOG.debug("Replies expected on link %s",
                   self._receiver.source_address)
@@ -124,8 +124,7 @@ class Replies(pyngus.ReceiverEventHandler):
         """This is a Pyngus callback, invoked by Pyngus when a new message
         arrives on this receiver link from the peer.
         """
-        self._credit = self._credit - 1
-        self._update_credit()
+        self._credit.update(receiver)
 
         key = message.correlation_id
         if key in self._correlation:
@@ -141,28 +140,31 @@ class Replies(pyngus.ReceiverEventHandler):
                      key)
             receiver.message_modified(handle, True, True, None)
 
-    def _update_credit(self):
-        # ensure we have enough credit
-        if self._credit < self.capacity / 2:
-            self._receiver.add_capacity(self.capacity - self._credit)
-            self._credit = self.capacity
+    def idle_check(self):
+        """Adapt the credit of the link to the rate of the replies."""
+        self._credit.idle_check()
+        if self._ready:
+            self._credit.top_up(self._receiver)
 
 
 class Server(pyngus.ReceiverEventHandler):
     """A group of links that receive messages from a set of addresses derived
     from a given target.  Messages arriving on the links are placed on the
-    'incoming' queue.
+    'incoming' queue of the listener.
     """
-    def __init__(self, addresses, incoming):
-        self._incoming = incoming
+    def __init__(self, addresses, listener, credit_min, credit_max):
+        self._listener = listener
         self._addresses = addresses
-        self._capacity = 500   # credit per link
+        self._credit_min = credit_min
+        self._credit_max = credit_max
+        self._credit = {}  # CreditWindow of each receiver link
 
     def attach(self, connection):
         """Create receiver links over the given connection for all the
         configured addresses.
         """
         self._receivers = []
+        self._credit = {}
         for a in self._addresses:
             props = {"snd-settle-mode": "settled"}
             rname = "Consumer-%s:src=%s:tgt=%s" % (uuid.uuid4().hex, a, a)
@@ -172,14 +174,30 @@ class Server(pyngus.ReceiverEventHandler):
                                            name=rname,
                                            properties=props)
 
-            # TODO(kgiusti) Hardcoding credit here is sub-optimal.  A better
-            # approach would monitor for a back-up of inbound messages to be
-            # processed by the consuming application and backpressure the
-            # sender based on configured thresholds.
-            r.add_capacity(self._capacity)
+            self._credit[r] = credit.CreditWindow(self._credit_min,
+                                                  self._credit_max)
+            self._credit[r].top_up(r, self._backlog)
             r.open()
             self._receivers.append(r)
 
+    @property
+    def _backlog(self):
+        return self._listener.incoming.qsize()
+
+    def update_credit(self):
+        """Top up the credit of the links which was withheld while the
+        listener had a backlog.
+        """
+        for receiver, credit in self._credit.items():
+            if not credit.top_up(receiver, self._backlog):
+                self._listener.credit_withheld = True
+
+    def idle_check(self):
+        """Adapt the credit of the links to the rate of the messages."""
+        for credit in self._credit.values():
+            credit.idle_check()
+        self.update_credit()
+
     # Pyngus ReceiverLink event callbacks:
 
     def receiver_remote_closed(self, receiver, pn_condition):
@@ -197,11 +215,13 @@ class Server(pyngus.ReceiverEventHandler):
         """This is a Pyngus callback, invoked by Pyngus when a new message
         arrives on this receiver link from the peer.
         """
-        if receiver.capacity < self._capacity / 2:
-            receiver.add_capacity(self._capacity - receiver.capacity)
-        self._incoming.put(message)
+        self._listener.incoming.put(message)
         LOG.debug("message received: %s", message)
         receiver.message_accepted(handle)
+        if not self._credit[receiver].update(receiver, self._backlog):
+            # NOTE: the listener asks for an update_credit() once its
+            # backlog is consumed
+            self._listener.credit_withheld = True
 
 
 class Hosts(object):
@@ -243,6 +263,9 @@ class Controller(pyngus.ConnectionEventHandler):
     work is done on the Eventloop thread, allowing the driver to run
     asynchronously from the messaging clients.
     """
+    # seconds between two adjustments of the credit windows to the traffic
+    CREDIT_CHECK_INTERVAL = 1.0
+
     def __init__(self, hosts, default_exchange, config):
         self.processor = None
         # queue of Task() objects to execute on the eventloop once the
@@ -277,6 +300,10 @@ class Controller(pyngus.ConnectionEventHandler):
         self.ssl_key_password = config.oslo_messaging_amqp.ssl_key_password
         self.ssl_allow_insecure = \
             config.oslo_messaging_amqp.allow_insecure_clients
+        self.credit_min = config.oslo_messaging_amqp.link_credit_min
+        self.reply_link_credit = config.oslo_messaging_amqp.reply_link_credit
+        self.server_link_credit = \
+            config.oslo_messaging_amqp.server_link_credit
         self.separator = "."
         self.fanout_qualifier = "all"
         self.default_exchange = default_exchange
@@ -293,6 +320,8 @@ class Controller(pyngus.ConnectionEventHandler):
         # prevent queuing up multiple requests to run _process_tasks()
         self._process_tasks_scheduled = False
         self._process_tasks_lock = threading.Lock()
+        # only run one periodic _check_credit()
+        self._credit_check_scheduled = False
 
     def connect(self):
         """Connect to the messaging service."""
@@ -304,6 +333,21 @@ class Controller(pyngus.ConnectionEventHandler):
         self._tasks.put(task)
         self._schedule_task_processing()
 
+    def add_tasks(self, tasks):
+        """Add several Tasks for execution on processor thread, waking it up
+        once for all of them.
+        """
+        for task in tasks:
+            self._tasks.put(task)
+        self._schedule_task_processing()
+
+    def update_credit(self):
+        """Top up the credit withheld from the links of the listeners which
+        had a backlog.  Thread safe.
+        """
+        if self.processor:
+            self.processor.wakeup(lambda: self._update_credit())
+
     def shutdown(self, wait=True, timeout=None):
         """Shutdown the messaging service."""
         if self.processor:
@@ -317,13 +361,33 @@ class Controller(pyngus.ConnectionEventHandler):
 
     # methods executed by Tasks created by the driver:
 
-    def request(self, target, request, result_queue, reply_expected=False):
+    def request(self, target, request, result_queue, reply_expected=False,
+                deadline=None):
         """Send a request message to the given target and arrange for a
         result to be put on the result_queue. If reply_expected, the result
-        will include the reply message (if successful).
+        will include the reply message (if successful).  If the request is
+        not complete by the deadline a MessagingTimeout error is put on the
+        result_queue.
         """
         address = self._resolve(target)
         LOG.debug("Sending request for %s to %s", target, address)
+
+        if deadline:
+            def _expire():
+                if reply_expected and self._replies:
+                    self._replies.cancel_response(msg_id)
+                if reply_expected:
+                    reason = "Timed out waiting for a reply."
+                else:
+                    reason = "Timed out waiting for send to complete."
+                error = exceptions.MessagingTimeout(reason)
+                result_queue.put({"status": "ERROR", "error": error})
+            timer = self.processor.schedule(_expire, deadline - time.time())
+            # NOTE: the timer is cancelled as soon as the request completes,
+            # instead of keeping the request until the deadline
+            result_queue = eventloop.ExpiringResult(result_queue,
+                                                    self.processor, timer)
+
         if reply_expected:
             msg_id = self._replies.prepare_for_response(request, result_queue)
 
@@ -355,27 +419,28 @@ class Controller(pyngus.ConnectionEventHandler):
         LOG.debug("Sending response to %s", address)
         self._send(address, response)
 
-    def subscribe(self, target, in_queue):
+    def subscribe(self, target, listener):
         """Subscribe to messages sent to 'target', place received messages on
-        'in_queue'.
+        the incoming queue of 'listener'.
         """
         addresses = [
             self._server_address(target),
             self._broadcast_address(target),
             self._group_request_address(target)
         ]
-        self._subscribe(target, addresses, in_queue)
+        self._subscribe(target, addresses, listener)
 
-    def subscribe_notifications(self, target, in_queue):
+    def subscribe_notifications(self, target, listener):
         """Subscribe for notifications on 'target', place received messages on
-        'in_queue'.
+        the incoming queue of 'listener'.
         """
         addresses = [self._group_request_address(target)]
-        self._subscribe(target, addresses, in_queue)
+        self._subscribe(target, addresses, listener)
 
-    def _subscribe(self, target, addresses, in_queue):
+    def _subscribe(self, target, addresses, listener):
         LOG.debug("Subscribing to %s (%s)", target, addresses)
-        self._servers[target] = Server(addresses, in_queue)
+        self._servers[target] = Server(addresses, listener, self.credit_min,
+                                       self.server_link_credit)
         self._servers[target].attach(self._socket_connection.connection)
 
     def _resolve(self, target):
@@ -486,6 +551,25 @@ class Controller(pyngus.ConnectionEventHandler):
             if not already_scheduled:
                 self.processor.wakeup(lambda: self._process_tasks())
 
+    def _update_credit(self):
+        """Top up the credit of the links of all the servers."""
+        for server in self._servers.values():
+            server.update_credit()
+
+    def _check_credit(self):
+        """Periodically adapt the credit windows of all the receiving links
+        to the traffic.
+        """
+        if self._closing:
+            self._credit_check_scheduled = False
+            return
+        if self._replies:
+            self._replies.idle_check()
+        for server in self._servers.values():
+            server.idle_check()
+        self.processor.schedule(lambda: self._check_credit(),
+                                self.CREDIT_CHECK_INTERVAL)
+
     @property
     def _can_process_tasks(self):
         """_process_tasks helper(): indicates that the driver is ready to
@@ -548,8 +632,14 @@ class Controller(pyngus.ConnectionEventHandler):
         for s in self._servers.itervalues():
             s.attach(self._socket_connection.connection)
         self._replies = Replies(self._socket_connection.connection,
-                                lambda: self._reply_link_ready())
+                                lambda: self._reply_link_ready(),
+                                credit.CreditWindow(self.credit_min,
+                                                    self.reply_link_credit))
         self._delay = 0
+        if not self._credit_check_scheduled:
+            self._credit_check_scheduled = True
+            self.processor.schedule(lambda: self._check_credit(),
+                                    self.CREDIT_CHECK_INTERVAL)
 
     def connection_closed(self, connection):
         """This is a Pyngus callback, invoked by Pyngus when the connection has
@@ -0,0 +1,61 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Flow control of the links receiving messages from the messaging service.
+"""
+
+
+class CreditWindow(object):
+    """The adaptive credit window of a receiving link.
+
+    The window doubles, up to maximum, whenever the peer used all the credit
+    granted to the link, as more messages are likely waiting to be sent. It
+    halves, down to minimum, when no message arrived during an idle_check()
+    interval.  The link is topped up once half of the window is consumed.
+
+    The messages received but not consumed by the application yet (the
+    backlog) count against the window: when the application falls behind, no
+    more credit is granted and the sender is flow-controlled.
+    """
+    def __init__(self, minimum, maximum):
+        self.minimum = max(minimum, 1)
+        self.maximum = max(maximum, self.minimum)
+        self.window = self.minimum
+        self._received = 0
+
+    def update(self, link, backlog=0):
+        """Account for a message received on link, and top up its credit.
+        Returns False if credit was withheld because of the backlog.
+        """
+        self._received += 1
+        if link.capacity == 0 and self.window < self.maximum:
+            self.window = min(self.window * 2, self.maximum)
+        return self.top_up(link, backlog)
+
+    def top_up(self, link, backlog=0):
+        """Grant credit to link up to the window.  Returns False if credit
+        was withheld because of the backlog.
+        """
+        outstanding = link.capacity + backlog
+        if outstanding > self.window / 2:
+            return backlog < self.window / 2
+        link.add_capacity(self.window - outstanding)
+        return True
+
+    def idle_check(self):
+        """Shrink the window if no message arrived since the last check.
+        Credit already granted to the peer is not revoked.
+        """
+        if not self._received:
+            self.window = max(self.window // 2, self.minimum)
+        self._received = 0
@@ -25,12 +25,15 @@ import os
 import threading
 import time
 
+import futurist
+from futurist import waiters
 from oslo_serialization import jsonutils
 from oslo_utils import importutils
 from six import moves
 
 from oslo_messaging._drivers import base
 from oslo_messaging._drivers import common
+from oslo_messaging import exceptions
 from oslo_messaging import target as messaging_target
 
 
@@ -116,9 +119,18 @@ class ProtonListener(base.Listener):
     def __init__(self, driver):
         super(ProtonListener, self).__init__(driver)
         self.incoming = moves.queue.Queue()
-
-    def poll(self):
-        message = self.incoming.get()
+        # set by the controller when it stopped granting credit to the
+        # senders because of the messages waiting in incoming
+        self.credit_withheld = False
+
+    def poll(self, timeout=None):
+        try:
+            message = self.incoming.get(timeout=timeout)
+        except moves.queue.Empty:
+            return None
+        if self.credit_withheld and self.incoming.empty():
+            self.credit_withheld = False
+            self.driver._ctrl.update_credit()
         request, ctxt = unmarshal_request(message)
         LOG.debug("Returning incoming message")
         return ProtonIncomingMessage(self, ctxt, request, message)
@@ -173,25 +185,32 @@ class ProtonDriver(base.BaseDriver):
             return func(self, *args, **kws)
         return wrap
 
-    @_ensure_connect_called
-    def send(self, target, ctxt, message,
-             wait_for_reply=None, timeout=None, envelope=False,
-             retry=None):
-        """Send a message to the given target."""
+    @staticmethod
+    def _send_task(target, ctxt, message, wait_for_reply, timeout, envelope,
+                   retry, expire=False):
         # TODO(kgiusti) need to add support for retry
         if retry is not None:
             raise NotImplementedError('"retry" not implemented by'
                                       'this transport driver')
 
         request = marshal_request(message, ctxt, envelope)
-        expire = 0
+        deadline = 0
         if timeout:
-            expire = time.time() + timeout  # when the caller times out
+            deadline = time.time() + timeout  # when the caller times out
             # amqp uses millisecond time values, timeout is seconds
             request.ttl = int(timeout * 1000)
-            request.expiry_time = int(expire * 1000)
+            request.expiry_time = int(deadline * 1000)
+        return drivertasks.SendTask(target, request, wait_for_reply, deadline,
+                                    expire=expire)
+
+    @_ensure_connect_called
+    def send(self, target, ctxt, message,
+             wait_for_reply=None, timeout=None, envelope=False,
+             retry=None):
+        """Send a message to the given target."""
+        task = self._send_task(target, ctxt, message, wait_for_reply, timeout,
+                               envelope, retry)
         LOG.debug("Send to %s", target)
-        task = drivertasks.SendTask(target, request, wait_for_reply, expire)
         self._ctrl.add_task(task)
         # wait for the eventloop to process the command. If the command is
         # an RPC call retrieve the reply message
@@ -204,6 +223,55 @@ class ProtonDriver(base.BaseDriver):
         LOG.debug("Send to %s returning", target)
         return reply
 
+    @_ensure_connect_called
+    def send_async(self, target, ctxt, message, timeout=None, retry=None):
+        """Send a message to the given target and return a future of the
+        reply.  The caller doesn't block, so it can have many requests in
+        flight.
+        """
+        task = self._send_task(target, ctxt, message, True, timeout, False,
+                               retry, expire=True)
+        result = futurist.Future()
+
+        def _on_reply(future):
+            if not result.set_running_or_notify_cancel():
+                return
+            try:
+                reply = future.result()
+                if reply:
+                    reply = unmarshal_response(reply,
+                                               self._allowed_remote_exmods)
+            except Exception as exc:
+                result.set_exception(exc)
+            else:
+                result.set_result(reply)
+
+        task.future.add_done_callback(_on_reply)
+        LOG.debug("Send async to %s", target)
+        self._ctrl.add_task(task)
+        return result
+
+    @_ensure_connect_called
+    def send_many(self, target, ctxt, messages, timeout=None, retry=None):
+        """Send several messages to the given target.
+
+        The messages are handed to the eventloop together and are all in
+        flight at once, the call returns once the peer has settled them.
+        """
+        tasks = [self._send_task(target, ctxt, message, False, timeout,
+                                 False, retry)
+                 for message in messages]
+        LOG.debug("Send %d messages to %s", len(tasks), target)
+        self._ctrl.add_tasks(tasks)
+        done, not_done = waiters.wait_for_all([task.future for task in tasks],
+                                              timeout)
+        if not_done:
+            raise exceptions.MessagingTimeout(
+                "Timed out waiting for %d of %d sends to complete." %
+                (len(not_done), len(tasks)))
+        for task in tasks:
+            task.future.result()
+
     @_ensure_connect_called
     def send_notification(self, target, ctxt, message, version,
                           retry=None):
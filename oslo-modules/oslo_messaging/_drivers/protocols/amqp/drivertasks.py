@@ -16,26 +16,46 @@ import logging
 import threading
 import time
 
+import futurist
+from futurist import waiters
+
 from oslo_messaging._drivers.protocols.amqp import controller
 from oslo_messaging import exceptions
 
-from six import moves
-
 LOG = logging.getLogger(__name__)
 
 
 class SendTask(controller.Task):
     """A task that sends a message to a target, and optionally waits for a
-    reply message.  The caller may block until the remote confirms receipt or
-    the reply message has arrived.
+    reply message.  The outcome is available from the 'future' attribute, the
+    caller may block until the remote confirms receipt or the reply message
+    has arrived.
+
+    If expire is True the request fails with a MessagingTimeout at the
+    deadline, for the callers which don't wait for the task themselves.
     """
-    def __init__(self, target, request, wait_for_reply, deadline):
+    def __init__(self, target, request, wait_for_reply, deadline,
+                 expire=False):
         super(SendTask, self).__init__()
         self._target = target
         self._request = request
         self._deadline = deadline
         self._wait_for_reply = wait_for_reply
-        self._results_queue = moves.queue.Queue()
+        self._expire = expire
+        self.future = futurist.Future()
+
+    def put(self, result):
+        """Complete the task with the result of the request, invoked on the
+        eventloop thread by the controller.
+        """
+        if self.future.done():
+            # NOTE: the request expired before its result arrived
+            return
+        self.future.set_running_or_notify_cancel()
+        if result["status"] == "OK":
+            self.future.set_result(result.get("response", None))
+        else:
+            self.future.set_exception(result["error"])
 
     def wait(self, timeout):
         """Wait for the send to complete, and, optionally, a reply message from
@@ -43,25 +63,30 @@ class SendTask(controller.Task):
         or no reply is received within timeout seconds. If the request has
         failed for any other reason, a MessagingException is raised."
         """
-        try:
-            result = self._results_queue.get(timeout=timeout)
-        except moves.queue.Empty:
+        done, _not_done = waiters.wait_for_all([self.future], timeout)
+        if not done:
             if self._wait_for_reply:
                 reason = "Timed out waiting for a reply."
             else:
                 reason = "Timed out waiting for send to complete."
             raise exceptions.MessagingTimeout(reason)
-        if result["status"] == "OK":
-            return result.get("response", None)
-        raise result["error"]
+        return self.future.result()
 
     def execute(self, controller):
         """Runs on eventloop thread - sends request."""
         if not self._deadline or self._deadline > time.time():
-            controller.request(self._target, self._request,
-                               self._results_queue, self._wait_for_reply)
+            controller.request(self._target, self._request, self,
+                               self._wait_for_reply,
+                               deadline=self._deadline if self._expire
+                               else None)
         else:
             LOG.warn("Send request to %s aborted: TTL expired.", self._target)
+            self.put({"status": "ERROR",
+                      "error": exceptions.MessagingTimeout(
+                          "Send request aborted: TTL expired.")})
+        # NOTE: the message is not needed anymore once sent, don't keep it
+        # while waiting for the outcome
+        self._request = None
 
 
 class ListenTask(controller.Task):
@@ -80,10 +105,9 @@ class ListenTask(controller.Task):
         are queued to the listener's incoming queue.
         """
         if self._notifications:
-            controller.subscribe_notifications(self._target,
-                                               self._listener.incoming)
+            controller.subscribe_notifications(self._target, self._listener)
         else:
-            controller.subscribe(self._target, self._listener.incoming)
+            controller.subscribe(self._target, self._listener)
 
 
 class ReplyTask(controller.Task):
@@ -24,6 +24,7 @@ the background thread via callables.
 
 import errno
 import heapq
+import itertools
 import logging
 import os
 import select
@@ -33,9 +34,11 @@ import threading
 import time
 import uuid
 
-import pyngus
+from oslo_utils import importutils
 from six import moves
 
+pyngus = importutils.try_import('pyngus')
+
 LOG = logging.getLogger(__name__)
 
 
@@ -169,17 +172,30 @@ class Schedule(object):
     """
     def __init__(self):
         self._entries = []
+        self._sequence = itertools.count()
 
     def schedule(self, request, delay):
-        """Request a callable be executed after delay."""
-        entry = (time.time() + delay, request)
+        """Request a callable be executed after delay. Returns a handle which
+        can be given to cancel().
+        """
+        # NOTE: the sequence number orders the callables due at the same
+        # time, so they are never compared
+        entry = [time.time() + delay, next(self._sequence), request]
         heapq.heappush(self._entries, entry)
+        return entry
+
+    @staticmethod
+    def cancel(entry):
+        """Cancel a callable scheduled by schedule(), if not run yet."""
+        entry[2] = None
 
     def get_delay(self, max_delay=None):
         """Get the delay in milliseconds until the next callable needs to be
         run, or 'max_delay' if no outstanding callables or the delay to the
         next callable is > 'max_delay'.
         """
+        while self._entries and self._entries[0][2] is None:
+            heapq.heappop(self._entries)
         due = self._entries[0][0] if self._entries else None
         if due is None:
             return max_delay
@@ -192,7 +208,26 @@ class Schedule(object):
     def process(self):
         """Invoke all expired callables."""
         while self._entries and self._entries[0][0] < time.time():
-            heapq.heappop(self._entries)[1]()
+            request = heapq.heappop(self._entries)[2]
+            if request is not None:
+                request()
+
+
+class ExpiringResult(object):
+    """Pass the result of a request on to result_queue, cancelling the timer
+    which expires the request.
+    """
+
+    __slots__ = ('_result_queue', '_processor', '_timer')
+
+    def __init__(self, result_queue, processor, timer):
+        self._result_queue = result_queue
+        self._processor = processor
+        self._timer = timer
+
+    def put(self, result):
+        self._processor.cancel(self._timer)
+        self._result_queue.put(result)
 
 
 class Requests(object):
@@ -270,8 +305,14 @@ class Thread(threading.Thread):
     # eventloop thread
 
     def schedule(self, request, delay):
-        """Invoke request after delay seconds."""
-        self._schedule.schedule(request, delay)
+        """Invoke request after delay seconds. Returns a handle which can be
+        given to cancel().
+        """
+        return self._schedule.schedule(request, delay)
+
+    def cancel(self, handle):
+        """Cancel a request scheduled by schedule()."""
+        self._schedule.cancel(handle)
 
     def connect(self, host, handler, properties=None, name=None):
         """Get a _SocketConnection to a peer represented by url."""
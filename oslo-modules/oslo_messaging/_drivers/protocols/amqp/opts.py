@@ -69,5 +69,22 @@ amqp1_opts = [
     cfg.BoolOpt('allow_insecure_clients',
                 default=False,
                 deprecated_group='amqp1',
-                help='Accept clients using either SSL or plain TCP')
+                help='Accept clients using either SSL or plain TCP'),
+
+    cfg.IntOpt('link_credit_min',
+               default=10,
+               help='Initial and minimum credit window of the receiving '
+                    'links, the window grows while messages are waiting to '
+                    'be sent by the peer and shrinks when the link is idle'),
+
+    cfg.IntOpt('reply_link_credit',
+               default=200,
+               help='Maximum credit window of the link receiving the RPC '
+                    'replies'),
+
+    cfg.IntOpt('server_link_credit',
+               default=500,
+               help='Maximum credit window of each link of an RPC server or '
+                    'notification listener, the messages not processed yet '
+                    'by the listener count against it')
 ]
@@ -0,0 +1,210 @@
+#    Copyright 2015 Mirantis, Inc.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import logging
+import threading
+import uuid
+
+import futurist
+
+import oslo_messaging
+from oslo_messaging._drivers import common as rpc_common
+from oslo_messaging._drivers.zmq_driver.client.publishers\
+    import zmq_publisher_base
+from oslo_messaging._drivers.zmq_driver import zmq_address
+from oslo_messaging._drivers.zmq_driver import zmq_async
+from oslo_messaging._drivers.zmq_driver import zmq_names
+from oslo_messaging._drivers.zmq_driver import zmq_socket
+from oslo_messaging._i18n import _LE, _LI, _LW
+
+LOG = logging.getLogger(__name__)
+
+zmq = zmq_async.import_zmq()
+
+# NOTE: the replies thread checks whether the publisher is being cleaned up
+# between its polls, keep them short.
+_REPLY_POLL_TIMEOUT = 0.1
+
+# Seconds cleanup() waits for the replies thread to close its sockets.
+_CLOSE_TIMEOUT = 1
+
+
+class DealerCallPublisher(zmq_publisher_base.PublisherBase):
+
+    """Publisher of CALL requests over persistent DEALER sockets
+
+    A single DEALER socket is connected to each host and shared by all the
+    calls to that host, so concurrent calls are multiplexed over one
+    connection instead of creating a context and a REQ socket per call.
+    The replies are matched to the calls by message id.
+
+    zmq sockets must not be used by several threads at once: the DEALER
+    sockets are only used by the thread of the ReplyReceiver. The calling
+    threads hand it their requests in turn through an inproc PAIR socket.
+
+    The message id is sent in a frame of its own after the message type.
+    The servers also accept the CALLs without message id of the clients
+    using REQ sockets, but older servers can't read the CALLs sent by this
+    publisher: the servers must be upgraded before the clients.
+    """
+
+    def __init__(self, conf, matchmaker):
+        super(DealerCallPublisher, self).__init__(conf, matchmaker)
+        self._lock = threading.Lock()
+        address = 'inproc://oslo_messaging-calls-%s' % uuid.uuid4().hex
+        self.reply_receiver = ReplyReceiver(conf, self.codec,
+                                            self.zmq_context, address)
+        self._requests = zmq_socket.ZmqSocket(self.zmq_context, zmq.PAIR)
+        self._requests.connect(address)
+
+    def send_request(self, request):
+
+        if request.msg_type != zmq_names.CALL_TYPE:
+            raise zmq_publisher_base.UnsupportedSendPattern(request.msg_type)
+
+        host = self.matchmaker.get_single_host(request.target)
+        message_id = str(uuid.uuid4())
+        reply_future = self.reply_receiver.track(message_id)
+        try:
+            with self._lock:
+                self._send_request(self._requests, host, request, message_id)
+            reply = reply_future.result(timeout=request.timeout)
+        except futurist.TimeoutError:
+            raise oslo_messaging.MessagingTimeout(
+                "Timeout %s seconds was reached" % request.timeout)
+        finally:
+            self.reply_receiver.untrack(message_id)
+
+        if reply[zmq_names.FIELD_FAILURE]:
+            raise rpc_common.deserialize_remote_exception(
+                reply[zmq_names.FIELD_FAILURE],
+                request.allowed_remote_exmods)
+        return reply[zmq_names.FIELD_REPLY]
+
+    def _send_request(self, socket, host, request, message_id):
+        socket.send_string(host, zmq.SNDMORE)
+        socket.send_string(request.msg_type, zmq.SNDMORE)
+        socket.send_string(message_id, zmq.SNDMORE)
+        self.codec.send(socket, request.context, zmq.SNDMORE)
+        self.codec.send(socket, request.message)
+
+    def cleanup(self):
+        self.reply_receiver.cleanup()
+        self._requests.setsockopt(zmq.LINGER, 0)
+        self._requests.close()
+        super(DealerCallPublisher, self).cleanup()
+
+
+class ReplyReceiver(object):
+
+    """Owner of the DEALER sockets of the calls
+
+    Its thread forwards the requests received on the inproc PAIR socket to
+    the DEALER socket of their host, connected on first use, and resolves
+    the futures of the calls with the replies received on these sockets.
+    """
+
+    def __init__(self, conf, codec, context, address):
+        self.codec = codec
+        self.context = context
+        self.replies = {}
+        self.sockets = {}
+        self.requests = zmq_socket.ZmqSocket(context, zmq.PAIR)
+        self.requests.handle.bind(address)
+        self._closing = threading.Event()
+        self._closed = threading.Event()
+        self.poller = zmq_async.get_poller(conf.rpc_zmq_concurrency)
+        self.poller.register(self.requests.handle, self._forward_request)
+        self.thread = zmq_async.get_executor(self.poll_for_replies,
+                                             conf.rpc_zmq_concurrency)
+        self.thread.execute()
+
+    def _forward_request(self, socket):
+        # host, msg_type, message id, context, message
+        frames = socket.recv_multipart(copy=False)
+        host = frames[0].bytes.decode('utf-8')
+        try:
+            dealer = self.sockets.get(host)
+            if dealer is None:
+                dealer = self._connect_to_host(host)
+            dealer.send_multipart([b''] + frames[1:], zmq.NOBLOCK,
+                                  copy=False)
+        except zmq.ZMQError as e:
+            errmsg = _LE("Failed to send a request to %(host)s: %(e)s") % {
+                "host": host, "e": e}
+            LOG.error(errmsg)
+            reply_future = self.replies.get(frames[2].bytes.decode('utf-8'))
+            if reply_future is not None:
+                reply_future.set_exception(rpc_common.RPCException(errmsg))
+
+    def _connect_to_host(self, host):
+        connect_address = zmq_address.get_tcp_direct_address(host)
+        socket = zmq_socket.ZmqSocket(self.context, zmq.DEALER)
+        LOG.info(_LI("Connecting DEALER to %s") % connect_address)
+        try:
+            socket.connect(connect_address)
+        except zmq.ZMQError:
+            socket.close()
+            raise
+        self.sockets[host] = socket
+        self.poller.register(socket.handle, self._receive_reply)
+        return socket
+
+    def _receive_reply(self, socket):
+        empty = socket.recv()
+        assert empty == b"", "Empty delimiter expected"
+        return self.codec.recv(socket)
+
+    def track(self, message_id):
+        reply_future = futurist.Future()
+        self.replies[message_id] = reply_future
+        return reply_future
+
+    def untrack(self, message_id):
+        self.replies.pop(message_id, None)
+
+    def poll_for_replies(self):
+        if self._closing.is_set():
+            self._close()
+            return
+        reply, socket = self.poller.poll(timeout=_REPLY_POLL_TIMEOUT)
+        if reply is None:
+            return
+        reply_future = self.replies.pop(reply[zmq_names.FIELD_ID], None)
+        if reply_future is None:
+            LOG.warning(_LW("Dropping reply to message %s, the call is not "
+                            "waiting for it anymore")
+                        % reply[zmq_names.FIELD_ID])
+            return
+        reply_future.set_result(reply)
+
+    def _close(self):
+        # NOTE: the DEALER sockets are closed by the thread using them, an
+        # eventlet green socket can't be closed by another native thread
+        self.poller.close()
+        for socket in self.sockets.values():
+            socket.setsockopt(zmq.LINGER, 0)
+            socket.close()
+        self.sockets = {}
+        self._closed.set()
+        self.thread.stop()
+
+    def cleanup(self):
+        self._closing.set()
+        if not self._closed.wait(_CLOSE_TIMEOUT):
+            LOG.warning(_LW("The thread receiving the replies did not close "
+                            "its sockets"))
+            self.thread.stop()
+        self.requests.setsockopt(zmq.LINGER, 0)
+        self.requests.close()
@@ -30,7 +30,7 @@ class DealerPublisher(zmq_publisher_base.PublisherMultisend):
 
     def __init__(self, conf, matchmaker):
         super(DealerPublisher, self).__init__(conf, matchmaker, zmq.DEALER)
-        self.ack_receiver = AcknowledgementReceiver()
+        self.ack_receiver = AcknowledgementReceiver(self.codec)
 
     def send_request(self, request):
 
@@ -63,8 +63,8 @@ class DealerPublisher(zmq_publisher_base.PublisherMultisend):
         socket.send(b'', zmq.SNDMORE)
         socket.send_string(request.msg_type, zmq.SNDMORE)
         socket.send_string(message_id, zmq.SNDMORE)
-        socket.send_pyobj(request.context, zmq.SNDMORE)
-        socket.send_pyobj(request.message)
+        self.codec.send(socket, request.context, zmq.SNDMORE)
+        self.codec.send(socket, request.message)
 
         LOG.info(_LI("Sending message %(message)s to a target %(target)s")
                  % {"message": request.message,
@@ -77,7 +77,8 @@ class DealerPublisher(zmq_publisher_base.PublisherMultisend):
 
 class AcknowledgementReceiver(object):
 
-    def __init__(self):
+    def __init__(self, codec):
+        self.codec = codec
         self.poller = zmq_async.get_poller()
         self.thread = zmq_async.get_executor(self.poll_for_acknowledgements)
         self.thread.execute()
@@ -85,7 +86,7 @@ class AcknowledgementReceiver(object):
     def _receive_acknowledgement(self, socket):
         empty = socket.recv()
         assert empty == b"", "Empty delimiter expected"
-        ack_message = socket.recv_pyobj()
+        ack_message = self.codec.recv(socket)
         return ack_message
 
     def track_socket(self, socket):
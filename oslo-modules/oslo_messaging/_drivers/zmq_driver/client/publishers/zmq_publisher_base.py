@@ -20,6 +20,7 @@ import six
 from oslo_messaging._drivers import common as rpc_common
 from oslo_messaging._drivers.zmq_driver import zmq_address
 from oslo_messaging._drivers.zmq_driver import zmq_async
+from oslo_messaging._drivers.zmq_driver import zmq_codec
 from oslo_messaging._drivers.zmq_driver import zmq_names
 from oslo_messaging._drivers.zmq_driver import zmq_socket
 from oslo_messaging._i18n import _LE, _LI
@@ -61,7 +62,8 @@ class PublisherBase(object):
         """Construct publisher
 
         Accept configuration object and Name Service interface object.
-        Create zmq.Context and connected sockets dictionary.
+        Create zmq.Context and connected sockets dictionary, select the
+        wire codec.
 
         :param conf: configuration object
         :type conf: oslo_config.CONF
@@ -70,6 +72,7 @@ class PublisherBase(object):
         """
 
         self.conf = conf
+        self.codec = zmq_codec.get_codec(conf)
         self.zmq_context = zmq.Context()
         self.matchmaker = matchmaker
         self.outbound_sockets = {}
@@ -93,8 +96,8 @@ class PublisherBase(object):
         :type request: zmq_request.Request
         """
         socket.send_string(request.msg_type, zmq.SNDMORE)
-        socket.send_pyobj(request.context, zmq.SNDMORE)
-        socket.send_pyobj(request.message)
+        self.codec.send(socket, request.context, zmq.SNDMORE)
+        self.codec.send(socket, request.message)
 
     def cleanup(self):
         """Cleanup publisher. Close allocated connections."""
@@ -110,8 +113,6 @@ class PublisherMultisend(PublisherBase):
         super(PublisherMultisend, self).__init__(conf, matchmaker)
 
     def _check_hosts_connections(self, target):
-        #  TODO(ozamiatin): Place for significant optimization
-        #  Matchmaker cache should be implemented
         hosts = self.matchmaker.get_hosts(target)
         if str(target) in self.outbound_sockets:
             socket = self.outbound_sockets[str(target)]
@@ -15,9 +15,9 @@
 import contextlib
 
 from oslo_messaging._drivers.zmq_driver.client.publishers\
-    import zmq_dealer_publisher
+    import zmq_dealer_call_publisher
 from oslo_messaging._drivers.zmq_driver.client.publishers\
-    import zmq_req_publisher
+    import zmq_dealer_publisher
 from oslo_messaging._drivers.zmq_driver.client import zmq_request
 from oslo_messaging._drivers.zmq_driver import zmq_async
 
@@ -33,15 +33,15 @@ class ZmqClient(object):
         self.allowed_remote_exmods = allowed_remote_exmods or []
         self.dealer_publisher = zmq_dealer_publisher.DealerPublisher(
             conf, matchmaker)
+        self.call_publisher = zmq_dealer_call_publisher.DealerCallPublisher(
+            conf, matchmaker)
 
     def send_call(self, target, context, message, timeout=None, retry=None):
         with contextlib.closing(zmq_request.CallRequest(
                 target, context=context, message=message,
                 timeout=timeout, retry=retry,
                 allowed_remote_exmods=self.allowed_remote_exmods)) as request:
-            with contextlib.closing(zmq_req_publisher.ReqPublisher(
-                    self.conf, self.matchmaker)) as req_publisher:
-                return req_publisher.send_request(request)
+            return self.call_publisher.send_request(request)
 
     def send_cast(self, target, context, message, timeout=None, retry=None):
         with contextlib.closing(zmq_request.CastRequest(
@@ -69,4 +69,5 @@ class ZmqClient(object):
             self.dealer_publisher.send_request(request)
 
     def cleanup(self):
+        self.call_publisher.cleanup()
         self.dealer_publisher.cleanup()
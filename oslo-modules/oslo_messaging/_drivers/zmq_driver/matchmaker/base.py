@@ -52,6 +52,31 @@ class MatchMakerBase(object):
        :returns: a list of "hostname:port" hosts
        """
 
+    def get_hosts_many(self, targets):
+        """Get the hosts of several targets from nameserver.
+
+       Matchmakers able to fetch them in a single round-trip should
+       override this.
+
+       :param targets: the targets to look up
+       :type targets: list of Target
+       :returns: a list of "hostname:port" hosts lists, in targets order
+       """
+        return [self.get_hosts(target) for target in targets]
+
+    def watch(self, callback):
+        """Call callback whenever a target is registered on nameserver,
+        from any process.
+
+       :param callback: function called without argument
+       :type callback: callable
+       :returns: False if the matchmaker is not able to watch registrations
+       """
+        return False
+
+    def cleanup(self):
+        """Release the resources of the matchmaker."""
+
     def get_single_host(self, target):
         """Get a single host by target.
 
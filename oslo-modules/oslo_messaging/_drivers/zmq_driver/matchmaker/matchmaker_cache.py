@@ -0,0 +1,123 @@
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import logging
+import threading
+
+from oslo_utils import timeutils
+
+from oslo_messaging._drivers.zmq_driver.matchmaker import base
+from oslo_messaging._drivers.zmq_driver import zmq_async
+from oslo_messaging._i18n import _LE
+
+
+LOG = logging.getLogger(__name__)
+
+
+class CachingMatchMaker(base.MatchMakerBase):
+
+    """Matchmaker caching the hosts of the targets of another matchmaker.
+
+    The hosts of a target are kept for ttl seconds, an empty list of hosts
+    for negative_ttl seconds. When refresh_interval is set, the cached
+    targets are refreshed in the background every refresh_interval seconds
+    by a single get_hosts_many() call, so that, with refresh_interval lower
+    than ttl, sending to a known target never waits for the nameserver.
+    Only the targets looked up within the last ttl seconds are refreshed,
+    the others are evicted.
+
+    The cache is dropped when a target is registered, by this process or by
+    any other one if the matchmaker supports watch().
+    """
+
+    def __init__(self, conf, matchmaker, ttl, negative_ttl=0,
+                 refresh_interval=0):
+        super(CachingMatchMaker, self).__init__(conf)
+        self.matchmaker = matchmaker
+        self._ttl = ttl
+        self._negative_ttl = negative_ttl
+        self._refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        # str(target) -> [target, hosts, expiration time, last lookup time]
+        self._cache = {}
+        self._stopped = threading.Event()
+        self._refresher = None
+        if refresh_interval:
+            self._refresher = zmq_async.get_executor(self._refresh)
+            self._refresher.execute()
+        self.matchmaker.watch(self.invalidate)
+
+    def invalidate(self):
+        """Drop all the cached hosts."""
+        with self._lock:
+            self._cache.clear()
+
+    def _expiration(self, hosts, now):
+        return now + (self._ttl if hosts else self._negative_ttl)
+
+    def register(self, target, hostname):
+        self.matchmaker.register(target, hostname)
+        self.invalidate()
+
+    def get_hosts(self, target):
+        key = str(target)
+        now = timeutils.now()
+        entry = self._cache.get(key)
+        if entry is not None and entry[2] > now:
+            entry[3] = now
+            return entry[1]
+
+        hosts = list(self.matchmaker.get_hosts(target))
+        with self._lock:
+            self._cache[key] = [target, hosts, self._expiration(hosts, now),
+                                now]
+        return hosts
+
+    def get_hosts_many(self, targets):
+        return [self.get_hosts(target) for target in targets]
+
+    def _refresh(self):
+        if self._stopped.wait(self._refresh_interval):
+            return
+        now = timeutils.now()
+        entries = []
+        with self._lock:
+            for key, entry in list(self._cache.items()):
+                if entry[3] + self._ttl > now:
+                    entries.append((key, entry))
+                else:
+                    del self._cache[key]
+        if not entries:
+            return
+
+        try:
+            hosts_many = self.matchmaker.get_hosts_many(
+                [entry[0] for key, entry in entries])
+        except Exception:
+            LOG.exception(_LE("Failed to refresh the matchmaker cache"))
+            return
+        with self._lock:
+            for (key, entry), hosts in zip(entries, hosts_many):
+                # NOTE: the entry is not put back if the cache was
+                # invalidated during the lookup
+                if self._cache.get(key) is entry:
+                    hosts = list(hosts)
+                    entry[1] = hosts
+                    entry[2] = self._expiration(hosts, now)
+
+    def cleanup(self):
+        self._stopped.set()
+        if self._refresher is not None:
+            self._refresher.stop()
+            self._refresher = None
+        self.matchmaker.cleanup()
@@ -35,6 +35,10 @@ matchmaker_redis_opts = [
                help='Password for Redis server (optional).'),
 ]
 
+# NOTE: the keys of the registered targets are published on this channel so
+# that the matchmaker caches of all the processes can drop their entries.
+_UPDATES_CHANNEL = "ZMQ-target-updates"
+
 
 class RedisMatchMaker(base.MatchMakerBase):
 
@@ -47,6 +51,7 @@ class RedisMatchMaker(base.MatchMakerBase):
             port=self.conf.matchmaker_redis.port,
             password=self.conf.matchmaker_redis.password,
         )
+        self._watcher = None
 
     def _target_to_key(self, target):
         attributes = ['topic', 'exchange', 'server']
@@ -64,6 +69,7 @@ class RedisMatchMaker(base.MatchMakerBase):
         key = self._target_to_key(target)
         if hostname not in self._get_hosts_by_key(key):
             self._redis.lpush(key, hostname)
+            self._redis.publish(_UPDATES_CHANNEL, key)
 
     def get_hosts(self, target):
         pattern = self._target_to_key(target)
@@ -75,3 +81,44 @@ class RedisMatchMaker(base.MatchMakerBase):
         for key in self._get_keys_by_pattern(pattern):
             hosts.extend(self._get_hosts_by_key(key))
         return hosts
+
+    def get_hosts_many(self, targets):
+        patterns = [self._target_to_key(target) for target in targets]
+
+        # NOTE: two pipelined round-trips whatever the number of targets,
+        # the first one resolves the patterns, the second one the hosts.
+        wildcards = list(set(p for p in patterns if "*" in p))
+        pipe = self._redis.pipeline(transaction=False)
+        for pattern in wildcards:
+            pipe.keys(pattern)
+        keys_by_pattern = dict(zip(wildcards, pipe.execute()))
+        for pattern in patterns:
+            keys_by_pattern.setdefault(pattern, [pattern])
+
+        keys = list(set(key for pattern_keys in keys_by_pattern.values()
+                        for key in pattern_keys))
+        pipe = self._redis.pipeline(transaction=False)
+        for key in keys:
+            pipe.lrange(key, 0, -1)
+        hosts_by_key = dict(zip(keys, pipe.execute()))
+
+        hosts_many = []
+        for pattern in patterns:
+            hosts = []
+            for key in keys_by_pattern[pattern]:
+                hosts.extend(hosts_by_key[key])
+            hosts_many.append(hosts)
+        return hosts_many
+
+    def watch(self, callback):
+        if self._watcher is not None:
+            return False
+        pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{_UPDATES_CHANNEL: lambda message: callback()})
+        self._watcher = pubsub.run_in_thread(sleep_time=1)
+        return True
+
+    def cleanup(self):
+        if self._watcher is not None:
+            self._watcher.stop()
+            self._watcher = None
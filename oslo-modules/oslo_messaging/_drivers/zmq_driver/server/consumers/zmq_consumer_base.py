@@ -19,6 +19,7 @@ import six
 
 from oslo_messaging._drivers import common as rpc_common
 from oslo_messaging._drivers.zmq_driver import zmq_async
+from oslo_messaging._drivers.zmq_driver import zmq_codec
 from oslo_messaging._drivers.zmq_driver import zmq_socket
 from oslo_messaging._i18n import _LE, _LI
 
@@ -34,6 +35,7 @@ class ConsumerBase(object):
         self.conf = conf
         self.poller = poller
         self.server = server
+        self.codec = zmq_codec.get_codec(conf)
         self.sockets = []
         self.context = zmq.Context()
 
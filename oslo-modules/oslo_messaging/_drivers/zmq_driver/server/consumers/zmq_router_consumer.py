@@ -30,8 +30,9 @@ zmq = zmq_async.import_zmq()
 class RouterIncomingMessage(base.IncomingMessage):
 
     def __init__(self, listener, context, message, socket, reply_id, msg_id,
-                 poller):
+                 poller, codec):
         super(RouterIncomingMessage, self).__init__(listener, context, message)
+        self.codec = codec
         self.socket = socket
         self.reply_id = reply_id
         self.msg_id = msg_id
@@ -46,7 +47,7 @@ class RouterIncomingMessage(base.IncomingMessage):
         ack_message = {zmq_names.FIELD_ID: self.msg_id}
         self.socket.send(self.reply_id, zmq.SNDMORE)
         self.socket.send(b'', zmq.SNDMORE)
-        self.socket.send_pyobj(ack_message)
+        self.codec.send(self.socket, ack_message)
 
     def requeue(self):
         """Requeue is not supported"""
@@ -69,12 +70,15 @@ class RouterConsumer(zmq_consumer_base.SingleSocketConsumer):
             msg_type = socket.recv_string()
             assert msg_type is not None, 'Bad format: msg type expected'
 
+            # NOTE: the CALLs of the clients using REQ sockets carry no
+            # message id, they are accepted during rolling upgrades
+            frames = socket.recv_multipart(copy=False)
             msg_id = None
-            if msg_type != zmq_names.CALL_TYPE:
-                msg_id = socket.recv_string()
-
-            context = socket.recv_pyobj()
-            message = socket.recv_pyobj()
+            if msg_type != zmq_names.CALL_TYPE or len(frames) > 2:
+                msg_id = frames.pop(0).bytes.decode('utf-8')
+            assert len(frames) == 2, 'Bad format: context and message expected'
+            context = self.codec.loads(frames[0])
+            message = self.codec.loads(frames[1])
             LOG.info(_LI("Received %(msg_type)s message %(msg)s")
                      % {"msg_type": msg_type,
                         "msg": str(message)})
@@ -82,11 +86,11 @@ class RouterConsumer(zmq_consumer_base.SingleSocketConsumer):
             if msg_type == zmq_names.CALL_TYPE:
                 return zmq_incoming_message.ZmqIncomingRequest(
                     self.server, context, message, socket, reply_id,
-                    self.poller)
+                    msg_id, self.poller, self.codec)
             elif msg_type in (zmq_names.CAST_TYPES + zmq_names.NOTIFY_TYPES):
                 return RouterIncomingMessage(
                     self.server, context, message, socket, reply_id,
-                    msg_id, self.poller)
+                    msg_id, self.poller, self.codec)
             else:
                 LOG.error(_LE("Unknown message type: %s") % msg_type)
 
@@ -28,10 +28,13 @@ zmq = zmq_async.import_zmq()
 
 class ZmqIncomingRequest(base.IncomingMessage):
 
-    def __init__(self, listener, context, message, socket, rep_id, poller):
+    def __init__(self, listener, context, message, socket, rep_id, msg_id,
+                 poller, codec):
         super(ZmqIncomingRequest, self).__init__(listener, context, message)
+        self.codec = codec
         self.reply_socket = socket
         self.reply_id = rep_id
+        self.msg_id = msg_id
         self.received = None
         self.poller = poller
 
@@ -39,7 +42,8 @@ class ZmqIncomingRequest(base.IncomingMessage):
         if failure is not None:
             failure = rpc_common.serialize_remote_exception(failure,
                                                             log_failure)
-        message_reply = {zmq_names.FIELD_REPLY: reply,
+        message_reply = {zmq_names.FIELD_ID: self.msg_id,
+                         zmq_names.FIELD_REPLY: reply,
                          zmq_names.FIELD_FAILURE: failure,
                          zmq_names.FIELD_LOG_FAILURE: log_failure}
 
@@ -48,7 +52,7 @@ class ZmqIncomingRequest(base.IncomingMessage):
         self.received = True
         self.reply_socket.send(self.reply_id, zmq.SNDMORE)
         self.reply_socket.send(b'', zmq.SNDMORE)
-        self.reply_socket.send_pyobj(message_reply)
+        self.codec.send(self.reply_socket, message_reply)
         self.poller.resume_polling(self.reply_socket)
 
     def requeue(self):
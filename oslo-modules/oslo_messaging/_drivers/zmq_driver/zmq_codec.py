@@ -0,0 +1,88 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import abc
+
+from oslo_serialization import jsonutils
+from oslo_serialization import msgpackutils
+import six
+from six.moves import cPickle
+
+from oslo_messaging._drivers.zmq_driver import zmq_async
+
+zmq = zmq_async.import_zmq()
+
+
+@six.add_metaclass(abc.ABCMeta)
+class Codec(object):
+
+    """Wire format of the objects sent in zmq message frames
+
+    The frames are sent and received with copy=False: zmq takes the encoded
+    buffer as is and the decoders read the received frame in place when
+    they can.
+    """
+
+    @abc.abstractmethod
+    def dumps(self, obj):
+        """Encode obj into bytes"""
+
+    @abc.abstractmethod
+    def loads(self, frame):
+        """Decode a received zmq.Frame"""
+
+    def send(self, socket, obj, flags=0):
+        """Send obj in a frame of socket"""
+        socket.send(self.dumps(obj), flags, copy=False)
+
+    def recv(self, socket):
+        """Receive and decode the next frame of socket"""
+        return self.loads(socket.recv(copy=False))
+
+
+class MsgpackCodec(Codec):
+
+    def dumps(self, obj):
+        return msgpackutils.dumps(obj)
+
+    def loads(self, frame):
+        return msgpackutils.loads(frame.buffer)
+
+
+class JsonCodec(Codec):
+
+    def dumps(self, obj):
+        return jsonutils.dumps(obj).encode('utf-8')
+
+    def loads(self, frame):
+        return jsonutils.loads(frame.bytes)
+
+
+class PickleCodec(Codec):
+
+    def dumps(self, obj):
+        return cPickle.dumps(obj, cPickle.HIGHEST_PROTOCOL)
+
+    def loads(self, frame):
+        return cPickle.loads(frame.bytes)
+
+
+CODECS = {
+    'msgpack': MsgpackCodec(),
+    'json': JsonCodec(),
+    'pickle': PickleCodec(),
+}
+
+
+def get_codec(conf):
+    """Return the codec selected by the rpc_zmq_serialization option"""
+    return CODECS[conf.rpc_zmq_serialization]
@@ -16,6 +16,8 @@ import abc
 
 import six
 
+from oslo_messaging._drivers import common as rpc_common
+
 
 @six.add_metaclass(abc.ABCMeta)
 class ExecutorBase(object):
@@ -39,3 +41,27 @@ class ExecutorBase(object):
     @abc.abstractmethod
     def wait(self):
         "Wait until the executor has stopped polling."
+
+    def get_statistics(self):
+        "Return a dict of statistics about the message processing."
+        return {}
+
+    def _poll_batch(self):
+        """Return a list of at most batch_size incoming messages for a batch
+        dispatcher, polled for at most its batch_timeout seconds.
+        """
+        batch_size = self.dispatcher.batch_size
+        batch_timeout = self.dispatcher.batch_timeout
+        timer = rpc_common.DecayingTimer(duration=batch_timeout)
+        timer.start()
+        incoming = self.listener.poll_batch(batch_size, timeout=batch_timeout)
+        while incoming and len(incoming) < batch_size:
+            timeout = timer.check_return()
+            if timeout is not None and timeout <= 0:
+                break
+            more = self.listener.poll_batch(batch_size - len(incoming),
+                                            timeout=timeout)
+            if not more:
+                break
+            incoming.extend(more)
+        return incoming
@@ -0,0 +1,163 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import functools
+import logging
+import threading
+
+from oslo_messaging._executors import base
+from oslo_messaging._i18n import _LE
+from oslo_messaging import _utils as utils
+
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
+
+LOG = logging.getLogger(__name__)
+
+
+class AsyncioExecutor(base.ExecutorBase):
+    """A message executor which integrates with an asyncio event loop.
+
+    The listener is polled with its poll_async() method and the incoming
+    messages are dispatched from the event loop. Endpoint methods may be
+    coroutine functions: their coroutines are run by the event loop, so a
+    single thread handles any number of concurrent messages. Regular endpoint
+    methods are called from the event loop too and must not block it.
+
+    If start() is called from a running event loop, the executor uses that
+    loop and wait() must then be called from another thread. Otherwise the
+    executor runs a new event loop in its own thread::
+
+        class TestEndpoint(object):
+            async def test(self, ctxt, arg):
+                await asyncio.sleep(1)
+                return arg
+
+        server = oslo_messaging.get_rpc_server(transport, target,
+                                               [TestEndpoint()],
+                                               executor='asyncio')
+
+    Batch notification listeners are supported: their batches are polled
+    in a thread of the default executor of the loop, honouring batch_size
+    and batch_timeout.
+
+    This executor requires python 3.5 or newer.
+    """
+
+    def __init__(self, conf, listener, dispatcher):
+        if asyncio is None:
+            raise RuntimeError("The asyncio executor requires python 3")
+        super(AsyncioExecutor, self).__init__(conf, listener, dispatcher)
+        self._loop = None
+        self._thread = None
+        self._stopping = False
+        self._done = threading.Event()
+        self._poll_future = None
+        self._incomplete = set()
+
+    def start(self):
+        if self._loop is not None:
+            return
+        self._stopping = False
+        self._done.clear()
+        loop = utils.get_running_loop()
+        if loop is None:
+            loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._run_loop,
+                                            args=(loop,))
+            self._thread.daemon = True
+            self._thread.start()
+        self._loop = loop
+        loop.call_soon_threadsafe(self._poll)
+
+    @staticmethod
+    def _run_loop(loop):
+        asyncio.set_event_loop(loop)
+        loop.run_forever()
+
+    def _poll(self):
+        if self._stopping:
+            self._check_done()
+            return
+        if getattr(self.dispatcher, 'batch_size', None) is None:
+            self._poll_future = self.listener.poll_async(self._loop)
+        else:
+            # NOTE: the batches are gathered by a thread of the default
+            # executor of the loop, a message polled from the loop couldn't
+            # be given back when the batch_timeout expires
+            self._poll_future = self._loop.run_in_executor(None,
+                                                           self._poll_batch)
+        self._poll_future.add_done_callback(self._on_incoming)
+
+    def _on_incoming(self, fut):
+        self._poll_future = None
+        try:
+            incoming = fut.result()
+        except Exception:
+            LOG.exception(_LE('Failed to poll for messages'))
+            self._loop.call_later(1, self._poll)
+            return
+        # NOTE: None, or an empty batch, once the listener is stopped or the
+        # batch_timeout expired
+        if incoming:
+            self._dispatch(incoming)
+        self._poll()
+
+    def _dispatch(self, incoming):
+        callback = self.dispatcher(incoming)
+        try:
+            result = callback.run()
+        except RuntimeError:
+            result = None
+        if utils.is_awaitable(result):
+            fut = asyncio.ensure_future(result, loop=self._loop)
+            self._incomplete.add(fut)
+            fut.add_done_callback(functools.partial(self._on_done, callback))
+        else:
+            self._done_callback(callback)
+
+    def _on_done(self, callback, fut):
+        self._incomplete.discard(fut)
+        self._done_callback(callback)
+        self._check_done()
+
+    @staticmethod
+    def _done_callback(callback):
+        try:
+            callback.done()
+        except Exception:
+            LOG.exception(_LE('Failed to complete message processing'))
+
+    def _check_done(self):
+        if (self._stopping and self._poll_future is None and
+                not self._incomplete):
+            self._done.set()
+
+    def stop(self):
+        if self._loop is None:
+            return
+        self._stopping = True
+        self.listener.stop()
+        self._loop.call_soon_threadsafe(self._check_done)
+
+    def wait(self):
+        if self._loop is None:
+            return
+        self._done.wait()
+        if self._thread is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._thread = None
+            self._loop.close()
+        self._loop = None
@@ -14,7 +14,6 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-import collections
 import threading
 
 from futurist import waiters
@@ -28,6 +27,21 @@ _pool_opts = [
                default=64,
                deprecated_name="rpc_thread_pool_size",
                help='Size of executor thread pool.'),
+    cfg.IntOpt('executor_thread_pool_min_size',
+               default=1,
+               help='Minimum number of workers kept by the executor thread '
+                    'pool (threading executor only).'),
+    cfg.IntOpt('executor_thread_pool_queue_size',
+               default=128,
+               help='Maximum number of messages waiting for a worker of the '
+                    'executor thread pool, the polling of new messages is '
+                    'paused when it is reached. 0 means no limit (threading '
+                    'executor only).'),
+    cfg.IntOpt('executor_thread_idle_timeout',
+               default=60,
+               help='Number of seconds after which an idle worker of the '
+                    'executor thread pool is stopped (threading executor '
+                    'only).'),
 ]
 
 
@@ -61,16 +75,15 @@ class PooledExecutor(base.ExecutorBase):
         self._poller = None
         self._executor = None
         self._tombstone = self._event_cls()
-        self._incomplete = collections.deque()
+        # NOTE: a set so that a completed future is forgotten in O(1), the
+        # done callbacks only hold the mutator for that single operation.
+        self._incomplete = set()
         self._mutator = self._lock_cls()
 
     def _do_submit(self, callback):
         def _on_done(fut):
             with self._mutator:
-                try:
-                    self._incomplete.remove(fut)
-                except ValueError:
-                    pass
+                self._incomplete.discard(fut)
             callback.done()
         try:
             fut = self._executor.submit(callback.run)
@@ -84,26 +97,62 @@ class PooledExecutor(base.ExecutorBase):
             return False
         else:
             with self._mutator:
-                self._incomplete.append(fut)
+                self._incomplete.add(fut)
             # Run the other post processing of the callback when done...
             fut.add_done_callback(_on_done)
             return True
 
+    def _poll(self):
+        """Return the next incoming message, or a list of them when the
+        dispatcher handles batches (it has a batch_size attribute).
+        """
+        if getattr(self.dispatcher, 'batch_size', None) is None:
+            return self.listener.poll()
+        return self._poll_batch()
+
     @excutils.forever_retry_uncaught_exceptions
     def _runner(self):
         while not self._tombstone.is_set():
-            incoming = self.listener.poll()
-            if incoming is None:
+            incoming = self._poll()
+            if not incoming:
                 continue
             callback = self.dispatcher(incoming, self._executor_callback)
             was_submitted = self._do_submit(callback)
             if not was_submitted:
                 break
 
+    def _create_executor(self):
+        return self._executor_cls(self.conf.executor_thread_pool_size)
+
+    def get_statistics(self):
+        """Return a dict of the executor pool statistics.
+
+        The keys depend on the async executor in use, the number of messages
+        which are being processed is always reported as 'incomplete'.
+        """
+        executor = self._executor
+        if executor is None:
+            stats = {}
+        elif hasattr(executor, 'get_statistics'):
+            stats = executor.get_statistics()
+        else:
+            futurist_stats = executor.statistics
+            # NOTE: average_runtime raises ZeroDivisionError until a
+            # callback was executed
+            executed = futurist_stats.executed or 1
+            stats = {
+                'executed': futurist_stats.executed,
+                'failures': futurist_stats.failures,
+                'cancelled': futurist_stats.cancelled,
+                'runtime': futurist_stats.runtime / executed,
+            }
+        with self._mutator:
+            stats['incomplete'] = len(self._incomplete)
+        return stats
+
     def start(self):
         if self._executor is None:
-            self._executor = self._executor_cls(
-                self.conf.executor_thread_pool_size)
+            self._executor = self._create_executor()
         self._tombstone.clear()
         if self._poller is None or not self._poller.is_alive():
             self._poller = self._thread_cls(target=self._runner)
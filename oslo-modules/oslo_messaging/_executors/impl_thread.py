@@ -14,10 +14,194 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+import logging
+import sys
+import threading
+
 import futurist
+from oslo_utils import timeutils
 
 from oslo_messaging._executors import impl_pooledexecutor
 
+LOG = logging.getLogger(__name__)
+
+
+class _WorkItem(object):
+    __slots__ = ('future', 'fn', 'args', 'kwargs', 'enqueued_at')
+
+    def __init__(self, future, fn, args, kwargs):
+        self.future = future
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.enqueued_at = timeutils.now()
+
+
+class ElasticThreadPoolExecutor(object):
+    """A thread pool which grows and shrinks with its load.
+
+    A worker is started when a submission finds more queued work than idle
+    workers, up to max_workers. Workers idle for idle_timeout seconds exit,
+    down to min_workers.
+
+    When queue_size is positive, submit() blocks while that many work items
+    are queued: the thread polling the transport then stops fetching
+    messages, leaving them to the broker instead of piling up futures.
+    """
+
+    def __init__(self, max_workers, min_workers=0, queue_size=0,
+                 idle_timeout=60):
+        if max_workers <= 0:
+            raise ValueError("Max workers must be greater than zero")
+        self._max_workers = max_workers
+        self._min_workers = max(0, min(min_workers, max_workers))
+        self._queue_size = max(0, queue_size)
+        self._idle_timeout = idle_timeout
+        self._work = collections.deque()
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._threads = set()
+        self._idle = 0
+        self._active = 0
+        self._shutdown = False
+        self._submitted = 0
+        self._executed = 0
+        self._failures = 0
+        self._rejected = 0
+        self._throttled = 0
+        self._queue_wait = 0.0
+        self._runtime = 0.0
+        with self._lock:
+            for _i in range(self._min_workers):
+                self._spawn_worker()
+
+    def _spawn_worker(self):
+        worker = threading.Thread(target=self._worker)
+        worker.daemon = True
+        self._threads.add(worker)
+        worker.start()
+
+    def submit(self, fn, *args, **kwargs):
+        """Submit a callable to be executed by a worker.
+
+        :raises: RuntimeError if the pool has been shutdown
+        """
+        fut = futurist.Future()
+        item = _WorkItem(fut, fn, args, kwargs)
+        with self._lock:
+            if (self._queue_size and not self._shutdown and
+                    len(self._work) >= self._queue_size):
+                self._throttled += 1
+                while (not self._shutdown and
+                       len(self._work) >= self._queue_size):
+                    self._not_full.wait()
+            if self._shutdown:
+                self._rejected += 1
+                raise RuntimeError("Can not schedule new futures"
+                                   " after being shutdown")
+            self._submitted += 1
+            self._work.append(item)
+            if (len(self._work) > self._idle and
+                    len(self._threads) < self._max_workers):
+                self._spawn_worker()
+            self._not_empty.notify()
+        return fut
+
+    def _get_work(self):
+        with self._lock:
+            self._idle += 1
+            try:
+                deadline = timeutils.now() + self._idle_timeout
+                while not self._work and not self._shutdown:
+                    if len(self._threads) <= self._min_workers:
+                        self._not_empty.wait()
+                        continue
+                    left = deadline - timeutils.now()
+                    if left <= 0:
+                        break
+                    self._not_empty.wait(left)
+            finally:
+                self._idle -= 1
+            if not self._work:
+                self._threads.discard(threading.current_thread())
+                return None
+            item = self._work.popleft()
+            self._active += 1
+            self._not_full.notify()
+            return item
+
+    def _worker(self):
+        while True:
+            item = self._get_work()
+            if item is None:
+                return
+            started_at = timeutils.now()
+            failed = False
+            if item.future.set_running_or_notify_cancel():
+                try:
+                    result = item.fn(*item.args, **item.kwargs)
+                except BaseException:
+                    failed = True
+                    exc_type, exc_value, exc_tb = sys.exc_info()
+                    try:
+                        item.future.set_exception(exc_value)
+                    finally:
+                        del exc_type, exc_value, exc_tb
+                else:
+                    item.future.set_result(result)
+            finished_at = timeutils.now()
+            with self._lock:
+                self._active -= 1
+                self._executed += 1
+                if failed:
+                    self._failures += 1
+                self._queue_wait += started_at - item.enqueued_at
+                self._runtime += finished_at - started_at
+            # NOTE: drop the references to the work item before waiting for
+            # the next one.
+            del item
+
+    @property
+    def alive(self):
+        return not self._shutdown
+
+    def get_statistics(self):
+        """Return a dict of the pool statistics.
+
+        The queue_wait and runtime values are the average number of seconds
+        the executed work items spent queued and running.
+        """
+        with self._lock:
+            executed = self._executed or 1
+            return {
+                'min_workers': self._min_workers,
+                'max_workers': self._max_workers,
+                'workers': len(self._threads),
+                'active': self._active,
+                'queued': len(self._work),
+                'queue_size': self._queue_size,
+                'submitted': self._submitted,
+                'executed': self._executed,
+                'failures': self._failures,
+                'rejected': self._rejected,
+                'throttled': self._throttled,
+                'queue_wait': self._queue_wait / executed,
+                'runtime': self._runtime / executed,
+            }
+
+    def shutdown(self, wait=True):
+        """Shutdown the pool, the queued work items are still executed."""
+        with self._lock:
+            self._shutdown = True
+            threads = list(self._threads)
+            self._not_empty.notify_all()
+            self._not_full.notify_all()
+        if wait:
+            for worker in threads:
+                worker.join()
+
 
 class ThreadExecutor(impl_pooledexecutor.PooledExecutor):
     """A message executor which integrates with threads.
@@ -25,6 +209,16 @@ class ThreadExecutor(impl_pooledexecutor.PooledExecutor):
     A message process that polls for messages from a dispatching thread and
     on reception of an incoming message places the message to be processed in
     a thread pool to be executed at a later time.
+
+    The thread pool grows up to executor_thread_pool_size workers and shrinks
+    back to executor_thread_pool_min_size, see ElasticThreadPoolExecutor.
     """
 
-    _executor_cls = futurist.ThreadPoolExecutor
+    _executor_cls = ElasticThreadPoolExecutor
+
+    def _create_executor(self):
+        return self._executor_cls(
+            self.conf.executor_thread_pool_size,
+            min_workers=self.conf.executor_thread_pool_min_size,
+            queue_size=self.conf.executor_thread_pool_queue_size,
+            idle_timeout=self.conf.executor_thread_idle_timeout)
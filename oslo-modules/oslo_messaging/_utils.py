@@ -13,11 +13,21 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import inspect
 import logging
 import threading
 
+try:
+    import asyncio
+except ImportError:
+    asyncio = None
+
 LOG = logging.getLogger(__name__)
 
+# NOTE: coroutines are only supported on python 3.5 and newer, when an
+# endpoint implements a method as a coroutine function.
+_isawaitable = getattr(inspect, 'isawaitable', lambda obj: False)
+
 
 def version_is_compatible(imp_version, version):
     """Determine whether versions are compatible.
@@ -46,6 +56,79 @@ def version_is_compatible(imp_version, version):
     return True
 
 
+def is_awaitable(obj):
+    """Return True if obj is the coroutine (or future) returned by an
+    asyncio endpoint method.
+    """
+    return _isawaitable(obj)
+
+
+def get_running_loop():
+    """Return the asyncio event loop running in the current thread, or None.
+    """
+    try:
+        return asyncio.get_running_loop()
+    except AttributeError:
+        # NOTE: python < 3.7
+        loop = asyncio.get_event_loop()
+        return loop if loop.is_running() else None
+    except RuntimeError:
+        return None
+
+
+def chain_awaitable(awaitable, callback):
+    """Call callback with the asyncio future of awaitable once it is done.
+
+    Return an asyncio future resolved with the value returned by callback,
+    or with the result of that value if it is awaitable too. The future is
+    failed with the exception raised by callback, if any.
+
+    This lets the dispatchers, which are not coroutines themselves, wait for
+    the coroutines of the endpoints without blocking the event loop.
+
+    :raises: RuntimeError if no event loop is running, i.e. the server does
+             not use the asyncio executor
+    """
+    if get_running_loop() is None:
+        # NOTE: nothing would ever run the coroutine, nor send its reply
+        close = getattr(awaitable, 'close', None)
+        if close is not None:
+            close()
+        raise RuntimeError('Coroutine endpoint methods can only be used '
+                           'with the asyncio executor')
+
+    inner = asyncio.ensure_future(awaitable)
+    # NOTE: Future.get_loop() only exists since python 3.7
+    loop = getattr(inner, 'get_loop', lambda: inner._loop)()
+    outer = loop.create_future()
+
+    def _copy(fut):
+        if outer.cancelled():
+            return
+        if fut.cancelled():
+            outer.cancel()
+        elif fut.exception() is not None:
+            outer.set_exception(fut.exception())
+        else:
+            outer.set_result(fut.result())
+
+    def _on_done(fut):
+        if outer.cancelled():
+            return
+        try:
+            result = callback(fut)
+        except Exception as e:
+            outer.set_exception(e)
+            return
+        if is_awaitable(result):
+            asyncio.ensure_future(result).add_done_callback(_copy)
+        else:
+            outer.set_result(result)
+
+    inner.add_done_callback(_on_done)
+    return outer
+
+
 class DispatcherExecutorContext(object):
     """Dispatcher executor context helper
 
@@ -74,7 +157,8 @@ class DispatcherExecutorContext(object):
         """The incoming message dispath itself
 
         Can be run in an other thread/greenlet/corotine if the executor is
-        able to do it.
+        able to do it. Return the result of the dispatcher, an asyncio future
+        if coroutines of the endpoints are still running.
         """
         try:
             self._result = self._dispatch(self._incoming,
@@ -83,6 +167,7 @@ class DispatcherExecutorContext(object):
             msg = 'The dispatcher method must catches all exceptions'
             LOG.exception(msg)
             raise RuntimeError(msg)
+        return self._result
 
     def done(self):
         """Callback after the incoming message have been dispathed
@@ -94,7 +179,12 @@ class DispatcherExecutorContext(object):
         # ack/requeue message, but what if one day, the driver do something
         # else
         if self._post is not None:
-            self._post(self._incoming, self._result)
+            result = self._result
+            if is_awaitable(result):
+                # NOTE: the dispatch has been done by coroutines, the
+                # executor calls done() once their future is resolved.
+                result = result.result()
+            self._post(self._incoming, result)
 
 
 def fetch_current_thread_functor():
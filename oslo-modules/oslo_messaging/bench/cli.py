@@ -0,0 +1,177 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Messaging benchmark
+
+Run RPC and notification workloads through a transport driver and report
+their throughput and latency as JSON, for example::
+
+    python -m oslo_messaging.bench --workloads call,cast \\
+        --executors blocking,threading --payload-sizes 64,65536
+
+Every combination of the workloads, executors, payload sizes, concurrency
+levels and endpoint counts given is run in turn.  The options of the driver
+are read from the --config-file given, as usual.
+"""
+
+import itertools
+import json
+import logging
+import platform
+import sys
+
+from oslo_config import cfg
+from oslo_config import types
+from oslo_utils import eventletutils
+
+import oslo_messaging
+from oslo_messaging.bench import workloads
+
+LOG = logging.getLogger(__name__)
+
+_bench_opts = [
+    cfg.StrOpt('url',
+               default='fake:///',
+               help='The transport URL of the driver to benchmark.'),
+    cfg.Opt('workloads',
+            type=types.List(item_type=types.String(
+                choices=sorted(workloads.WORKLOADS))),
+            default=sorted(workloads.WORKLOADS),
+            help='The workloads to run.'),
+    cfg.Opt('executors',
+            type=types.List(item_type=types.String(
+                choices=['blocking', 'threading', 'eventlet'])),
+            default=['blocking', 'threading'],
+            help='The executors of the servers. The process is monkey '
+                 'patched when the eventlet executor is used, which also '
+                 'turns the threads of the other executors into green '
+                 'threads: benchmark it on its own.'),
+    cfg.Opt('payload-sizes',
+            type=types.List(item_type=types.Integer(min=0)),
+            default=[1024],
+            help='The sizes of the message payloads, in bytes.'),
+    cfg.Opt('concurrency',
+            type=types.List(item_type=types.Integer(min=1)),
+            default=[1, 8],
+            help='The numbers of client threads sending messages.'),
+    cfg.Opt('endpoints',
+            type=types.List(item_type=types.Integer(min=1)),
+            default=[1],
+            help='The numbers of endpoints of each server, the dispatcher '
+                 'looks past the others to find the method called on the '
+                 'last one.'),
+    cfg.IntOpt('servers',
+               default=2,
+               help='The number of servers of each workload. A fanout '
+                    'message is received by all of them.'),
+    cfg.IntOpt('messages',
+               default=1000,
+               help='The number of messages sent by each run.'),
+    cfg.IntOpt('duration',
+               help='Send messages for this many seconds instead of a '
+                    'number of messages, for soak runs.'),
+    cfg.IntOpt('warmup',
+               default=100,
+               help='The number of messages sent and not accounted before '
+                    'each run.'),
+    cfg.IntOpt('timeout',
+               default=60,
+               help='Seconds to wait for a server to start, for a reply or '
+                    'for the messages sent to be received.'),
+    cfg.FloatOpt('report-interval',
+                 default=10.0,
+                 help='The interval, in seconds, of the throughput timeline '
+                      'reported.'),
+    cfg.StrOpt('output-file',
+               help='Path of the file to write the report to. Defaults to '
+                    'stdout.'),
+]
+
+
+def register_cli_opts(conf):
+    """Register the benchmark's CLI options with a ConfigOpts instance.
+
+    :param conf: a ConfigOpts instance
+    :raises: DuplicateOptError, ArgsAlreadyParsedError
+    """
+    conf.register_cli_opts(_bench_opts)
+
+
+def run(conf):
+    """Run the benchmarks configured and return their report."""
+    url = oslo_messaging.TransportURL.parse(conf, conf.url)
+    transport = oslo_messaging.get_transport(conf, url)
+    results = []
+    try:
+        matrix = itertools.product(conf.workloads, conf.executors,
+                                   conf.payload_sizes, conf.concurrency,
+                                   conf.endpoints)
+        for name, executor, payload_size, concurrency, endpoints in matrix:
+            LOG.info('Running %(workload)s with the %(executor)s executor, '
+                     '%(size)d bytes payloads, %(concurrency)d clients and '
+                     '%(endpoints)d endpoints',
+                     {'workload': name, 'executor': executor,
+                      'size': payload_size, 'concurrency': concurrency,
+                      'endpoints': endpoints})
+            workload = workloads.WORKLOADS[name](
+                transport, executor=executor, servers=conf.servers,
+                endpoints=endpoints, timeout=conf.timeout,
+                interval=conf.report_interval)
+            try:
+                result = workload.run(payload_size=payload_size,
+                                      messages=conf.messages,
+                                      concurrency=concurrency,
+                                      duration=conf.duration,
+                                      warmup=conf.warmup)
+            except workloads.BenchmarkError as exc:
+                LOG.error('%s run failed: %s', name, exc)
+                result = {'workload': name, 'executor': executor,
+                          'payload_size': payload_size,
+                          'concurrency': concurrency,
+                          'servers': conf.servers, 'endpoints': endpoints,
+                          'error': str(exc)}
+            results.append(result)
+        transport_statistics = transport.get_statistics()
+    finally:
+        transport.cleanup()
+    return {
+        'driver': url.transport,
+        'python': platform.python_version(),
+        'results': results,
+        'transport_statistics': transport_statistics,
+    }
+
+
+def main(args=None):
+    """The main function of the messaging benchmark."""
+    logging.basicConfig(level=logging.WARN)
+    conf = cfg.ConfigOpts()
+    register_cli_opts(conf)
+    conf(args)
+
+    if 'eventlet' in conf.executors:
+        if not eventletutils.EVENTLET_AVAILABLE:
+            sys.exit('The eventlet executor requires eventlet')
+        import eventlet
+        eventlet.monkey_patch()
+
+    report = run(conf)
+    output = json.dumps(report, indent=2, sort_keys=True)
+    if conf.output_file:
+        with open(conf.output_file, 'w') as output_file:
+            output_file.write(output + '\n')
+    else:
+        sys.stdout.write(output + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,160 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import collections
+import math
+import threading
+
+from oslo_utils import timeutils
+
+PERCENTILES = (('p50', 0.5), ('p99', 0.99), ('p999', 0.999))
+
+
+class Histogram(object):
+    """A latency histogram with logarithmic buckets.
+
+    The memory used doesn't depend on the number of values added, which
+    matters for long soak runs, and the percentiles are reported with a
+    relative error of at most PRECISION.
+    """
+
+    PRECISION = 0.01
+    MINIMUM = 1e-6
+
+    _LOG_BASE = math.log(1 + PRECISION)
+
+    def __init__(self):
+        self._buckets = collections.defaultdict(int)
+        self.count = 0
+        self.total = 0.0
+        self.minimum = None
+        self.maximum = 0.0
+
+    def add(self, value):
+        if value > self.MINIMUM:
+            index = int(math.log(value / self.MINIMUM) / self._LOG_BASE)
+        else:
+            index = 0
+        self._buckets[index] += 1
+        self.count += 1
+        self.total += value
+        if self.minimum is None or value < self.minimum:
+            self.minimum = value
+        if value > self.maximum:
+            self.maximum = value
+
+    def percentile(self, fraction):
+        """Return the value below which fraction of the values fall."""
+        if not self.count:
+            return None
+        rank = max(int(math.ceil(fraction * self.count)), 1)
+        seen = 0
+        for index in sorted(self._buckets):
+            seen += self._buckets[index]
+            if seen >= rank:
+                break
+        # the middle of the bucket, clamped to the values actually seen
+        value = self.MINIMUM * (1 + self.PRECISION) ** (index + 0.5)
+        return min(max(value, self.minimum), self.maximum)
+
+    def summary(self):
+        summary = {
+            'min': self.minimum,
+            'max': self.maximum if self.count else None,
+            'mean': self.total / self.count if self.count else None,
+        }
+        for name, fraction in PERCENTILES:
+            summary[name] = self.percentile(fraction)
+        return summary
+
+
+class Recorder(object):
+    """Record the messages processed during a benchmark run.
+
+    The latency of a message is measured from the sent_at timestamp (taken
+    from timeutils.now()) the client stored in it, so the clients and the
+    servers of a run must live in the same process.  The throughput is also
+    accounted per interval seconds, to spot a degradation over a soak run.
+    """
+
+    def __init__(self, interval=10.0):
+        self.interval = interval
+        self.latency = Histogram()
+        self.errors = 0
+        self._timeline = collections.defaultdict(int)
+        self._cond = threading.Condition()
+        self._started = None
+        self._finished = None
+
+    def start(self):
+        with self._cond:
+            self._started = timeutils.now()
+
+    def record(self, sent_at):
+        now = timeutils.now()
+        with self._cond:
+            self.latency.add(now - sent_at)
+            if self._started is not None:
+                slot = int((now - self._started) // self.interval)
+                self._timeline[slot] += 1
+            self._finished = now
+            self._cond.notify_all()
+
+    def error(self):
+        with self._cond:
+            self.errors += 1
+            self._cond.notify_all()
+
+    @property
+    def completed(self):
+        return self.latency.count + self.errors
+
+    def wait(self, count, timeout=None):
+        """Wait until count messages are recorded, or timeout seconds.
+
+        Returns True if the messages were all recorded.
+        """
+        watch = timeutils.StopWatch(duration=timeout)
+        watch.start()
+        with self._cond:
+            while self.completed < count:
+                if watch.expired():
+                    return False
+                self._cond.wait(watch.leftover(return_none=True))
+            return True
+
+    def report(self):
+        with self._cond:
+            elapsed = None
+            throughput = None
+            if self._started is not None and self._finished is not None:
+                elapsed = self._finished - self._started
+                if elapsed > 0:
+                    throughput = self.latency.count / elapsed
+            timeline = []
+            if self._timeline:
+                last = max(self._timeline)
+                for index in range(last + 1):
+                    width = self.interval
+                    if index == last:
+                        # the last interval is only partly elapsed
+                        width = min(elapsed - last * self.interval, width)
+                    timeline.append(self._timeline.get(index, 0) /
+                                    max(width, 1e-9))
+            return {
+                'messages': self.latency.count,
+                'errors': self.errors,
+                'elapsed': elapsed,
+                'msgs_per_sec': throughput,
+                'latency': self.latency.summary(),
+                'msgs_per_sec_timeline': timeline,
+            }
@@ -0,0 +1,352 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import abc
+import logging
+import threading
+import time
+import uuid
+
+from oslo_utils import timeutils
+import six
+
+import oslo_messaging
+from oslo_messaging.bench import stats
+
+LOG = logging.getLogger(__name__)
+
+STOP_EVENT_TYPE = 'bench.stop'
+
+
+class BenchmarkError(Exception):
+    """Raised when a benchmark run can't be completed."""
+
+
+class PaddingEndpoint(object):
+    """An endpoint without any of the benchmarked methods, the dispatcher
+    looks past it to find the method called.
+    """
+
+
+class RPCEndpoint(object):
+
+    def __init__(self, workload):
+        self.workload = workload
+        self.server = None
+
+    def echo(self, ctxt, payload, sent_at):
+        return payload
+
+    def record(self, ctxt, payload, sent_at):
+        self.workload.recorder.record(sent_at)
+
+    def bench_stop(self, ctxt):
+        # NOTE: the blocking executor only stops from a dispatched method,
+        # so that stop() runs in the thread which started the server
+        self.server.stop()
+
+
+class NotificationEndpoint(object):
+
+    def __init__(self, workload):
+        self.workload = workload
+        self.server = None
+
+    def info(self, ctxt, publisher_id, event_type, payload, metadata):
+        if event_type == STOP_EVENT_TYPE:
+            self.server.stop()
+        else:
+            self.workload.recorder.record(payload['sent_at'])
+
+
+class _Server(object):
+    """Run a server with the given executor.
+
+    The blocking executor processes the messages in the thread calling
+    start(), the server is given its own thread in that case and is stopped
+    with a message sent by the workload.
+    """
+
+    def __init__(self, server, executor):
+        self.server = server
+        self.executor = executor
+        self._thread = None
+
+    def start(self, timeout):
+        if self.executor != 'blocking':
+            self.server.start()
+            return
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+        # NOTE: the server only reports statistics once its listener is
+        # created, the messages sent before that would be lost with fanout
+        watch = timeutils.StopWatch(duration=timeout)
+        watch.start()
+        while not self.server.get_executor_statistics():
+            if watch.expired():
+                raise BenchmarkError('Server did not start in %s seconds' %
+                                     timeout)
+            time.sleep(0.01)
+
+    def _run(self):
+        self.server.start()
+        self.server.wait()
+
+    def stop(self, timeout):
+        if self._thread is None:
+            self.server.stop()
+            self.server.wait()
+            return
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            LOG.warning('Server did not stop in %s seconds', timeout)
+
+
+@six.add_metaclass(abc.ABCMeta)
+class Workload(object):
+    """A messaging pattern to benchmark.
+
+    The workload starts servers servers, each of them with endpoints
+    endpoints, on a topic of its own.  Unless the clients record the
+    messages themselves (client_side), the servers do and the run lasts
+    until they received all the messages sent.
+    """
+
+    name = None
+    client_side = False
+
+    def __init__(self, transport, executor='blocking', servers=1,
+                 endpoints=1, timeout=60, interval=10.0):
+        self.transport = transport
+        self.executor = executor
+        self.servers = servers
+        self.endpoints = endpoints
+        self.timeout = timeout
+        self.interval = interval
+        self.topic = 'bench-%s' % uuid.uuid4().hex
+        self.recorder = stats.Recorder(interval)
+        self._servers = []
+
+    @abc.abstractmethod
+    def _endpoint(self):
+        """Return the endpoint the servers dispatch the messages to."""
+
+    @abc.abstractmethod
+    def _get_server(self, index, endpoints):
+        """Return the server index, dispatching to endpoints."""
+
+    @abc.abstractmethod
+    def _get_client(self):
+        """Return the client sending the messages."""
+
+    @abc.abstractmethod
+    def _send_stop(self, index):
+        """Send the message stopping the blocking server index."""
+
+    @abc.abstractmethod
+    def send(self, payload):
+        """Send a message with the given payload."""
+
+    def expected(self, sent):
+        """The number of messages the servers receive for sent messages."""
+        return sent
+
+    def setup(self):
+        self._client = self._get_client()
+        for index in range(self.servers):
+            endpoint = self._endpoint()
+            endpoints = [PaddingEndpoint()
+                         for _i in range(self.endpoints - 1)]
+            endpoints.append(endpoint)
+            endpoint.server = self._get_server(index, endpoints)
+            server = _Server(endpoint.server, self.executor)
+            server.start(self.timeout)
+            self._servers.append(server)
+
+    def teardown(self):
+        if self.executor == 'blocking':
+            for index in range(len(self._servers)):
+                self._send_stop(index)
+        for server in self._servers:
+            server.stop(self.timeout)
+        self._servers = []
+
+    def _send_all(self, payload, count, watch, sent):
+        while count is None or sent[0] < count:
+            if watch.expired():
+                break
+            try:
+                self.send(payload)
+            except Exception:
+                LOG.debug('Failed to send a %s message', self.name,
+                          exc_info=True)
+                self.recorder.error()
+            sent[0] += 1
+
+    def _run(self, payload, messages, concurrency, duration):
+        watch = timeutils.StopWatch(duration=duration)
+        counts = [None] * concurrency
+        if duration is None:
+            counts = [messages // concurrency +
+                      (1 if index < messages % concurrency else 0)
+                      for index in range(concurrency)]
+        sent = [[0] for _i in range(concurrency)]
+        threads = [threading.Thread(target=self._send_all,
+                                    args=(payload, count, watch, thread_sent))
+                   for count, thread_sent in zip(counts, sent)]
+        self.recorder.start()
+        watch.start()
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        for thread in threads:
+            thread.join()
+        sent = sum(thread_sent[0] for thread_sent in sent)
+        if not self.client_side:
+            # the messages which failed to be sent are accounted as errors
+            errors = self.recorder.errors
+            expected = self.expected(sent - errors) + errors
+            if not self.recorder.wait(expected, self.timeout):
+                raise BenchmarkError('%d of the %d %s messages expected were '
+                                     'not received in %s seconds' %
+                                     (expected - self.recorder.completed,
+                                      expected, self.name, self.timeout))
+        return sent
+
+    def run(self, payload_size=1024, messages=1000, concurrency=1,
+            duration=None, warmup=0):
+        """Run the workload and return a report of the run.
+
+        The clients send messages messages of payload_size bytes, or send
+        messages for duration seconds when given, from concurrency threads.
+        The warmup messages are sent and received first, and are not
+        accounted.
+        """
+        payload = 'x' * payload_size
+        self.setup()
+        try:
+            if warmup:
+                self._run(payload, warmup, 1, None)
+                self.recorder = stats.Recorder(self.interval)
+            sent = self._run(payload, messages, concurrency, duration)
+            executor_statistics = [server.server.get_executor_statistics()
+                                   for server in self._servers]
+        finally:
+            self.teardown()
+        report = {
+            'workload': self.name,
+            'executor': self.executor,
+            'payload_size': payload_size,
+            'concurrency': concurrency,
+            'servers': self.servers,
+            'endpoints': self.endpoints,
+            'sent': sent,
+            'executor_statistics': executor_statistics,
+        }
+        report.update(self.recorder.report())
+        return report
+
+
+class _RPCWorkload(Workload):
+
+    def _endpoint(self):
+        return RPCEndpoint(self)
+
+    def _get_server(self, index, endpoints):
+        target = oslo_messaging.Target(topic=self.topic,
+                                       server='server-%d' % index)
+        return oslo_messaging.get_rpc_server(self.transport, target,
+                                             endpoints,
+                                             executor=self.executor)
+
+    def _get_client(self):
+        target = oslo_messaging.Target(topic=self.topic)
+        return oslo_messaging.RPCClient(self.transport, target,
+                                        timeout=self.timeout)
+
+    def _send_stop(self, index):
+        client = self._client.prepare(server='server-%d' % index)
+        client.cast({}, 'bench_stop')
+
+
+class CallWorkload(_RPCWorkload):
+    """RPC calls, each of them waiting for the reply of a server."""
+
+    name = 'call'
+    client_side = True
+
+    def send(self, payload):
+        sent_at = timeutils.now()
+        self._client.call({}, 'echo', payload=payload, sent_at=sent_at)
+        self.recorder.record(sent_at)
+
+
+class CastWorkload(_RPCWorkload):
+    """RPC casts, each of them processed by one of the servers."""
+
+    name = 'cast'
+
+    def send(self, payload):
+        self._client.cast({}, 'record', payload=payload,
+                          sent_at=timeutils.now())
+
+
+class FanoutWorkload(_RPCWorkload):
+    """RPC fanout casts, each of them processed by all the servers."""
+
+    name = 'fanout'
+
+    def _get_client(self):
+        client = super(FanoutWorkload, self)._get_client()
+        self._fanout = client.prepare(fanout=True)
+        return client
+
+    def expected(self, sent):
+        return sent * self.servers
+
+    def send(self, payload):
+        self._fanout.cast({}, 'record', payload=payload,
+                          sent_at=timeutils.now())
+
+
+class NotifyWorkload(Workload):
+    """Notifications, each of them processed by one of the listeners."""
+
+    name = 'notify'
+
+    def _endpoint(self):
+        return NotificationEndpoint(self)
+
+    def _get_server(self, index, endpoints):
+        targets = [oslo_messaging.Target(topic=self.topic)]
+        return oslo_messaging.get_notification_listener(
+            self.transport, targets, endpoints, executor=self.executor)
+
+    def _get_client(self):
+        return oslo_messaging.Notifier(self.transport, publisher_id='bench',
+                                       driver='messagingv2',
+                                       topic=self.topic)
+
+    def _send_stop(self, index):
+        # NOTE: the listeners compete for the messages of the topic, but a
+        # stopped one doesn't take any more message
+        self._client.info({}, STOP_EVENT_TYPE, {})
+
+    def send(self, payload):
+        self._client.info({}, 'bench.event',
+                          {'payload': payload, 'sent_at': timeutils.now()})
+
+
+WORKLOADS = dict((workload.name, workload)
+                 for workload in (CallWorkload, CastWorkload, FanoutWorkload,
+                                  NotifyWorkload))
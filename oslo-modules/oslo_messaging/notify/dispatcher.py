@@ -20,6 +20,7 @@ import sys
 
 from oslo_messaging import _utils as utils
 from oslo_messaging import localcontext
+from oslo_messaging.notify import filter as notify_filter
 from oslo_messaging import serializer as msg_serializer
 
 
@@ -42,6 +43,10 @@ class NotificationDispatcher(object):
 
     NotifcationDispatcher is one such dispatcher which pass a raw notification
     message to the endpoints
+
+    With the asyncio executor, endpoint methods may be coroutine functions:
+    the event loop runs them in turn and the notification is acknowledged or
+    requeued once they are done.
     """
 
     def __init__(self, targets, endpoints, serializer, allow_requeue,
@@ -60,6 +65,11 @@ class NotificationDispatcher(object):
                 self._callbacks_by_priority.setdefault(prio, []).append(
                     (screen, method))
 
+        self._filters_by_priority = dict(
+            (prio, notify_filter.NotificationFilterSet(
+                [screen for screen, method in callbacks]))
+            for prio, callbacks in self._callbacks_by_priority.items())
+
         priorities = self._callbacks_by_priority.keys()
         self._targets_priorities = set(itertools.product(self.targets,
                                                          priorities))
@@ -88,14 +98,98 @@ class NotificationDispatcher(object):
         :type ctxt: IncomingMessage
         """
         try:
-            return self._dispatch(incoming.ctxt, incoming.message,
-                                  executor_callback)
+            result = self._dispatch(incoming.ctxt, incoming.message,
+                                    executor_callback)
         except Exception:
             # sys.exc_info() is deleted by LOG.exception().
             exc_info = sys.exc_info()
             LOG.error('Exception during message handling',
                       exc_info=exc_info)
             return NotificationResult.HANDLED
+        if utils.is_awaitable(result):
+            return utils.chain_awaitable(result, self._handle_future_error)
+        return result
+
+    @staticmethod
+    def _handle_future_error(fut):
+        e = fut.exception()
+        if e is None:
+            return fut.result()
+        LOG.error('Exception during message handling',
+                  exc_info=(type(e), e, e.__traceback__))
+        return NotificationResult.HANDLED
+
+    def _call_endpoints(self, calls, executor_callback, ctxt=None):
+        """Call the endpoint methods in turn until one of them requeues the
+        notifications.
+
+        :param calls: the endpoint methods with their arguments
+        :type calls: list of (callable, tuple)
+        :param ctxt: the request context set as local context of the calls
+        :type ctxt: dict
+        """
+        for index, (callback, args) in enumerate(calls):
+            if ctxt is not None:
+                localcontext._set_local_context(ctxt)
+            try:
+                if executor_callback:
+                    ret = executor_callback(callback, *args)
+                else:
+                    ret = callback(*args)
+            finally:
+                if ctxt is not None:
+                    localcontext._clear_local_context()
+            if utils.is_awaitable(ret):
+                # NOTE: the endpoint method is a coroutine, the next ones are
+                # called once the event loop has run it.
+                remaining = calls[index + 1:]
+                return utils.chain_awaitable(
+                    ret, lambda fut: self._continue_calls(
+                        fut.result(), remaining, executor_callback, ctxt))
+            if self._is_requeued(ret):
+                return ret
+        return NotificationResult.HANDLED
+
+    def _continue_calls(self, ret, calls, executor_callback, ctxt):
+        if self._is_requeued(ret):
+            return ret
+        return self._call_endpoints(calls, executor_callback, ctxt)
+
+    def _is_requeued(self, ret):
+        return self.allow_requeue and ret == NotificationResult.REQUEUE
+
+    def _extract_user_message(self, ctxt, message):
+        """Return the priority of a notification and the deserialized
+        arguments of the endpoint methods, or (None, None) if the priority
+        is unknown.
+        """
+        priority = message.get('priority', '').lower()
+        if priority not in PRIORITIES:
+            LOG.warning('Unknown priority "%s"', priority)
+            return None, None
+
+        ctxt = self.serializer.deserialize_context(ctxt)
+        user_message = {
+            'ctxt': ctxt,
+            'publisher_id': message.get('publisher_id'),
+            'event_type': message.get('event_type'),
+            'metadata': {
+                'message_id': message.get('message_id'),
+                'timestamp': message.get('timestamp')
+            },
+            'payload': self.serializer.deserialize_entity(
+                ctxt, message.get('payload')),
+        }
+        return priority, user_message
+
+    def _match(self, priority, user_message):
+        """Return the bitmask of the endpoints of priority matching the
+        notification.
+        """
+        return self._filters_by_priority[priority].match(
+            user_message['ctxt'], user_message['publisher_id'],
+            user_message['event_type'], user_message['metadata'],
+            user_message['payload'])
 
     def _dispatch(self, ctxt, message, executor_callback=None):
         """Dispatch an RPC message to the appropriate endpoint method.
@@ -105,37 +199,87 @@ class NotificationDispatcher(object):
         :param message: the message payload
         :type message: dict
         """
-        ctxt = self.serializer.deserialize_context(ctxt)
-
-        publisher_id = message.get('publisher_id')
-        event_type = message.get('event_type')
-        metadata = {
-            'message_id': message.get('message_id'),
-            'timestamp': message.get('timestamp')
-        }
-        priority = message.get('priority', '').lower()
-        if priority not in PRIORITIES:
-            LOG.warning('Unknown priority "%s"', priority)
+        priority, user_message = self._extract_user_message(ctxt, message)
+        if priority is None:
             return
 
-        payload = self.serializer.deserialize_entity(ctxt,
-                                                     message.get('payload'))
+        ctxt = user_message['ctxt']
+        args = (ctxt, user_message['publisher_id'], user_message['event_type'],
+                user_message['payload'], user_message['metadata'])
 
-        for screen, callback in self._callbacks_by_priority.get(priority, []):
-            if screen and not screen.match(ctxt, publisher_id, event_type,
-                                           metadata, payload):
-                continue
-            localcontext._set_local_context(ctxt)
-            try:
-                if executor_callback:
-                    ret = executor_callback(callback, ctxt, publisher_id,
-                                            event_type, payload, metadata)
-                else:
-                    ret = callback(ctxt, publisher_id, event_type, payload,
-                                   metadata)
-                ret = NotificationResult.HANDLED if ret is None else ret
-                if self.allow_requeue and ret == NotificationResult.REQUEUE:
-                    return ret
-            finally:
-                localcontext._clear_local_context()
-        return NotificationResult.HANDLED
+        callbacks = self._callbacks_by_priority.get(priority)
+        if not callbacks:
+            return NotificationResult.HANDLED
+
+        matched = self._match(priority, user_message)
+        calls = [(callback, args)
+                 for index, (screen, callback) in enumerate(callbacks)
+                 if matched & (1 << index)]
+        return self._call_endpoints(calls, executor_callback, ctxt)
+
+
+class BatchNotificationDispatcher(NotificationDispatcher):
+    """A message dispatcher which understands Notification messages and
+    delivers them to the endpoints by batch.
+
+    The executor polls up to batch_size messages or waits at most
+    batch_timeout seconds, then each endpoint method is called once per
+    priority with the list of the notifications of that priority matching
+    its filter_rule. Each notification of the list is a dict with the
+    ctxt, publisher_id, event_type, payload and metadata keys.
+
+    The whole batch is requeued if an endpoint returns
+    NotificationResult.REQUEUE (and requeue is allowed), otherwise it is
+    acknowledged.
+    """
+
+    def __init__(self, targets, endpoints, serializer, allow_requeue,
+                 pool=None, batch_size=None, batch_timeout=None):
+        super(BatchNotificationDispatcher, self).__init__(
+            targets, endpoints, serializer, allow_requeue, pool)
+        self.batch_size = batch_size or 1
+        self.batch_timeout = batch_timeout
+
+    @staticmethod
+    def _post_dispatch(incoming, result):
+        for message in incoming:
+            NotificationDispatcher._post_dispatch(message, result)
+
+    def _dispatch_and_handle_error(self, incoming, executor_callback):
+        """Dispatch a batch of notification messages to the appropriate
+        endpoint methods.
+
+        :param incoming: the incoming notification messages
+        :type incoming: list of IncomingMessage
+        """
+        try:
+            result = self._dispatch_batch(incoming, executor_callback)
+        except Exception:
+            # sys.exc_info() is deleted by LOG.exception().
+            exc_info = sys.exc_info()
+            LOG.error('Exception during message handling',
+                      exc_info=exc_info)
+            return NotificationResult.HANDLED
+        if utils.is_awaitable(result):
+            return utils.chain_awaitable(result, self._handle_future_error)
+        return result
+
+    def _dispatch_batch(self, incoming, executor_callback=None):
+        by_priority = {}
+        for message in incoming:
+            priority, user_message = self._extract_user_message(
+                message.ctxt, message.message)
+            if priority in self._callbacks_by_priority:
+                by_priority.setdefault(priority, []).append(
+                    (self._match(priority, user_message), user_message))
+
+        calls = []
+        for priority, messages in by_priority.items():
+            for index, (screen, callback) in enumerate(
+                    self._callbacks_by_priority[priority]):
+                bit = 1 << index
+                batch = [user_message for matched, user_message in messages
+                         if matched & bit]
+                if batch:
+                    calls.append((callback, (batch,)))
+        return self._call_endpoints(calls, executor_callback)
@@ -75,3 +75,81 @@ class NotificationFilter(object):
                 self._check_for_mismatch(payload, self._regexs_payload)):
             return False
         return True
+
+
+class NotificationFilterSet(object):
+
+    """Match a notification against a list of NotificationFilter at once
+
+    The filters are compiled into a flat list of (field, key, regex)
+    constraints, each associated to a bitmask of the filters it belongs to.
+    Identical constraints shared by several filters are evaluated only once
+    per notification, and constraints of filters already known to mismatch
+    are skipped.
+
+    match() returns a bitmask where the bit i is set if the i-th filter of
+    the list matches. A None filter matches every notification. Filters
+    which are not plain NotificationFilter instances (e.g. subclasses
+    overriding match()) are not compiled, their own match() is called.
+    """
+
+    # NOTE: same order as NotificationFilter.match() checks the fields
+    _FIELDS = (('_regex_publisher_id', False),
+               ('_regex_event_type', False),
+               ('_regexs_context', True),
+               ('_regexs_metadata', True),
+               ('_regexs_payload', True))
+
+    def __init__(self, filters):
+        self._all = (1 << len(filters)) - 1
+
+        self._others = []
+        compiled = []
+        for index, filter_rule in enumerate(filters):
+            if filter_rule is None:
+                continue
+            if type(filter_rule) is NotificationFilter:
+                compiled.append((index, filter_rule))
+            else:
+                self._others.append((1 << index, filter_rule))
+
+        constraints = {}
+        for field, (attr, is_dict) in enumerate(self._FIELDS):
+            for index, filter_rule in compiled:
+                regex = getattr(filter_rule, attr)
+                if is_dict:
+                    items = sorted(regex.items())
+                elif regex is not None:
+                    items = [(None, regex)]
+                else:
+                    items = []
+                for key, regex in items:
+                    ident = (field, key, regex.pattern, regex.flags)
+                    if ident not in constraints:
+                        constraints[ident] = [field, key, regex, 0]
+                    constraints[ident][3] |= 1 << index
+        self._constraints = sorted(
+            (tuple(c) for c in constraints.values()),
+            key=lambda c: c[0])
+
+    def match(self, context, publisher_id, event_type, metadata, payload):
+        values = (publisher_id, event_type, context, metadata, payload)
+        matched = self._all
+        for field, key, regex, mask in self._constraints:
+            if not matched & mask:
+                continue
+            data = values[field]
+            if key is None:
+                mismatch = not regex.match(data)
+            else:
+                mismatch = key not in data or not regex.match(data[key])
+            if mismatch:
+                matched &= ~mask
+                if not matched:
+                    return matched
+        for mask, filter_rule in self._others:
+            if (matched & mask and
+                    not filter_rule.match(context, publisher_id, event_type,
+                                          metadata, payload)):
+                matched &= ~mask
+        return matched
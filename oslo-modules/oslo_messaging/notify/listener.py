@@ -96,6 +96,20 @@ oslo_messaging.NotificationResult.REQUEUE to requeue the message.
 The message is acknowledged only if all endpoints either return
 oslo_messaging.NotificationResult.HANDLED or None.
 
+Notifications can also be delivered by batch, see
+get_batch_notification_listener(). The endpoint methods of a batch listener
+receive a single argument, the list of notifications of their priority, each
+one being a dict with the ctxt, publisher_id, event_type, payload and metadata
+keys::
+
+    class MeteringEndpoint(object):
+        def sample(self, messages):
+            storage.record_samples([m['payload'] for m in messages])
+
+    server = oslo_messaging.get_batch_notification_listener(
+        transport, targets, [MeteringEndpoint()], batch_size=100,
+        batch_timeout=5)
+
 Note that not all transport drivers implement support for requeueing. In order
 to use this feature, applications should assert that the feature is available
 by passing allow_requeue=True to get_notification_listener(). If the driver
@@ -141,3 +155,46 @@ def get_notification_listener(transport, targets, endpoints,
                                                           serializer,
                                                           allow_requeue, pool)
     return msg_server.MessageHandlingServer(transport, dispatcher, executor)
+
+
+def get_batch_notification_listener(transport, targets, endpoints,
+                                    executor='blocking', serializer=None,
+                                    allow_requeue=False, pool=None,
+                                    batch_size=None, batch_timeout=None):
+    """Construct a batch notification listener
+
+    The executor parameter controls how incoming messages will be received and
+    dispatched. By default, the most simple executor is used - the blocking
+    executor.
+
+    If the eventlet executor is used, the threading and time library need to be
+    monkeypatched.
+
+    :param transport: the messaging transport
+    :type transport: Transport
+    :param targets: the exchanges and topics to listen on
+    :type targets: list of Target
+    :param endpoints: a list of endpoint objects
+    :type endpoints: list
+    :param executor: name of a message executor - for example
+                     'eventlet', 'blocking'
+    :type executor: str
+    :param serializer: an optional entity serializer
+    :type serializer: Serializer
+    :param allow_requeue: whether NotificationResult.REQUEUE support is needed
+    :type allow_requeue: bool
+    :param pool: the pool name
+    :type pool: str
+    :param batch_size: number of messages to wait before calling
+                       endpoints callbacks
+    :type batch_size: int
+    :param batch_timeout: number of seconds to wait before calling
+                       endpoints callbacks
+    :type batch_timeout: int
+    :raises: NotImplementedError
+    """
+    transport._require_driver_features(requeue=allow_requeue)
+    dispatcher = notify_dispatcher.BatchNotificationDispatcher(
+        targets, endpoints, serializer, allow_requeue, pool,
+        batch_size, batch_timeout)
+    return msg_server.MessageHandlingServer(transport, dispatcher, executor)
@@ -23,6 +23,8 @@ __all__ = [
     'RemoteError',
 ]
 
+import futurist
+from futurist import waiters
 from oslo_config import cfg
 import six
 
@@ -136,30 +138,115 @@ class _CallContext(object):
         except driver_base.TransportDriverError as ex:
             raise ClientSendError(self.target, ex)
 
-    def call(self, ctxt, method, **kwargs):
-        """Invoke a method and wait for a reply. See RPCClient.call()."""
+    def cast_many(self, ctxt, method, args_list):
+        """Invoke a method once for each dict of arguments and return
+        immediately. See RPCClient.cast_many().
+        """
+        msgs = [self._make_message(ctxt, method, args) for args in args_list]
+        ctxt = self.serializer.serialize_context(ctxt)
+
+        if self.version_cap:
+            self._check_version_cap(self.target.version)
+        try:
+            self.transport._send_many(self.target, ctxt, msgs,
+                                      retry=self.retry)
+        except driver_base.TransportDriverError as ex:
+            raise ClientSendError(self.target, ex)
+
+    def _get_call_timeout(self):
+        if self.timeout is None:
+            return self.conf.rpc_response_timeout
+        return self.timeout
+
+    def _make_call_message(self, ctxt, method, args):
         if self.target.fanout:
             raise exceptions.InvalidTarget('A call cannot be used with fanout',
                                            self.target)
 
-        msg = self._make_message(ctxt, method, kwargs)
+        msg = self._make_message(ctxt, method, args)
         msg_ctxt = self.serializer.serialize_context(ctxt)
 
-        timeout = self.timeout
-        if self.timeout is None:
-            timeout = self.conf.rpc_response_timeout
-
         if self.version_cap:
             self._check_version_cap(msg.get('version'))
+        return msg, msg_ctxt
 
+    def call(self, ctxt, method, **kwargs):
+        """Invoke a method and wait for a reply. See RPCClient.call()."""
+        msg, msg_ctxt = self._make_call_message(ctxt, method, kwargs)
         try:
             result = self.transport._send(self.target, msg_ctxt, msg,
-                                          wait_for_reply=True, timeout=timeout,
+                                          wait_for_reply=True,
+                                          timeout=self._get_call_timeout(),
                                           retry=self.retry)
         except driver_base.TransportDriverError as ex:
             raise ClientSendError(self.target, ex)
         return self.serializer.deserialize_entity(ctxt, result)
 
+    def call_async(self, ctxt, method, **kwargs):
+        """Invoke a method and return a future of the reply. See
+        RPCClient.call_async().
+        """
+        msg, msg_ctxt = self._make_call_message(ctxt, method, kwargs)
+        try:
+            reply = self.transport._send_async(
+                self.target, msg_ctxt, msg,
+                timeout=self._get_call_timeout(), retry=self.retry)
+        except driver_base.TransportDriverError as ex:
+            raise ClientSendError(self.target, ex)
+
+        result = futurist.Future()
+
+        def _on_reply(reply):
+            if not result.set_running_or_notify_cancel():
+                return
+            try:
+                result.set_result(self.serializer.deserialize_entity(
+                    ctxt, reply.result()))
+            except driver_base.TransportDriverError as ex:
+                result.set_exception(ClientSendError(self.target, ex))
+            except Exception as ex:
+                result.set_exception(ex)
+
+        reply.add_done_callback(_on_reply)
+        return result
+
+    def call_many(self, ctxt, targets, method, **kwargs):
+        """Invoke a method on several targets and wait for all the replies.
+        See RPCClient.call_many().
+        """
+        timeout = self._get_call_timeout()
+        futures = []
+        for target in targets:
+            overrides = dict((attr, getattr(target, attr))
+                             for attr in ('exchange', 'topic', 'namespace',
+                                          'version', 'server')
+                             if getattr(target, attr) is not None)
+            cctxt = _CallContext(self.transport, self.target(**overrides),
+                                 self.serializer, timeout, self.version_cap,
+                                 self.retry)
+            try:
+                future = cctxt.call_async(ctxt, method, **kwargs)
+            except Exception as ex:
+                # NOTE: a target which cannot be sent to (version cap,
+                # driver error, ...) must not abort the calls to the others
+                future = futurist.Future()
+                future.set_exception(ex)
+            futures.append(future)
+
+        waiters.wait_for_all(futures, timeout)
+
+        results = []
+        for target, future in zip(targets, futures):
+            if not future.done():
+                future.cancel()
+                results.append(exceptions.MessagingTimeout(
+                    'Timed out waiting for a reply from %s' % target))
+            elif future.exception() is not None:
+                results.append(future.exception())
+            else:
+                results.append(future.result())
+        return results
+
     @classmethod
     def _prepare(cls, base,
                  exchange=_marker, topic=_marker, namespace=_marker,
@@ -366,6 +453,25 @@ class RPCClient(object):
         """
         self.prepare().cast(ctxt, method, **kwargs)
 
+    def cast_many(self, ctxt, method, args_list):
+        """Invoke a method once for each dict of arguments and return
+        immediately.
+
+        This works like a cast() of each dict of arguments, in order, except
+        that drivers able to have several messages in flight at once (e.g.
+        AMQP 1.0) send them together instead of waiting for each one to be
+        acknowledged by the messaging service in turn.
+
+        :param ctxt: a request context dict
+        :type ctxt: dict
+        :param method: the method name
+        :type method: str
+        :param args_list: the method arguments of each invocation
+        :type args_list: list of dict
+        :raises: MessageDeliveryFailure
+        """
+        self.prepare().cast_many(ctxt, method, args_list)
+
     def call(self, ctxt, method, **kwargs):
         """Invoke a method and wait for a reply.
 
@@ -402,6 +508,55 @@ class RPCClient(object):
         """
         return self.prepare().call(ctxt, method, **kwargs)
 
+    def call_async(self, ctxt, method, **kwargs):
+        """Invoke a method and return a future of the reply.
+
+        This works like call() except that it returns as soon as the request
+        is sent. The returned concurrent.futures.Future gives the return
+        value of the remote method, or raises what call() would have raised.
+        It is completed by the transport's reply handling thread, so many
+        calls can be kept in flight from a single thread.
+
+        To wait for it from an asyncio (or trollius) coroutine, wrap it with
+        asyncio.wrap_future().
+
+        :param ctxt: a request context dict
+        :type ctxt: dict
+        :param method: the method name
+        :type method: str
+        :param kwargs: a dict of method arguments
+        :type kwargs: dict
+        :raises: MessageDeliveryFailure
+        :returns: concurrent.futures.Future
+        """
+        return self.prepare().call_async(ctxt, method, **kwargs)
+
+    def call_many(self, ctxt, targets, method, **kwargs):
+        """Invoke a method on several targets and wait for all the replies.
+
+        The calls are sent at once and share a single deadline, the client's
+        call timeout. Each target overrides the non-None exchange, topic,
+        namespace, version and server attributes of the client's target, so
+        querying a list of hosts is just::
+
+            targets = [messaging.Target(server=host) for host in hosts]
+            replies = self._client.call_many(ctxt, targets, 'get_state')
+
+        :param ctxt: a request context dict
+        :type ctxt: dict
+        :param targets: the targets to call
+        :type targets: list of Target
+        :param method: the method name
+        :type method: str
+        :param kwargs: a dict of method arguments
+        :type kwargs: dict
+        :returns: a list with the reply of each target, in order. A call
+                  which failed or did not complete before the deadline gets
+                  the exception instance call() would have raised instead
+                  (MessagingTimeout, RemoteError, ...).
+        """
+        return self.prepare().call_many(ctxt, targets, method, **kwargs)
+
     def can_send_version(self, version=_marker):
         """Check to see if a version is compatible with the version cap."""
         return self.prepare(version=version).can_send_version()
@@ -24,8 +24,10 @@ __all__ = [
     'ExpectedException',
 ]
 
+import collections
 import logging
 import sys
+import threading
 
 import six
 
@@ -90,9 +92,20 @@ class RPCDispatcher(object):
     of the methods exposed by that object. All public methods on an endpoint
     object are remotely invokable by clients.
 
+    The endpoints exposing each (namespace, method) pair are computed on
+    first use and cached, only for the methods which exist on an endpoint.
+    The version compatibility checks of the most recently requested
+    versions are cached too. Assigning a new list to the endpoints
+    attribute resets these caches.
 
+    With the asyncio executor, endpoint methods may be coroutine functions:
+    the reply is sent once the event loop has run the coroutine.
     """
 
+    # Maximum number of (endpoint version, requested version) pairs whose
+    # compatibility is cached.
+    _max_compatible_versions = 256
+
     def __init__(self, target, endpoints, serializer):
         """Construct a rpc server dispatcher.
 
@@ -100,10 +113,21 @@ class RPCDispatcher(object):
         :type target: Target
         """
 
-        self.endpoints = endpoints
         self.serializer = serializer or msg_serializer.NoOpSerializer()
         self._default_target = msg_target.Target()
         self._target = target
+        self.endpoints = endpoints
+
+    @property
+    def endpoints(self):
+        return self._endpoints
+
+    @endpoints.setter
+    def endpoints(self, endpoints):
+        self._endpoints = endpoints
+        self._dispatch_index = {}
+        self._compatible_versions = collections.OrderedDict()
+        self._compatible_versions_lock = threading.Lock()
 
     def _listen(self, transport):
         return transport._listen(self._target)
@@ -117,6 +141,45 @@ class RPCDispatcher(object):
         endpoint_version = target.version or '1.0'
         return utils.version_is_compatible(endpoint_version, version)
 
+    def _get_endpoint_target(self, endpoint):
+        return getattr(endpoint, 'target', None) or self._default_target
+
+    def _get_candidates(self, namespace, method):
+        """Return the endpoints exposing method in namespace, in order,
+        along with their version.
+        """
+        key = (namespace, method)
+        try:
+            return self._dispatch_index[key]
+        except KeyError:
+            pass
+        candidates = []
+        for endpoint in self.endpoints:
+            target = self._get_endpoint_target(endpoint)
+            if (self._is_namespace(target, namespace) and
+                    hasattr(endpoint, method)):
+                candidates.append((endpoint, target.version or '1.0'))
+        # NOTE: the namespace and method come from the messages, only
+        # cache the methods which exist so that the index stays bounded
+        if candidates:
+            self._dispatch_index[key] = candidates
+        return candidates
+
+    def _is_version_compatible(self, endpoint_version, version):
+        key = (endpoint_version, version)
+        cache = self._compatible_versions
+        with self._compatible_versions_lock:
+            compatible = cache.pop(key, None)
+            if compatible is not None:
+                cache[key] = compatible
+                return compatible
+        compatible = utils.version_is_compatible(endpoint_version, version)
+        with self._compatible_versions_lock:
+            cache[key] = compatible
+            if len(cache) > self._max_compatible_versions:
+                cache.popitem(last=False)
+        return compatible
+
     def _do_dispatch(self, endpoint, method, ctxt, args, executor_callback):
         ctxt = self.serializer.deserialize_context(ctxt)
         new_args = dict()
@@ -127,6 +190,11 @@ class RPCDispatcher(object):
             result = executor_callback(func, ctxt, **new_args)
         else:
             result = func(ctxt, **new_args)
+        if utils.is_awaitable(result):
+            return utils.chain_awaitable(
+                result,
+                lambda fut: self.serializer.serialize_entity(ctxt,
+                                                             fut.result()))
         return self.serializer.serialize_entity(ctxt, result)
 
     def __call__(self, incoming, executor_callback=None):
@@ -137,24 +205,46 @@ class RPCDispatcher(object):
 
     def _dispatch_and_reply(self, incoming, executor_callback):
         try:
-            incoming.reply(self._dispatch(incoming.ctxt,
-                                          incoming.message,
-                                          executor_callback))
+            result = self._dispatch(incoming.ctxt, incoming.message,
+                                    executor_callback)
+            if utils.is_awaitable(result):
+                # NOTE: the endpoint method is a coroutine, reply once the
+                # event loop has run it.
+                return utils.chain_awaitable(
+                    result, lambda fut: self._reply(incoming, fut))
+            incoming.reply(result)
         except ExpectedException as e:
-            LOG.debug(u'Expected exception during message handling (%s)',
-                      e.exc_info[1])
-            incoming.reply(failure=e.exc_info, log_failure=False)
+            self._reply_expected_failure(incoming, e)
         except Exception as e:
             # sys.exc_info() is deleted by LOG.exception().
             exc_info = sys.exc_info()
-            LOG.error(_LE('Exception during message handling: %s'), e,
-                      exc_info=exc_info)
-            incoming.reply(failure=exc_info)
+            self._reply_failure(incoming, exc_info)
             # NOTE(dhellmann): Remove circular object reference
             # between the current stack frame and the traceback in
             # exc_info.
             del exc_info
 
+    def _reply(self, incoming, fut):
+        e = fut.exception()
+        if e is None:
+            incoming.reply(fut.result())
+        elif isinstance(e, ExpectedException):
+            self._reply_expected_failure(incoming, e)
+        else:
+            self._reply_failure(incoming, (type(e), e, e.__traceback__))
+
+    @staticmethod
+    def _reply_expected_failure(incoming, e):
+        LOG.debug(u'Expected exception during message handling (%s)',
+                  e.exc_info[1])
+        incoming.reply(failure=e.exc_info, log_failure=False)
+
+    @staticmethod
+    def _reply_failure(incoming, exc_info):
+        LOG.error(_LE('Exception during message handling: %s'), exc_info[1],
+                  exc_info=exc_info)
+        incoming.reply(failure=exc_info)
+
     def _dispatch(self, ctxt, message, executor_callback=None):
         """Dispatch an RPC message to the appropriate endpoint method.
 
@@ -169,17 +259,9 @@ class RPCDispatcher(object):
         namespace = message.get('namespace')
         version = message.get('version', '1.0')
 
-        found_compatible = False
-        for endpoint in self.endpoints:
-            target = getattr(endpoint, 'target', None)
-            if not target:
-                target = self._default_target
-
-            if not (self._is_namespace(target, namespace) and
-                    self._is_compatible(target, version)):
-                continue
-
-            if hasattr(endpoint, method):
+        candidates = self._get_candidates(namespace, method)
+        for endpoint, endpoint_version in candidates:
+            if self._is_version_compatible(endpoint_version, version):
                 localcontext._set_local_context(ctxt)
                 try:
                     return self._do_dispatch(endpoint, method, ctxt, args,
@@ -187,9 +269,9 @@ class RPCDispatcher(object):
                 finally:
                     localcontext._clear_local_context()
 
-            found_compatible = True
-
-        if found_compatible:
-            raise NoSuchMethod(method)
-        else:
-            raise UnsupportedVersion(version, method=method)
+        for endpoint in self.endpoints:
+            target = self._get_endpoint_target(endpoint)
+            if (self._is_namespace(target, namespace) and
+                    self._is_compatible(target, version)):
+                raise NoSuchMethod(method)
+        raise UnsupportedVersion(version, method=method)
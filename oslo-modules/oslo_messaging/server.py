@@ -189,6 +189,19 @@ class MessageHandlingServer(service.ServiceBase):
         # allow to restart it into another thread
         self._thread_id = None
 
+    def get_executor_statistics(self):
+        """Return a dict of statistics about the message processing.
+
+        The statistics are reported by the executor, for example the thread
+        pool of the threading executor reports its number of workers, of
+        queued messages and the average time they waited for a worker. An
+        empty dict is returned if the server is not started.
+        """
+        executor = self._executor
+        if executor is None:
+            return {}
+        return executor.get_statistics()
+
     def reset(self):
         """Reset service.
 
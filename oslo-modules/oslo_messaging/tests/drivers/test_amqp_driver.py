@@ -0,0 +1,228 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import time
+
+from oslo_serialization import jsonutils
+from oslotest import base as test_base
+from six import moves
+
+from oslo_messaging._drivers.protocols.amqp import credit
+from oslo_messaging._drivers.protocols.amqp import driver
+from oslo_messaging._drivers.protocols.amqp import eventloop
+
+
+class FakeLink(object):
+
+    def __init__(self):
+        self.capacity = 0
+        self.granted = 0
+
+    def add_capacity(self, amount):
+        self.capacity += amount
+        self.granted += amount
+
+    def receive(self, count=1):
+        for i in range(count):
+            self.capacity -= 1
+
+
+class CreditWindowTestCase(test_base.BaseTestCase):
+
+    def setUp(self):
+        super(CreditWindowTestCase, self).setUp()
+        self.link = FakeLink()
+        self.window = credit.CreditWindow(2, 16)
+        self.window.top_up(self.link)
+
+    def _drain(self):
+        # the peer uses all the credit granted to the link before the
+        # messages are processed
+        received = self.link.capacity
+        self.link.receive(received)
+        for i in range(received):
+            self.window.update(self.link)
+
+    def test_initial_credit(self):
+        self.assertEqual(2, self.window.window)
+        self.assertEqual(2, self.link.capacity)
+
+    def test_grow(self):
+        windows = []
+        for i in range(6):
+            self._drain()
+            windows.append(self.window.window)
+        self.assertEqual([4, 8, 16, 16, 16, 16], windows)
+        self.assertEqual(16, self.link.capacity)
+
+    def test_top_up_at_half_window(self):
+        for i in range(3):
+            self._drain()
+        self.assertEqual(16, self.window.window)
+        self.link.receive(7)
+        self.window.update(self.link)
+        self.assertEqual(9, self.link.capacity)
+        self.link.receive()
+        self.window.update(self.link)
+        self.assertEqual(16, self.link.capacity)
+
+    def test_shrink(self):
+        for i in range(3):
+            self._drain()
+        self.assertEqual(16, self.window.window)
+
+        # a message arrived during the interval
+        self.link.receive()
+        self.window.update(self.link)
+        self.window.idle_check()
+        self.assertEqual(16, self.window.window)
+
+        windows = []
+        for i in range(5):
+            self.window.idle_check()
+            windows.append(self.window.window)
+        self.assertEqual([8, 4, 2, 2, 2], windows)
+        # the credit granted is not revoked
+        self.assertEqual(15, self.link.capacity)
+
+    def test_withheld_credit(self):
+        for i in range(3):
+            self._drain()
+        granted = self.link.granted
+
+        # the application falls behind
+        self.link.receive(self.link.capacity)
+        self.assertFalse(self.window.update(self.link, backlog=16))
+        self.assertFalse(self.window.top_up(self.link, backlog=9))
+        self.assertEqual(granted, self.link.granted)
+
+        # and catches up
+        self.assertTrue(self.window.top_up(self.link, backlog=7))
+        self.assertEqual(9, self.link.capacity)
+
+    def test_minimum(self):
+        window = credit.CreditWindow(0, 0)
+        self.assertEqual(1, window.minimum)
+        self.assertEqual(1, window.maximum)
+
+
+class ScheduleTestCase(test_base.BaseTestCase):
+
+    def setUp(self):
+        super(ScheduleTestCase, self).setUp()
+        self.schedule = eventloop.Schedule()
+        self.called = []
+
+    def _request(self, name):
+        return lambda: self.called.append(name)
+
+    def test_process(self):
+        self.schedule.schedule(self._request('b'), 0.02)
+        self.schedule.schedule(self._request('a'), 0.01)
+        self.schedule.schedule(self._request('c'), 60)
+        time.sleep(0.03)
+        self.schedule.process()
+        self.assertEqual(['a', 'b'], self.called)
+
+    def test_cancel(self):
+        handle = self.schedule.schedule(self._request('a'), 0)
+        self.schedule.schedule(self._request('b'), 0)
+        self.schedule.cancel(handle)
+        time.sleep(0.01)
+        self.schedule.process()
+        self.assertEqual(['b'], self.called)
+
+    def test_cancel_delay(self):
+        handle = self.schedule.schedule(self._request('a'), 0.01)
+        self.schedule.schedule(self._request('b'), 60)
+        self.schedule.cancel(handle)
+        # the cancelled callable doesn't wake up the eventloop anymore
+        self.assertGreater(self.schedule.get_delay(), 1)
+        self.assertEqual(5, self.schedule.get_delay(5))
+
+    def test_cancel_all(self):
+        handle = self.schedule.schedule(self._request('a'), 0.01)
+        self.schedule.cancel(handle)
+        self.assertIsNone(self.schedule.get_delay())
+
+
+class ExpiringResultTestCase(test_base.BaseTestCase):
+
+    def test_put_cancels_timer(self):
+        schedule = eventloop.Schedule()
+        expired = []
+        timer = schedule.schedule(lambda: expired.append(True), 0)
+        result_queue = moves.queue.Queue()
+        result = eventloop.ExpiringResult(result_queue, schedule, timer)
+
+        result.put({"status": "OK"})
+        time.sleep(0.01)
+        schedule.process()
+        self.assertEqual([], expired)
+        self.assertEqual({"status": "OK"}, result_queue.get_nowait())
+
+
+class FakeController(object):
+
+    def __init__(self):
+        self.credit_updates = 0
+
+    def update_credit(self):
+        self.credit_updates += 1
+
+
+class FakeDriver(object):
+
+    def __init__(self):
+        self.conf = None
+        self._ctrl = FakeController()
+
+
+class FakeMessage(object):
+
+    def __init__(self, request, context):
+        self.body = jsonutils.dumps({"request": request, "context": context})
+        self.reply_to = None
+        self.id = None
+
+
+class ProtonListenerTestCase(test_base.BaseTestCase):
+
+    def setUp(self):
+        super(ProtonListenerTestCase, self).setUp()
+        self.driver = FakeDriver()
+        self.listener = driver.ProtonListener(self.driver)
+
+    def test_poll_timeout(self):
+        start = time.time()
+        self.assertIsNone(self.listener.poll(timeout=0.05))
+        self.assertGreaterEqual(time.time() - start, 0.04)
+
+    def test_poll(self):
+        self.listener.incoming.put(FakeMessage({"method": "echo"},
+                                               {"user": "bob"}))
+        message = self.listener.poll(timeout=1)
+        self.assertEqual({"method": "echo"}, message.message)
+        self.assertEqual({"user": "bob"}, message.ctxt)
+
+    def test_poll_batch_timeout(self):
+        self.assertEqual([], self.listener.poll_batch(10, timeout=0.01))
+
+    def test_poll_grants_withheld_credit(self):
+        self.listener.credit_withheld = True
+        for i in range(2):
+            self.listener.incoming.put(FakeMessage({"method": "echo"}, {}))
+        self.listener.poll()
+        self.assertEqual(0, self.driver._ctrl.credit_updates)
+        self.listener.poll()
+        self.assertEqual(1, self.driver._ctrl.credit_updates)
+        self.assertFalse(self.listener.credit_withheld)
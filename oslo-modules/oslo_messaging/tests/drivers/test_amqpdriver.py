@@ -0,0 +1,89 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import contextlib
+
+from oslotest import base as test_base
+
+from oslo_messaging._drivers import amqpdriver
+
+
+class FakeConnection(object):
+
+    def __init__(self, published, confirmed_before_error):
+        self.published = published
+        self.confirmed_before_error = confirmed_before_error
+
+    def topic_send_batch(self, exchange_name, topic, msgs, retry=None):
+        while msgs:
+            if self.confirmed_before_error:
+                if not self.confirmed_before_error.pop(0):
+                    raise IOError('connection lost')
+            self.published.append(msgs.popleft())
+
+
+class FakeDriver(object):
+
+    def __init__(self):
+        self.published = []
+        # True for each message confirmed, False to fail the publish
+        self.confirmed_before_error = []
+
+    @contextlib.contextmanager
+    def _get_connection(self, purpose):
+        yield FakeConnection(self.published, self.confirmed_before_error)
+
+
+class BatchPublisherTestCase(test_base.BaseTestCase):
+
+    def setUp(self):
+        super(BatchPublisherTestCase, self).setUp()
+        self.driver = FakeDriver()
+        self.publisher = amqpdriver.BatchPublisher(self.driver, 4, 60)
+        self.addCleanup(self.publisher.stop)
+
+    def _send(self, *msgs):
+        for msg in msgs:
+            self.publisher.topic_send('openstack', 'topic', msg)
+
+    def test_publish_full_batch(self):
+        self._send(1, 2, 3)
+        self.assertEqual([], self.driver.published)
+        self._send(4)
+        self.assertEqual([1, 2, 3, 4], self.driver.published)
+
+    def test_retry_unconfirmed_messages_only(self):
+        self.driver.confirmed_before_error[:] = [True, True, False]
+        self._send(1, 2, 3, 4)
+        self.assertEqual([1, 2], self.driver.published)
+
+        self._send(5)
+        self.publisher.flush()
+        self.assertEqual([1, 2, 3, 4, 5], self.driver.published)
+
+    def test_drop_after_max_attempts(self):
+        self.driver.confirmed_before_error[:] = [True, False, False, False]
+        self._send(1, 2, 3, 4)
+        self.publisher.flush()
+        self.publisher.flush()
+        self.assertEqual([1], self.driver.published)
+
+        self.publisher.flush()
+        self.assertEqual([1], self.driver.published)
+
+    def test_stop_drops_failed_batch(self):
+        self._send(1, 2)
+        self.driver.confirmed_before_error[:] = [False]
+        self.publisher.stop()
+        self.assertEqual([], self.driver.published)
+        self.publisher.flush()
+        self.assertEqual([], self.driver.published)
@@ -0,0 +1,295 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+import threading
+import time
+
+from oslo_config import cfg
+from oslotest import base as test_base
+
+import oslo_messaging
+from oslo_messaging._drivers import amqp as rpc_amqp
+from oslo_messaging._drivers import impl_rabbit
+
+
+def _wait_for(predicate, timeout=5):
+    deadline = time.time() + timeout
+    while not predicate():
+        if time.time() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+class FakeHeartbeatConnection(object):
+
+    def __init__(self, interval=0.05):
+        self._heartbeat_wait_timeout = interval
+        self.beats = 0
+
+    def _heartbeat_run(self):
+        self.beats += 1
+        return self._heartbeat_wait_timeout
+
+
+class HeartbeatSchedulerTestCase(test_base.BaseTestCase):
+
+    def setUp(self):
+        super(HeartbeatSchedulerTestCase, self).setUp()
+        self.scheduler = impl_rabbit.HeartbeatScheduler()
+
+    def _new_threads(self, threads):
+        return set(threading.enumerate()) - threads
+
+    def test_single_thread(self):
+        threads = set(threading.enumerate())
+        connections = [FakeHeartbeatConnection() for i in range(50)]
+        for connection in connections:
+            self.scheduler.register(connection)
+        self.assertEqual(1, len(self._new_threads(threads)))
+
+        self.assertTrue(_wait_for(
+            lambda: all(c.beats >= 3 for c in connections)))
+        self.assertEqual(1, len(self._new_threads(threads)))
+
+        for connection in connections:
+            self.scheduler.unregister(connection)
+        self.assertTrue(_wait_for(
+            lambda: not self._new_threads(threads)))
+
+        # the thread is started again for new connections
+        connection = FakeHeartbeatConnection()
+        self.scheduler.register(connection)
+        self.addCleanup(self.scheduler.unregister, connection)
+        self.assertEqual(1, len(self._new_threads(threads)))
+        self.assertTrue(_wait_for(lambda: connection.beats >= 1))
+
+    def test_unregister_stops_heartbeats(self):
+        connection = FakeHeartbeatConnection()
+        self.scheduler.register(connection)
+        self.assertTrue(_wait_for(lambda: connection.beats >= 1))
+        self.scheduler.unregister(connection)
+        beats = connection.beats
+        time.sleep(0.2)
+        self.assertEqual(beats, connection.beats)
+
+    def test_fork(self):
+        parent_connection = FakeHeartbeatConnection()
+        self.scheduler.register(parent_connection)
+        self.addCleanup(self.scheduler.unregister, parent_connection)
+        self.assertTrue(_wait_for(lambda: parent_connection.beats >= 1))
+
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            status = b'0'
+            try:
+                parent_beats = parent_connection.beats
+                connection = FakeHeartbeatConnection()
+                self.scheduler.register(connection)
+                if (_wait_for(lambda: connection.beats >= 3) and
+                        parent_connection.beats == parent_beats):
+                    status = b'1'
+                self.scheduler.unregister(connection)
+            finally:
+                os.write(write_fd, status)
+                os._exit(0)
+        os.close(write_fd)
+        try:
+            status = os.read(read_fd, 1)
+        finally:
+            os.close(read_fd)
+            os.waitpid(pid, 0)
+        self.assertEqual(b'1', status)
+
+
+class HeartbeatRunTestCase(test_base.BaseTestCase):
+
+    def setUp(self):
+        super(HeartbeatRunTestCase, self).setUp()
+        conf = cfg.ConfigOpts()
+        conf([])
+        url = oslo_messaging.TransportURL.parse(conf, 'kombu+memory:////')
+        driver = impl_rabbit.RabbitDriver(conf, url)
+        self.addCleanup(driver.cleanup)
+        self.connection = impl_rabbit.Connection(conf, url,
+                                                 rpc_amqp.PURPOSE_SEND)
+        self.addCleanup(self.connection.close)
+
+    def _hold_connection(self):
+        acquired = threading.Event()
+        release = threading.Event()
+
+        def hold():
+            with self.connection._connection_lock:
+                acquired.set()
+                release.wait()
+
+        thread = threading.Thread(target=hold)
+        thread.start()
+        acquired.wait()
+        return release, thread
+
+    def test_busy_connection_backoff(self):
+        interval = self.connection._heartbeat_wait_timeout
+        release, thread = self._hold_connection()
+        try:
+            delays = [self.connection._heartbeat_run() for i in range(10)]
+        finally:
+            release.set()
+            thread.join()
+        tick = impl_rabbit.HeartbeatScheduler.TICK
+        self.assertEqual([min(tick * 2 ** i, interval) for i in range(10)],
+                         delays)
+        self.assertEqual(interval, delays[-1])
+
+        self.assertEqual(interval, self.connection._heartbeat_run())
+        release, thread = self._hold_connection()
+        try:
+            self.assertEqual(tick, self.connection._heartbeat_run())
+        finally:
+            release.set()
+            thread.join()
+
+
+class FakeChannel(object):
+
+    def __init__(self):
+        self.acks = []
+
+    def basic_ack(self, delivery_tag, multiple=False):
+        self.acks.append((delivery_tag, multiple))
+
+
+class FakeRawMessage(object):
+
+    def __init__(self, channel, delivery_tag):
+        self.channel = channel
+        self.delivery_tag = delivery_tag
+        self.requeued = False
+
+    def requeue(self):
+        self.requeued = True
+
+
+class AckBatcherTestCase(test_base.BaseTestCase):
+
+    def setUp(self):
+        super(AckBatcherTestCase, self).setUp()
+        self.channel = FakeChannel()
+        self.batcher = impl_rabbit.AckBatcher(3, 60)
+
+    def _deliver(self, count, channel=None, first_tag=1):
+        channel = channel or self.channel
+        messages = [FakeRawMessage(channel, tag)
+                    for tag in range(first_tag, first_tag + count)]
+        for message in messages:
+            self.batcher.delivered(message)
+        return messages
+
+    def test_batch(self):
+        messages = self._deliver(4)
+        for message in messages[:2]:
+            self.batcher.ack(message)
+        self.assertEqual([], self.channel.acks)
+        self.batcher.ack(messages[2])
+        self.assertEqual([(3, True)], self.channel.acks)
+
+        self.batcher.ack(messages[3])
+        self.batcher.flush()
+        self.assertEqual([(3, True), (4, True)], self.channel.acks)
+
+    def test_never_ack_past_unprocessed(self):
+        messages = self._deliver(5)
+        # the first message is still being processed
+        for message in messages[1:]:
+            self.batcher.ack(message)
+        self.batcher.flush()
+        self.assertEqual([], self.channel.acks)
+
+        self.batcher.ack(messages[0])
+        self.assertEqual([(5, True)], self.channel.acks)
+
+    def test_ack_up_to_unprocessed(self):
+        messages = self._deliver(5)
+        for i in (0, 1, 3, 4):
+            self.batcher.ack(messages[i])
+        self.batcher.flush()
+        self.assertEqual([(2, True)], self.channel.acks)
+
+        self.batcher.ack(messages[2])
+        self.batcher.flush()
+        self.assertEqual([(2, True), (5, True)], self.channel.acks)
+
+    def test_requeue_inside_run(self):
+        messages = self._deliver(3)
+        self.batcher.ack(messages[0])
+        self.batcher.requeue(messages[1])
+        # requeued before the multiple ack covering its delivery tag
+        self.assertTrue(messages[1].requeued)
+        self.assertEqual([], self.channel.acks)
+        self.batcher.ack(messages[2])
+        self.assertEqual([(3, True)], self.channel.acks)
+        self.assertFalse(messages[0].requeued)
+        self.assertFalse(messages[2].requeued)
+
+    def test_flush_on_window_expiry(self):
+        self.batcher = impl_rabbit.AckBatcher(3, 0.05)
+        messages = self._deliver(2)
+        for message in messages:
+            self.batcher.ack(message)
+
+        self.batcher.flush(expired_only=True)
+        self.assertEqual([], self.channel.acks)
+        time.sleep(0.1)
+        self.batcher.flush(expired_only=True)
+        self.assertEqual([(2, True)], self.channel.acks)
+
+        # nothing left to acknowledge
+        self.batcher.flush()
+        self.assertEqual([(2, True)], self.channel.acks)
+
+    def test_reset_on_channel_change(self):
+        messages = self._deliver(2)
+        self.batcher.ack(messages[0])
+
+        # the connection was reestablished, the broker redelivers the
+        # unacknowledged messages on the new channel
+        channel = FakeChannel()
+        new_messages = self._deliver(2, channel)
+        # late ack of a message of the closed channel
+        self.batcher.ack(messages[1])
+        self.batcher.requeue(messages[1])
+        self.assertFalse(messages[1].requeued)
+
+        for message in new_messages:
+            self.batcher.ack(message)
+        self.batcher.flush()
+        self.assertEqual([], self.channel.acks)
+        self.assertEqual([(2, True)], channel.acks)
+
+    def test_ack_failure(self):
+        def basic_ack(delivery_tag, multiple=False):
+            raise IOError('connection lost')
+        self.channel.basic_ack = basic_ack
+
+        messages = self._deliver(3)
+        for message in messages:
+            self.batcher.ack(message)
+
+        # the messages will be redelivered on a new channel
+        channel = FakeChannel()
+        messages = self._deliver(3, channel)
+        for message in messages:
+            self.batcher.ack(message)
+        self.assertEqual([(3, True)], channel.acks)
@@ -0,0 +1,49 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from oslo_config import cfg
+from oslotest import base as test_base
+
+import oslo_messaging
+
+
+class CastManyTestCase(test_base.BaseTestCase):
+
+    def setUp(self):
+        super(CastManyTestCase, self).setUp()
+        conf = cfg.ConfigOpts()
+        conf([])
+        self.transport = oslo_messaging.get_transport(conf, 'fake:')
+        self.addCleanup(self.transport.cleanup)
+        target = oslo_messaging.Target(topic='testtopic', server='server1',
+                                       version='1.1')
+        self.listener = self.transport._listen(target)
+        self.addCleanup(self.listener.cleanup)
+        self.client = oslo_messaging.RPCClient(self.transport, target,
+                                               version_cap='1.2')
+
+    def test_cast_many(self):
+        self.client.cast_many({'user': 'bob'}, 'ping',
+                              [{'seq': i} for i in range(3)])
+        messages = [self.listener.poll(timeout=1) for i in range(3)]
+        self.assertEqual([{'method': 'ping', 'args': {'seq': i},
+                           'version': '1.1'} for i in range(3)],
+                         [message.message for message in messages])
+        self.assertEqual([{'user': 'bob'}] * 3,
+                         [message.ctxt for message in messages])
+        self.assertIsNone(self.listener.poll(timeout=0.01))
+
+    def test_cast_many_version_cap(self):
+        client = self.client.prepare(version='2.0')
+        self.assertRaises(oslo_messaging.RPCVersionCapError,
+                          client.cast_many, {}, 'ping', [{'seq': 0}])
+        self.assertIsNone(self.listener.poll(timeout=0.01))
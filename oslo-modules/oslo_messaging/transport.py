@@ -89,6 +89,20 @@ class Transport(object):
                                  wait_for_reply=wait_for_reply,
                                  timeout=timeout, retry=retry)
 
+    def _send_async(self, target, ctxt, message, timeout=None, retry=None):
+        if not target.topic:
+            raise exceptions.InvalidTarget('A topic is required to send',
+                                           target)
+        return self._driver.send_async(target, ctxt, message,
+                                       timeout=timeout, retry=retry)
+
+    def _send_many(self, target, ctxt, messages, timeout=None, retry=None):
+        if not target.topic:
+            raise exceptions.InvalidTarget('A topic is required to send',
+                                           target)
+        self._driver.send_many(target, ctxt, messages, timeout=timeout,
+                               retry=retry)
+
     def _send_notification(self, target, ctxt, message, version, retry=None):
         if not target.topic:
             raise exceptions.InvalidTarget('A topic is required to send',
@@ -112,6 +126,15 @@ class Transport(object):
         return self._driver.listen_for_notifications(
             targets_and_priorities, pool)
 
+    def get_statistics(self):
+        """Return a dict of statistics about the transport resources.
+
+        The content depends on the driver, the AMQP drivers report the usage
+        of their connection pool under the 'connection_pool' key. An empty
+        dict is returned if the driver doesn't report any statistics.
+        """
+        return self._driver.get_statistics()
+
     def cleanup(self):
         """Release all resources associated with this transport."""
         self._driver.cleanup()